@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+# Times configuration.configure() against a local stand-in for the Bitbar API.
+#
+# The stand-in serves the read-only endpoints used by configure() with a fixed
+# latency per request, so the result mostly reflects how many requests are made
+# and how many are made one after another.
+#
+# usage: python benchmarks/configure_benchmark.py [--projects 30] [--latency 0.05]
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import yaml
+
+FRAMEWORK_NAME = "mozilla-usb"
+APPLICATION_FILE = "bench-Testdroid.apk"
+USER_ID = 1234
+DEVICES_PER_GROUP = 4
+
+
+def build_world(project_count):
+    """Return (config, bitbar_data) for project_count projects that are already in sync."""
+    config = {
+        "devicepool_config": {"jobs_to_start_algorithm": "v3"},
+        "projects": {
+            "defaults": {
+                "os_type": "ANDROID",
+                "project_type": "APPIUM_ANDROID_SERVER_SIDE",
+                "application_file": APPLICATION_FILE,
+                "timeout": 0,
+                "scheduler": "SINGLE",
+                "archivingStrategy": "DAYS",
+                "archivingItemCount": 7,
+                "taskcluster_provisioner_id": "proj-autophone",
+                "additional_parameters": {"TC_WORKER_CONF": "gecko-t-ap"},
+            }
+        },
+        "device_groups": {},
+    }
+    data = {
+        "me": {"id": USER_ID},
+        "devices": [],
+        "device-groups": [],
+        "device-group-devices": {},
+        "projects": [],
+        "files": [{"id": 1, "name": APPLICATION_FILE, "createTime": 1}],
+        "frameworks": [{"id": 1, "name": FRAMEWORK_NAME}],
+    }
+    device_id = 0
+    for i in range(project_count):
+        project_name = "bench-project-%02d" % i
+        device_group_name = "bench-group-%02d" % i
+        test_file = "bench-test-%02d.zip" % i
+        worker_type = "bench-worker-%02d" % i
+        config["projects"][project_name] = {
+            "device_group_name": device_group_name,
+            "device_model": "bench",
+            "framework_name": FRAMEWORK_NAME,
+            "description": "benchmark project %d" % i,
+            "test_file": test_file,
+            "additional_parameters": {"TC_WORKER_TYPE": worker_type},
+        }
+        os.environ[worker_type.replace("-", "_")] = "fake-token"
+
+        group_devices = []
+        for _ in range(DEVICES_PER_GROUP):
+            device_id += 1
+            device = {"id": device_id, "displayName": "bench-%03d" % device_id}
+            data["devices"].append(device)
+            group_devices.append(device)
+        config["device_groups"][device_group_name] = {device["displayName"]: None for device in group_devices}
+
+        data["device-groups"].append(
+            {"id": 100 + i, "displayName": device_group_name, "deviceCount": len(group_devices)}
+        )
+        data["device-group-devices"][100 + i] = group_devices
+        data["projects"].append(
+            {
+                "id": 200 + i,
+                "name": "%s-%s" % (USER_ID, project_name),
+                "archiveTime": None,
+                "archivingStrategy": "DAYS",
+                "archivingItemCount": 7,
+                "description": "benchmark project %d" % i,
+            }
+        )
+        data["files"].append({"id": 300 + i, "name": test_file, "createTime": 300 + i})
+    return config, data
+
+
+def apply_filters(items, filters):
+    # filters look like s_displayname_eq_pixel5-unit
+    for item_filter in filters:
+        _flag, field, _op, value = item_filter.split("_", 3)
+        items = [item for item in items if str({k.lower(): v for k, v in item.items()}.get(field)) == value]
+    return items
+
+
+def make_handler(data, latency, counter):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(latency)
+            with counter["lock"]:
+                counter["requests"] += 1
+            parsed = urllib.parse.urlparse(self.path)
+            path = parsed.path.replace("/api/v2/", "", 1)
+            filters = urllib.parse.parse_qs(parsed.query).get("filter", [])
+
+            if path == "me":
+                body = data["me"]
+            elif path == "devices":
+                body = {"data": apply_filters(data["devices"], filters)}
+            elif path == "me/device-groups":
+                body = {"data": apply_filters(data["device-groups"], filters)}
+            elif path.startswith("device-groups/") and path.endswith("/devices"):
+                body = {"data": data["device-group-devices"][int(path.split("/")[1])]}
+            elif path == "projects":
+                body = {"data": apply_filters(data["projects"], filters)}
+            elif path == "files":
+                body = {"data": apply_filters(data["files"], filters)}
+            elif path == "admin/frameworks":
+                body = {"data": apply_filters(data["frameworks"], filters)}
+            else:
+                self.send_response(404)
+                self.end_headers()
+                return
+
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time configuration.configure() against a local stand-in server.")
+    parser.add_argument("--projects", type=int, default=30, help="Number of projects (default: 30)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds of latency per request (default: 0.05)")
+    parser.add_argument("--runs", type=int, default=3, help="Number of timed runs (default: 3)")
+    args = parser.parse_args()
+
+    config, data = build_world(args.projects)
+    counter = {"lock": threading.Lock(), "requests": 0}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(data, args.latency, counter))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # must be set before the package creates its Testdroid client
+    os.environ["TESTDROID_URL"] = "http://127.0.0.1:%s" % server.server_address[1]
+    os.environ["TESTDROID_APIKEY"] = "fake-api-key"
+    from mozilla_bitbar_devicepool import configuration, logger
+
+    logger.setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as files_dir:
+        for project_name, project_config in config["projects"].items():
+            for file_key in ("test_file", "application_file"):
+                if file_key in project_config:
+                    open(os.path.join(files_dir, project_config[file_key]), "w").close()
+        config_path = os.path.join(files_dir, "config.yml")
+        with open(config_path, "w") as config_file:
+            yaml.safe_dump(config, config_file)
+
+        timings = []
+        for _ in range(args.runs):
+            counter["requests"] = 0
+            configuration.BITBAR_CACHE["me"] = {}
+            start = time.perf_counter()
+            configuration.configure(config_path, filespath=files_dir)
+            timings.append(time.perf_counter() - start)
+
+    server.shutdown()
+    print(
+        "projects: %d, latency: %.0fms, requests: %d, configure(): best %.2fs, mean %.2fs"
+        % (
+            args.projects,
+            args.latency * 1000,
+            counter["requests"],
+            min(timings),
+            sum(timings) / len(timings),
+        )
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+# Measures the import time of the module behind each console script in
+# pyproject.toml with `python -X importtime` and checks it against a budget.
+#
+# Each module is imported in a fresh interpreter several times and the fastest
+# run is kept. The budgets leave room for slower machines, a module going over
+# its budget usually means an entry point started importing something heavy
+# (testdroid, taskcluster, git, sentry_sdk, requests_cache) it doesn't use.
+#
+# usage: python benchmarks/import_time.py [--runs 5] [--check]
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# entry point module -> import time budget in milliseconds
+BUDGETS_MS = {
+    "mozilla_bitbar_devicepool.main": 400,
+    "mozilla_bitbar_devicepool.test_run_manager_lt": 450,
+    "mozilla_bitbar_devicepool.device_group_report": 150,
+    "mozilla_bitbar_devicepool.device_group_report_lt": 150,
+    "mozilla_bitbar_devicepool.lambdatest.status": 300,
+    "mozilla_bitbar_devicepool.compare_to_api": 350,
+    "mozilla_bitbar_devicepool.compare_to_api_v3": 350,
+    "mozilla_bitbar_devicepool.compare_to_api_lt": 400,
+    "mozilla_bitbar_devicepool.reporting.main": 400,
+    "mozilla_bitbar_devicepool.run_cmd_lt": 250,
+    "mozilla_bitbar_devicepool.lambdatest.job_archive": 300,
+    "mozilla_bitbar_devicepool.lambdatest.utilization_history": 100,
+}
+
+# reported when an entry point loads them
+HEAVY_MODULES = ("testdroid", "taskcluster", "git", "sentry_sdk", "requests_cache")
+
+
+def get_entry_point_modules():
+    """Return {script name: module} from the [tool.poetry.scripts] table of pyproject.toml."""
+    scripts = {}
+    in_scripts = False
+    with open(os.path.join(REPO_DIR, "pyproject.toml")) as pyproject:
+        for line in pyproject:
+            line = line.strip()
+            if line.startswith("["):
+                in_scripts = line == "[tool.poetry.scripts]"
+                continue
+            match = re.match(r"""^([\w-]+)\s*=\s*['"]([\w.]+):\w+['"]""", line)
+            if in_scripts and match:
+                scripts[match.group(1)] = match.group(2)
+    return scripts
+
+
+def measure(module):
+    """Return (import time in ms, heavy modules loaded) for one fresh import of module."""
+    code = "import sys, {}; print(' '.join(m for m in {!r} if m in sys.modules))".format(module, HEAVY_MODULES)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_DIR,
+        env=dict(os.environ, PYTHONPATH=REPO_DIR),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative_us = None
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            cumulative_us = int(fields[1])
+    return cumulative_us / 1000, result.stdout.split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5, help="imports per module, the fastest is kept (default: 5)")
+    parser.add_argument("--check", action="store_true", help="exit with 1 if a module is over its budget")
+    args = parser.parse_args()
+
+    over_budget = []
+    print("{:<28} {:>9} {:>9}  {}".format("script", "ms", "budget", "heavy modules"))
+    for script, module in sorted(get_entry_point_modules().items()):
+        measurements = [measure(module) for _ in range(args.runs)]
+        import_ms = min(import_ms for import_ms, _heavy in measurements)
+        heavy = measurements[0][1]
+        budget_ms = BUDGETS_MS.get(module)
+        if budget_ms is not None and import_ms > budget_ms:
+            over_budget.append(script)
+        print(
+            "{:<28} {:>9.1f} {:>9}  {}{}".format(
+                script,
+                import_ms,
+                budget_ms if budget_ms is not None else "-",
+                ", ".join(heavy) or "-",
+                "  OVER BUDGET" if script in over_budget else "",
+            )
+        )
+
+    if over_budget:
+        print("over budget: {}".format(", ".join(over_budget)))
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+# Times the logging of one LambdaTest job starter cycle on the scheduling thread.
+#
+# A cycle logs what _job_starter_thread() and calculate_jobs_to_start() log: one INFO
+# line and the DEBUG lines with the device lists. It is logged two ways:
+#   - eager: f-strings and a handler writing on the calling thread (the previous setup)
+#   - lazy: %-style arguments and logging_setup's queue handler (the current setup)
+# at INFO and at DEBUG. The records go to a file, the time is what the calling thread
+# spends, the listener thread writes the queued records in the background.
+#
+# --write-latency stands in for a slow log sink (e.g. journald under load), each write
+# to the file waits that long. Without it the listener thread mostly competes with the
+# calling thread for the GIL.
+#
+# usage: python benchmarks/logging_benchmark.py [--devices 60] [--cycles 5000] [--write-latency 0.0002]
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from mozilla_bitbar_devicepool import logging_setup
+
+HEADER = "[ JS a55-perf          ]"
+
+
+def eager_cycle(devices, tracked, available):
+    logging.debug(f"{HEADER} Job tracker has {len(tracked)} active jobs for devices: {tracked if tracked else 'none'}")
+    logging.debug(f"{HEADER} API Active Devices: {devices}")
+    logging.debug(f"{HEADER} Available for Job Start: {available}")
+    logging.debug(
+        f"{HEADER} Decision variables: TC Jobs:{20}, API Active LT Devs:{len(devices)}, "
+        f"Available for Start:{len(available)}, Device UDIDs (Available):{available}"
+    )
+    logging.debug(
+        f"Job calculation - TCJobsNotHandled: {20 - len(tracked)}, AvailableDevices: {len(available)}, "
+        f"GlobalInitiated: {3}, MaxJobsToStartAtOnce: {10}"
+    )
+    logging.debug(
+        f"Job start calculation (min(tc_jobs_not_handled, max_jobs, available_devices_count)): "
+        f"min({20 - len(tracked)}, {10}, {len(available)}) = {10}"
+    )
+    logging.info(
+        f"{HEADER} TC Jobs: {20:>4}, LT Devs Config/Active/Busy/Cleanup: {len(devices)}/{len(devices)}/0/0, "
+        f"RStarted/NeedH/TcQW/AvailW/ToStart: {len(tracked)}/{20 - len(tracked)}/0/{len(available)}/10"
+    )
+
+
+def lazy_cycle(devices, tracked, available):
+    logging.debug("%s Job tracker has %s active jobs for devices: %s", HEADER, len(tracked), tracked or "none")
+    logging.debug("%s API Active Devices: %s", HEADER, devices)
+    logging.debug("%s Available for Job Start: %s", HEADER, available)
+    logging.debug(
+        "%s Decision variables: TC Jobs:%s, API Active LT Devs:%s, Available for Start:%s, Device UDIDs (Available):%s",
+        HEADER,
+        20,
+        len(devices),
+        len(available),
+        available,
+    )
+    logging.debug(
+        "Job calculation - TCJobsNotHandled: %s, AvailableDevices: %s, GlobalInitiated: %s, MaxJobsToStartAtOnce: %s",
+        20 - len(tracked),
+        len(available),
+        3,
+        10,
+    )
+    logging.debug(
+        "Job start calculation (min(tc_jobs_not_handled, max_jobs, available_devices_count)): min(%s, %s, %s) = %s",
+        20 - len(tracked),
+        10,
+        len(available),
+        10,
+    )
+    logging.info(
+        "%s TC Jobs: %4s, LT Devs Config/Active/Busy/Cleanup: %s/%s/0/0, RStarted/NeedH/TcQW/AvailW/ToStart: "
+        "%s/%s/0/%s/10",
+        HEADER,
+        20,
+        len(devices),
+        len(devices),
+        len(tracked),
+        20 - len(tracked),
+        len(available),
+    )
+
+
+class SlowStream:
+    def __init__(self, stream, write_latency):
+        self.stream = stream
+        self.write_latency = write_latency
+
+    def write(self, text):
+        if self.write_latency:
+            time.sleep(self.write_latency)
+        self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def time_cycles(cycle, level, use_queue, log_path, args, cycles, write_latency):
+    """Returns (microseconds per cycle on the calling thread, seconds until everything is written)."""
+    with open(log_path, "w") as log_file:
+        logging_setup.setup_logging(level, use_queue=use_queue, stream=SlowStream(log_file, write_latency))
+        start = time.perf_counter()
+        for _ in range(cycles):
+            cycle(*args)
+        calling_thread_seconds = time.perf_counter() - start
+        logging_setup.stop_logging()
+        written_seconds = time.perf_counter() - start
+    return calling_thread_seconds / cycles * 1e6, written_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the logging of a job starter cycle.")
+    parser.add_argument("--devices", type=int, default=60, help="Devices of the project (default: 60)")
+    parser.add_argument("--cycles", type=int, default=5000, help="Number of timed cycles (default: 5000)")
+    parser.add_argument(
+        "--write-latency", type=float, default=0, help="Seconds each write to the log waits (default: 0)"
+    )
+    args = parser.parse_args()
+
+    devices = ["R5CW%08d" % i for i in range(args.devices)]
+    tracked = devices[: args.devices // 4]
+    available = devices[args.devices // 4 :]
+    cycle_args = (devices, tracked, available)
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        log_path = os.path.join(log_dir, "benchmark.log")
+        print("devices: %d, cycles: %d, write latency: %.1fms" % (args.devices, args.cycles, args.write_latency * 1000))
+        for level in (logging.INFO, logging.DEBUG):
+            for name, cycle, use_queue in (("eager", eager_cycle, False), ("lazy", lazy_cycle, True)):
+                per_cycle_us, written_seconds = time_cycles(
+                    cycle, level, use_queue, log_path, cycle_args, args.cycles, args.write_latency
+                )
+                print(
+                    "  %-5s %-5s %8.1fus per cycle on the calling thread, all written after %.2fs"
+                    % (logging.getLevelName(level), name, per_cycle_us, written_seconds)
+                )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+# Times lt_run_cmd's batch runner against fake devices.
+#
+# run_on_device() is replaced by a stand-in that takes --job-seconds, so the result
+# reflects how the launches are scheduled. Two schedulers are compared:
+#   - serial: the previous loop, sleeping start_delay between submits on the
+#     collecting thread (nothing is collected until everything is submitted)
+#   - token bucket: run_cmd._run_batch(), pacing the launches with a TokenBucket
+#     while the results are collected, with --start-burst
+# Times are scaled down (a 10ms delay stands for lt_run_cmd's 1s default), the wall
+# clock time scales back up by the same factor.
+#
+# usage: python benchmarks/run_cmd_benchmark.py [--devices 500] [--start-delay 0.01] [--job-seconds 0.5]
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# before tqdm is imported, no progress bars
+os.environ["TQDM_DISABLE"] = "1"
+
+from mozilla_bitbar_devicepool.lambdatest import run_cmd  # noqa: E402
+
+
+def make_fake_run_on_device(job_seconds):
+    def fake_run_on_device(udid, *args):
+        time.sleep(job_seconds)
+        return (udid, "output", "ok")
+
+    return fake_run_on_device
+
+
+def run_serial(udids, max_parallel, start_delay, on_update):
+    """The previous _run_batch() scheduling."""
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        futures = {}
+        for i, udid in enumerate(udids):
+            if i > 0 and start_delay > 0:
+                time.sleep(start_delay)
+            futures[executor.submit(run_cmd.run_on_device, udid)] = udid
+        for future in as_completed(futures):
+            udid, output, status = future.result()
+            results[udid] = (output, status)
+            on_update(results)
+    return results
+
+
+def run_token_bucket(udids, max_parallel, start_delay, start_burst, on_update):
+    return run_cmd._run_batch(
+        udids,
+        "true",
+        "/nonexistent",
+        "/nonexistent",
+        max_parallel,
+        60,
+        60,
+        None,
+        start_delay=start_delay,
+        start_burst=start_burst,
+        on_update=on_update,
+    )
+
+
+def time_run(run):
+    """Returns (seconds to the first result, seconds to all results)."""
+    start = time.perf_counter()
+    first_result = []
+
+    def on_update(results):
+        if not first_result:
+            first_result.append(time.perf_counter() - start)
+
+    run(on_update)
+    return first_result[0], time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time lt_run_cmd's batch runner against fake devices.")
+    parser.add_argument("--devices", type=int, default=500, help="Number of fake devices (default: 500)")
+    parser.add_argument("--parallel", type=int, default=100, help="Max parallel jobs (default: 100)")
+    parser.add_argument("--start-delay", type=float, default=0.01, help="Seconds between launches (default: 0.01)")
+    parser.add_argument("--start-burst", type=int, default=20, help="Launches at once (default: 20)")
+    parser.add_argument("--job-seconds", type=float, default=0.5, help="Seconds each fake job takes (default: 0.5)")
+    args = parser.parse_args()
+
+    run_cmd.run_on_device = make_fake_run_on_device(args.job_seconds)
+    udids = ["R5CW%08d" % i for i in range(args.devices)]
+
+    print(
+        "devices: %d, parallel: %d, start delay: %.0fms, job: %.2fs"
+        % (args.devices, args.parallel, args.start_delay * 1000, args.job_seconds)
+    )
+    runs = (
+        ("serial", lambda on_update: run_serial(udids, args.parallel, args.start_delay, on_update)),
+        (
+            "token bucket, burst 1",
+            lambda on_update: run_token_bucket(udids, args.parallel, args.start_delay, 1, on_update),
+        ),
+        (
+            "token bucket, burst %d" % args.start_burst,
+            lambda on_update: run_token_bucket(udids, args.parallel, args.start_delay, args.start_burst, on_update),
+        ),
+    )
+    for name, run in runs:
+        first_result_seconds, total_seconds = time_run(run)
+        print("  %-24s first result after %6.2fs, all after %6.2fs" % (name, first_result_seconds, total_seconds))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,8 +6,9 @@
 
 cd /home/bitbar/mozilla-bitbar-devicepool
 
-# debugging
-/home/bitbar/.local/bin/poetry run mld start-test-run-manager --disable-logging-timestamps --log-level DEBUG
-
 # normal
-#/home/bitbar/.local/bin/poetry run mld start-test-run-manager --disable-logging-timestamps
+#   - the job starter decisions are kept by the flight recorder, dump them with `kill -USR1`
+/home/bitbar/.local/bin/poetry run mld start-test-run-manager --disable-logging-timestamps
+
+# debugging
+#/home/bitbar/.local/bin/poetry run mld start-test-run-manager --disable-logging-timestamps --log-level DEBUG
@@ -7,13 +7,11 @@
 
 import logging
 import os
+import threading
 
-# we need to run basicConfig before any other module does
-# TODO: put %(asctime)s back in?
-# TODO: move this to a separate module and do in main (won't need noqa below)
-logging.basicConfig(format="%(threadName)26s %(levelname)-8s %(message)s")
-
-from testdroid import Testdroid  # noqa: E402
+# logging is configured by each entry point (see main.py and logging_setup.py) and
+# testdroid is imported on first use, so the LambdaTest tools don't load the bitbar
+# client at all.
 
 logger = logging.getLogger()
 
@@ -21,7 +19,59 @@ modulepath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 TESTDROID_URL = os.environ.get("TESTDROID_URL")
 TESTDROID_APIKEY = os.environ.get("TESTDROID_APIKEY")
-if TESTDROID_URL and TESTDROID_APIKEY:
-    TESTDROID = Testdroid(apikey=TESTDROID_APIKEY, url=TESTDROID_URL)
-else:
-    TESTDROID = None
+
+_default_testdroid = []
+_default_testdroid_lock = threading.Lock()
+
+
+def get_default_testdroid():
+    """Return the Testdroid client for TESTDROID_URL and TESTDROID_APIKEY (None if unset).
+
+    Also available as DEFAULT_TESTDROID. The client is created on first use.
+    """
+    if not _default_testdroid:
+        with _default_testdroid_lock:
+            if not _default_testdroid:
+                if TESTDROID_URL and TESTDROID_APIKEY:
+                    from testdroid import Testdroid
+
+                    _default_testdroid.append(Testdroid(apikey=TESTDROID_APIKEY, url=TESTDROID_URL))
+                else:
+                    _default_testdroid.append(None)
+    return _default_testdroid[0]
+
+
+def __getattr__(name):
+    if name == "DEFAULT_TESTDROID":
+        return get_default_testdroid()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+_thread_testdroid = threading.local()
+
+
+def use_testdroid(testdroid):
+    """Make the calling thread's TESTDROID calls go to testdroid (None: DEFAULT_TESTDROID)."""
+    _thread_testdroid.client = testdroid
+
+
+def get_testdroid():
+    """Return the Testdroid client selected by the calling thread, see use_testdroid()."""
+    return getattr(_thread_testdroid, "client", None) or get_default_testdroid()
+
+
+class ThreadTestdroid(object):
+    """Forwards to the calling thread's Testdroid client.
+
+    One process can drive several bitbar servers, each from its own threads, while
+    the bitbar api modules keep calling the module level TESTDROID.
+    """
+
+    def __getattr__(self, name):
+        return getattr(get_testdroid(), name)
+
+    def __bool__(self):
+        return get_testdroid() is not None
+
+
+TESTDROID = ThreadTestdroid()
@@ -117,6 +117,41 @@ def get_offline_devices(device_model=None):
     return offline_devices
 
 
+def partition_offline_devices(device_problems, device_group_index, projects):
+    """Partition one device problems listing into the offline devices of each project.
+
+    :param device_problems: list of device problems as returned by get_device_problems().
+    :param device_group_index: dict mapping device name to the name of the device group
+                               it is configured in.
+    :param projects: dict mapping project name to a (device_group_name, device_model)
+                     tuple. device_model is the string prefix of device names to match
+                     as in get_device_problems().
+
+    Returns a dict mapping each project name to a list of its offline device names.
+
+    Examples:
+       partition_offline_devices(get_device_problems(), {'pixel5-01': 'pixel5-unit'},
+                                 {'mozilla-gw-unittest-p5': ('pixel5-unit', 'pixel5')})
+    """
+    projects_by_device_group = {}
+    for project_name, (device_group_name, device_model) in projects.items():
+        projects_by_device_group.setdefault(device_group_name, []).append((project_name, device_model))
+
+    offline_devices = {project_name: [] for project_name in projects}
+    for device_problem in device_problems:
+        device_name = device_problem["deviceModelName"]
+        device_group_name = device_group_index.get(device_name)
+        if device_group_name not in projects_by_device_group:
+            continue
+        if not any(problem["type"] == "OFFLINE" for problem in device_problem["problems"]):
+            continue
+        for project_name, device_model in projects_by_device_group[device_group_name]:
+            if device_model and not device_problem["deviceName"].startswith(device_model):
+                continue
+            offline_devices[project_name].append(device_name)
+    return offline_devices
+
+
 # main
 if __name__ == "__main__":
     import os
@@ -0,0 +1,77 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import threading
+import time
+from collections import deque
+
+
+class HostStartThrottle:
+    """
+    Limits the number of test run starts per Docker host in a sliding time window.
+
+    Bitbar picks the device, and so the Docker host, of a run from the device
+    group it is started on. acquire() therefore charges each start to the host,
+    among the hosts of the group's devices, with the most starts left in the
+    window. As long as Bitbar spreads a group's runs over its devices, no host
+    sees many more than max_starts starts per window.
+
+    Groups none of whose devices have a known host (e.g. before the first update)
+    are not throttled.
+    """
+
+    def __init__(self, max_starts, window_seconds=60):
+        """
+        Args:
+            max_starts (int): Maximum number of starts per host per window.
+            window_seconds (int): Length of the sliding window in seconds.
+        """
+        self.max_starts = max_starts
+        self.window_seconds = window_seconds
+        # device name -> docker host (bitbar's clusterName)
+        self.device_hosts = {}
+        # docker host -> deque of start times within the window
+        self.host_starts = {}
+        self.lock = threading.Lock()
+
+    def update_device_hosts(self, device_statuses):
+        """Replace the device to host index from a get_device_statuses() listing."""
+        device_hosts = {}
+        for device_status in device_statuses:
+            if device_status.get("clusterName"):
+                device_hosts[device_status["deviceName"]] = device_status["clusterName"]
+        self.device_hosts = device_hosts
+
+    def acquire(self, device_names, count):
+        """Reserve up to count starts on the hosts of device_names.
+
+        Returns:
+            int: The number of starts that may go ahead now (0 to count).
+        """
+        device_hosts = self.device_hosts
+        hosts = set()
+        for device_name in device_names:
+            if device_name in device_hosts:
+                hosts.add(device_hosts[device_name])
+        if not hosts:
+            # none of the devices can be placed, don't hold the group back
+            return count
+
+        now = time.time()
+        granted = 0
+        with self.lock:
+            remaining = {}
+            for host in hosts:
+                starts = self.host_starts.setdefault(host, deque())
+                while starts and starts[0] <= now - self.window_seconds:
+                    starts.popleft()
+                remaining[host] = self.max_starts - len(starts)
+            while granted < count:
+                host = max(sorted(remaining), key=lambda h: remaining[h])
+                if remaining[host] <= 0:
+                    break
+                remaining[host] -= 1
+                self.host_starts[host].append(now)
+                granted += 1
+        return granted
@@ -0,0 +1,135 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import logging
+import time
+
+from mozilla_bitbar_devicepool.bitbar.runs import (
+    get_active_test_runs,
+    get_updated_test_runs,
+)
+
+
+class RunTracker:
+    """
+    Keeps track of the active Bitbar test runs of each project.
+
+    The first poll, and every poll after full_sync_interval seconds, fetches all
+    active runs and replaces the tracked runs. The polls in between only fetch
+    the runs updated since the watermark of the previous poll and apply them to
+    the tracked runs, adjusting the per-project state counts as runs start,
+    change state and end.
+    """
+
+    def __init__(self, project_name_for_run, full_sync_interval=60, watermark_overlap_seconds=60):
+        """
+        Args:
+            project_name_for_run (callable): Returns the configured project name for a run,
+                or None if the run is not for a configured project.
+            full_sync_interval (int): Seconds between full fetches of the active runs.
+            watermark_overlap_seconds (int): Seconds subtracted from the watermark so that
+                runs updated while a poll is in flight, or under clock skew between us and
+                Bitbar, are fetched again by the next poll.
+        """
+        self.project_name_for_run = project_name_for_run
+        self.full_sync_interval = full_sync_interval
+        self.watermark_overlap_seconds = watermark_overlap_seconds
+        # run id -> run
+        self.runs = {}
+        # project name -> run id -> run
+        self.project_runs = {}
+        # project name -> run state -> count
+        self.project_state_counts = {}
+        # milliseconds since the epoch, as used by the Bitbar api
+        self.watermark = None
+        self.last_full_sync_time = None
+        self.logger = logging.getLogger(__name__)
+
+    def poll(self):
+        """Fetch the active runs, or the runs updated since the last poll, and apply them.
+
+        Returns:
+            set: Names of the projects whose runs changed.
+        """
+        now = time.time()
+        watermark = int((now - self.watermark_overlap_seconds) * 1000)
+        if self.last_full_sync_time is None or now - self.last_full_sync_time >= self.full_sync_interval:
+            changed_projects = self.full_sync(get_active_test_runs())
+            self.last_full_sync_time = now
+        else:
+            changed_projects = self.apply_updates(get_updated_test_runs(self.watermark))
+        self.watermark = watermark
+        return changed_projects
+
+    def full_sync(self, active_runs):
+        """Replace the tracked runs with active_runs.
+
+        Returns:
+            set: Names of the projects whose runs changed.
+        """
+        old_project_runs = self.project_runs
+        self.runs = {}
+        self.project_runs = {}
+        self.project_state_counts = {}
+        for run in active_runs:
+            self._add_run(run)
+
+        changed_projects = set()
+        for project_name in set(old_project_runs) | set(self.project_runs):
+            old_states = {run_id: run["state"] for run_id, run in old_project_runs.get(project_name, {}).items()}
+            new_states = {run_id: run["state"] for run_id, run in self.project_runs.get(project_name, {}).items()}
+            if old_states != new_states:
+                changed_projects.add(project_name)
+        if changed_projects:
+            self.logger.debug(f"full sync changed projects: {', '.join(sorted(changed_projects))}")
+        return changed_projects
+
+    def apply_updates(self, updated_runs):
+        """Apply runs that have been created, changed state or ended.
+
+        Returns:
+            set: Names of the projects whose runs changed.
+        """
+        changed_projects = set()
+        for run in updated_runs:
+            run_id = run["id"]
+            tracked_run = self.runs.get(run_id)
+            if tracked_run is not None:
+                if run.get("endTime") is None and tracked_run["state"] == run["state"]:
+                    # refresh the details, the counts are unchanged
+                    self._remove_run(run_id)
+                    self._add_run(run)
+                    continue
+                changed_projects.add(self._remove_run(run_id))
+            if run.get("endTime") is None:
+                project_name = self._add_run(run)
+                if project_name is not None:
+                    changed_projects.add(project_name)
+        changed_projects.discard(None)
+        return changed_projects
+
+    def get_runs(self, project_name):
+        """Return the list of active runs of a project."""
+        return list(self.project_runs.get(project_name, {}).values())
+
+    def get_state_count(self, project_name, state):
+        """Return the number of active runs of a project in state (e.g. 'RUNNING' or 'WAITING')."""
+        return self.project_state_counts.get(project_name, {}).get(state, 0)
+
+    def _add_run(self, run):
+        project_name = self.project_name_for_run(run)
+        if project_name is None:
+            return None
+        self.runs[run["id"]] = run
+        self.project_runs.setdefault(project_name, {})[run["id"]] = run
+        state_counts = self.project_state_counts.setdefault(project_name, {})
+        state_counts[run["state"]] = state_counts.get(run["state"], 0) + 1
+        return project_name
+
+    def _remove_run(self, run_id):
+        run = self.runs.pop(run_id)
+        project_name = self.project_name_for_run(run)
+        del self.project_runs[project_name][run_id]
+        self.project_state_counts[project_name][run["state"]] -= 1
+        return project_name
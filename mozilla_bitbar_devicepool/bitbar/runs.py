@@ -9,6 +9,9 @@ from mozilla_bitbar_devicepool import (
     configuration,
 )
 
+# (bitbar configuration, project name) -> (generation, json payload), see get_test_run_payload()
+TEST_RUN_PAYLOADS = {}
+
 
 def run_test_with_configuration(test_configuration):
     """Run a test on demand with full configuration.
@@ -16,18 +19,45 @@ def run_test_with_configuration(test_configuration):
     Examples:
        run_test_with_configuration(test_configuration)
     """
+    return run_test_with_payload(json.dumps(test_configuration))
+
+
+def run_test_with_payload(payload):
+    """Run a test on demand with a json encoded test configuration."""
 
     response = TESTDROID.post(
         path="runs",
-        payload=json.dumps(test_configuration),
+        payload=payload,
         headers={"Content-type": "application/json", "Accept": "application/json"},
     )
     return response
 
 
+def get_test_run_payload(project_name):
+    """Return the json encoded test configuration for a project.
+
+    The payload is built once and reused until the generation of the calling
+    thread's bitbar configuration changes, i.e. until the configuration or a
+    cached bitbar id changes.
+    """
+    bitbar_configuration = configuration.current()
+    generation = bitbar_configuration.generation
+    cached = TEST_RUN_PAYLOADS.get((bitbar_configuration, project_name))
+    if cached is not None and cached[0] == generation:
+        return cached[1]
+    payload = json.dumps(get_test_configuration(project_name))
+    TEST_RUN_PAYLOADS[(bitbar_configuration, project_name)] = (generation, payload)
+    return payload
+
+
 def run_test_for_project(project_name):
-    CACHE = configuration.BITBAR_CACHE
-    CONFIG = configuration.CONFIG
+    return run_test_with_payload(get_test_run_payload(project_name))
+
+
+def get_test_configuration(project_name):
+    bitbar_configuration = configuration.current()
+    CACHE = bitbar_configuration.bitbar_cache
+    CONFIG = bitbar_configuration.config
 
     bitbar_test_file = None
     bitbar_application_file = None
@@ -58,7 +88,7 @@ def run_test_for_project(project_name):
         parameter_value = additional_parameters[parameter_name]
         test_configuration["testRunParameters"].append({"key": parameter_name, "value": parameter_value})
 
-    return run_test_with_configuration(test_configuration)
+    return test_configuration
 
 
 def get_test_run(project_id, test_run_id):
@@ -93,6 +123,15 @@ def get_active_test_runs(**kwargs):
     return response["data"]
 
 
+def get_updated_test_runs(update_time_after):
+    """Gets test runs, active or ended, updated after update_time_after.
+
+    :param update_time_after: integer milliseconds since the epoch.
+    """
+    response = TESTDROID.get("api/v2/admin/runs?filter=d_updateTime_after_{}&limit=0".format(update_time_after))
+    return response["data"]
+
+
 if __name__ == "__main__":
     import pprint
 
@@ -0,0 +1,67 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import time
+
+
+class StaleRunJanitor:
+    """
+    Selects WAITING test runs to abort because no task will ever pick them up.
+
+    A run is stale when it has been WAITING for more than max_waiting_seconds while
+    its project's Taskcluster queue has no pending tasks. Such runs count against
+    the 'jobs to start' calculation of their project without doing any work.
+
+    At most batch_size runs, oldest first, are selected per call so a burst of
+    aborts can't overload Bitbar. Runs already selected are not selected again
+    while they are still tracked (the abort takes a poll or two to show up).
+    """
+
+    def __init__(self, max_waiting_seconds, batch_size=5):
+        """
+        Args:
+            max_waiting_seconds (int): Seconds a run may be WAITING before it is stale.
+            batch_size (int): Maximum number of runs selected per call.
+        """
+        self.max_waiting_seconds = max_waiting_seconds
+        self.batch_size = batch_size
+        # run id -> time the run was selected
+        self.selected = {}
+
+    def select(self, project_runs, pending_tasks, now=None):
+        """Return up to batch_size stale runs as (project name, run, reason) tuples.
+
+        Args:
+            project_runs (dict): project name -> list of active runs (with 'id', 'state'
+                and 'createTime' in milliseconds since the epoch).
+            pending_tasks (dict): project name -> number of pending Taskcluster tasks.
+        """
+        if now is None:
+            now = time.time()
+        active_run_ids = set()
+        candidates = []
+        for project_name, runs in project_runs.items():
+            for run in runs:
+                active_run_ids.add(run["id"])
+                if run["state"] != "WAITING" or run["id"] in self.selected or run.get("createTime") is None:
+                    continue
+                if pending_tasks.get(project_name, 0) > 0:
+                    continue
+                waiting_seconds = now - run["createTime"] / 1000
+                if waiting_seconds > self.max_waiting_seconds:
+                    candidates.append((waiting_seconds, project_name, run))
+
+        # forget runs that have ended
+        for run_id in list(self.selected):
+            if run_id not in active_run_ids:
+                del self.selected[run_id]
+
+        stale_runs = []
+        for waiting_seconds, project_name, run in sorted(candidates, key=lambda c: (-c[0], c[2]["id"])):
+            if len(stale_runs) >= self.batch_size:
+                break
+            self.selected[run["id"]] = now
+            reason = "WAITING for {}s with no pending tasks".format(int(waiting_seconds))
+            stale_runs.append((project_name, run, reason))
+        return stale_runs
@@ -14,7 +14,9 @@ def main():
     status_client = status.Status(lt_username, lt_api_key)
 
     # get the config
-    clt = configuration_lt.ConfigurationLt()
+    clt = configuration_lt.ConfigurationLt(
+        require_hyperexecute=False, compiled_config_cache=configuration_lt.DEFAULT_COMPILED_CONFIG_CACHE
+    )
     clt.configure()
     config = clt.get_config()
     # pprint.pprint(config)
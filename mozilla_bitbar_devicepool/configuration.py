@@ -2,14 +2,25 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this file,
 # You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import hashlib
+import json
 import os
 import sys
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
+import requests
 import yaml
-
-from mozilla_bitbar_devicepool import TESTDROID, logger
+from testdroid import RequestResponseError, Testdroid
+
+from mozilla_bitbar_devicepool import (
+    DEFAULT_TESTDROID,
+    TESTDROID,
+    TESTDROID_URL,
+    logger,
+    use_testdroid,
+)
 from mozilla_bitbar_devicepool.bitbar.device_groups import (
     add_devices_to_device_group,
     create_device_group,
@@ -27,18 +38,32 @@ from mozilla_bitbar_devicepool.bitbar.projects import (
 )
 from mozilla_bitbar_devicepool.util.template import apply_dict_defaults
 
-BITBAR_CACHE = {
-    "device_groups": {},
-    "devices": {},
-    "files": {},
-    "frameworks": {},
-    "me": {},
-    "projects": {},
-    "test_runs": {},
+# upper bound on concurrent bitbar api requests made by configure()
+CONFIGURE_MAX_WORKERS = 8
+
+# BITBAR_CACHE entries persisted by save_bitbar_cache() for warm restarts.
+# 'lock' and 'stats' are added to each project at runtime and are not persisted.
+PERSISTED_CACHE_KEYS = ("device_groups", "devices", "files", "frameworks", "me", "projects")
+PROJECT_RUNTIME_KEYS = ("lock", "stats")
+
+# environment variables holding the bitbar server url and api key, unless
+# overridden by devicepool_config.testdroid_url_env and testdroid_apikey_env.
+DEFAULT_TESTDROID_URL_ENV = "TESTDROID_URL"
+DEFAULT_TESTDROID_APIKEY_ENV = "TESTDROID_APIKEY"
+
+# module level names of the state that now lives on BitbarConfiguration, see __getattr__()
+LEGACY_ATTRIBUTES = {
+    "BITBAR_CACHE": "bitbar_cache",
+    "BITBAR_CACHE_GENERATION": "generation",
+    "BITBAR_CACHE_HASH": "cache_hash",
+    "BITBAR_CACHE_PATH": "cache_path",
+    "CONFIG": "config",
+    "FILESPATH": "filespath",
+    "UNVALIDATED_ENTRIES": "unvalidated_entries",
+    "UPDATE_BITBAR": "update_bitbar",
 }
 
-FILESPATH = None
-CONFIG = None
+_thread_configuration = threading.local()
 
 
 class ConfigurationException(Exception):
@@ -61,20 +86,8 @@ class DuplicateProjectException(ConfigurationException):
     pass
 
 
-def get_filespath():
-    """Return files path where application and test files are kept."""
-    return FILESPATH
-
-
-def get_me_id():
-    """Returns the Bitbar User ID that the application is using."""
-
-    if BITBAR_CACHE["me"] == {}:
-        BITBAR_CACHE["me"] = TESTDROID.get_me()
-    # use 'id'
-    # - not 'mainUserId' (user's can create sub-users)
-    # - not 'accountId' (the organization's id))
-    return BITBAR_CACHE["me"]["id"]
+class BitbarCacheException(ConfigurationException):
+    pass
 
 
 def ensure_filenames_are_unique(config):
@@ -94,114 +107,288 @@ def ensure_filenames_are_unique(config):
     return seen_filenames
 
 
-def configure(bitbar_configpath, filespath=None, update_bitbar=False):
-    """Parse and load the configuration yaml file
-    defining the Mozilla Bitbar test setup.
+def index_by_name(items, key):
+    """Return a dict mapping each item's key value to the list of items with that value.
 
-    :param bitbar_configpath: string path to the config.yml
-                              containing the Mozilla Bitbar
-                              configuration.
-    :param filespath: string path to the files directory where
-                      application and test files are kept.
+    Lists keep the order of items, so for files (sorted by createTime ascending)
+    the newest file with a given name is last.
     """
-    global CONFIG, FILESPATH
+    index = {}
+    for item in items:
+        index.setdefault(item[key], []).append(item)
+    return index
 
-    FILESPATH = filespath
 
-    logger.info("configure: starting configuration")
-    start = time.time()
+def run_concurrently(func, items):
+    """Call func on each item using a bounded thread pool.
 
-    with open(bitbar_configpath) as bitbar_configfile:
-        CONFIG = yaml.load(bitbar_configfile.read(), Loader=yaml.SafeLoader)
-    logger.info("configure: performing checks")
-    try:
-        ensure_filenames_are_unique(CONFIG)
-    except ConfigurationFileException as e:
-        logger.warning(e.message)
-        sys.exit(1)
-    expand_configuration()
-    try:
-        configuration_preflight()
-    except ConfigurationFileException as e:
-        logger.warning(e)
-        logger.warning("Configuration files seem to be missing! Please place and restart. Exiting...")
-        sys.exit(1)
-    configure_device_groups(update_bitbar=update_bitbar)
-    configure_projects(update_bitbar=update_bitbar)
+    The calls use the calling thread's bitbar configuration, see use().
 
-    if not CONFIG.get("devicepool_config", {}).get("jobs_to_start_algorithm", None):
-        CONFIG.setdefault("devicepool_config", {})["jobs_to_start_algorithm"] = "v2"
-        logger.info("configure: 'jobs_to_start_algorithm' not set, defaulting to 'v2'")
-    logger.info(f"jobs_to_start_algorithm: {CONFIG['devicepool_config']['jobs_to_start_algorithm']}")
+    Returns a list of results in the order of items. The first exception raised
+    by a call is re-raised once all calls have finished.
+    """
+    items = list(items)
+    if not items:
+        return []
+    with ThreadPoolExecutor(
+        max_workers=min(CONFIGURE_MAX_WORKERS, len(items)), initializer=use, initargs=(current(),)
+    ) as executor:
+        return list(executor.map(func, items))
 
-    end = time.time()
-    diff = end - start
-    logger.info("configure: configuration took {} seconds".format(diff))
 
+def use(bitbar_configuration):
+    """Make bitbar_configuration, and its Testdroid client, the calling thread's configuration.
 
-def expand_configuration():
-    """Materializes the configuration. Sets default values when none are specified."""
-    projects_config = CONFIG["projects"]
-    project_defaults = projects_config["defaults"]
+    Threads working for a bitbar server call this first, so the module level
+    functions below and the bitbar api modules act on that server. None selects
+    DEFAULT_CONFIGURATION.
+    """
+    _thread_configuration.configuration = bitbar_configuration
+    use_testdroid(bitbar_configuration.testdroid if bitbar_configuration else None)
 
-    for project_name in projects_config:
-        if project_name == "defaults":
-            continue
 
-        project_config = projects_config[project_name]
-        # Set the default project values.
-        projects_config[project_name] = apply_dict_defaults(project_config, project_defaults)
+def current():
+    """Return the calling thread's bitbar configuration, see use()."""
+    return getattr(_thread_configuration, "configuration", None) or DEFAULT_CONFIGURATION
 
-    # TODO: remove 'defaults' from CONFIG['projects']?
-    #   - would save later code from having to exclude it
 
+def __getattr__(name):
+    # configuration.CONFIG, configuration.BITBAR_CACHE, ... refer to the calling thread's configuration
+    if name in LEGACY_ATTRIBUTES:
+        return getattr(current(), LEGACY_ATTRIBUTES[name])
+    raise AttributeError("module {} has no attribute {}".format(__name__, name))
 
-def configuration_preflight():
-    """Ensure that everything necessary for configuration is present."""
-    projects_config = CONFIG["projects"]
 
-    for project_name in projects_config:
-        if project_name == "defaults":
-            continue
+class BitbarConfiguration(object):
+    """The configuration and cached bitbar entities of one bitbar server.
 
-        project_config = projects_config[project_name]
-        file_name = project_config.get("test_file")
-        if file_name:
-            file_path = os.path.join(FILESPATH, file_name)
-            if not os.path.exists(file_path):
-                raise ConfigurationFileException("'%s' does not exist!" % file_path)
+    Each bitbar server a test run manager drives has its own instance, with its
+    own config.yml, BITBAR_CACHE and Testdroid client.
+    """
 
-        file_name = project_config.get("application_file")
-        if file_name:
-            file_path = os.path.join(FILESPATH, file_name)
-            if not os.path.exists(file_path):
-                raise ConfigurationFileException("'%s' does not exist!" % file_path)
+    def __init__(self, name="default", testdroid=None, testdroid_url=None):
+        """
+        Args:
+            name (str): Name of the bitbar server, used in logs and thread names.
+            testdroid (Testdroid): Client for the bitbar server. If None, configure()
+                creates it from the environment, see configure_testdroid().
+            testdroid_url (str): Url of the bitbar server testdroid connects to.
+        """
+        self.name = name
+        self.testdroid = testdroid
+        self.testdroid_url = testdroid_url
+        self.bitbar_cache = {
+            "device_groups": {},
+            "devices": {},
+            "files": {},
+            "frameworks": {},
+            "me": {},
+            "projects": {},
+            "test_runs": {},
+        }
+        self.config = None
+        self.filespath = None
+        self.update_bitbar = False
+        self.cache_path = None
+        self.cache_hash = None
+        # (cache key, name) entries loaded from the persisted cache that have not been
+        # checked against bitbar yet, see validate_cached_entry().
+        self.unvalidated_entries = set()
+        self.cache_lock = threading.Lock()
+        self.entry_locks = {}
+        # incremented whenever config or the ids in bitbar_cache change, so values derived
+        # from them (e.g. the run payloads in bitbar/runs.py) can tell they are stale.
+        self.generation = 0
+
+    def __repr__(self):
+        return "BitbarConfiguration({!r}, testdroid_url={!r})".format(self.name, self.testdroid_url)
+
+    def get_filespath(self):
+        """Return files path where application and test files are kept."""
+        return self.filespath
+
+    def get_me_id(self):
+        """Returns the Bitbar User ID that the application is using."""
+
+        if self.bitbar_cache["me"] == {}:
+            self.bitbar_cache["me"] = TESTDROID.get_me()
+        # use 'id'
+        # - not 'mainUserId' (user's can create sub-users)
+        # - not 'accountId' (the organization's id))
+        return self.bitbar_cache["me"]["id"]
+
+    def configure(self, bitbar_configpath, filespath=None, update_bitbar=False, cache_path=None):
+        """Parse and load the configuration yaml file
+        defining the Mozilla Bitbar test setup.
+
+        The calling thread uses this configuration afterwards, see use().
+
+        :param bitbar_configpath: string path to the config.yml
+                                  containing the Mozilla Bitbar
+                                  configuration.
+        :param filespath: string path to the files directory where
+                          application and test files are kept.
+        :param cache_path: string path to a file where the bitbar ids are
+                           persisted between runs. If the file was written for
+                           the same config.yml, the cached ids are used instead
+                           of querying bitbar and are validated on first use.
+        """
+        self.filespath = filespath
+        self.update_bitbar = update_bitbar
+        self.generation += 1
+
+        logger.info("configure: starting configuration")
+        start = time.time()
+
+        with open(bitbar_configpath) as bitbar_configfile:
+            self.config = yaml.load(bitbar_configfile.read(), Loader=yaml.SafeLoader)
+        self.configure_testdroid()
+        use(self)
+        logger.info("configure: performing checks")
+        try:
+            ensure_filenames_are_unique(self.config)
+        except ConfigurationFileException as e:
+            logger.warning(e.message)
+            sys.exit(1)
+        self.expand_configuration()
+        try:
+            self.configuration_preflight()
+        except ConfigurationFileException as e:
+            logger.warning(e)
+            logger.warning("Configuration files seem to be missing! Please place and restart. Exiting...")
+            sys.exit(1)
+        if not self.configure_from_bitbar_cache(bitbar_configpath, cache_path, update_bitbar=update_bitbar):
+            self.configure_device_groups(update_bitbar=update_bitbar)
+            self.configure_projects(update_bitbar=update_bitbar)
+            self.save_bitbar_cache()
+        self.configure_project_state()
+
+        if not self.config.get("devicepool_config", {}).get("jobs_to_start_algorithm", None):
+            self.config.setdefault("devicepool_config", {})["jobs_to_start_algorithm"] = "v2"
+            logger.info("configure: 'jobs_to_start_algorithm' not set, defaulting to 'v2'")
+        logger.info(f"jobs_to_start_algorithm: {self.config['devicepool_config']['jobs_to_start_algorithm']}")
+
+        end = time.time()
+        diff = end - start
+        logger.info("configure: configuration took {} seconds".format(diff))
+
+    def configure_testdroid(self):
+        """Create the Testdroid client unless one was passed in.
+
+        The url and api key are read from the environment variables named by
+        devicepool_config.testdroid_url_env and testdroid_apikey_env, which default
+        to TESTDROID_URL and TESTDROID_APIKEY.
+
+        Raises ConfigurationException if the environment variables are not set.
+        """
+        if self.testdroid:
+            return
+        devicepool_config = self.config.get("devicepool_config") or {}
+        url_env = devicepool_config.get("testdroid_url_env", DEFAULT_TESTDROID_URL_ENV)
+        apikey_env = devicepool_config.get("testdroid_apikey_env", DEFAULT_TESTDROID_APIKEY_ENV)
+        if (url_env, apikey_env) == (DEFAULT_TESTDROID_URL_ENV, DEFAULT_TESTDROID_APIKEY_ENV) and DEFAULT_TESTDROID:
+            self.testdroid = DEFAULT_TESTDROID
+            self.testdroid_url = TESTDROID_URL
+            return
+        url = os.environ.get(url_env)
+        apikey = os.environ.get(apikey_env)
+        if not (url and apikey):
+            raise ConfigurationException(
+                "The environment variables {}, {} both need to be set for {}.".format(url_env, apikey_env, self.name)
+            )
+        self.testdroid = Testdroid(apikey=apikey, url=url)
+        self.testdroid_url = url
+
+    def expand_configuration(self):
+        """Materializes the configuration. Sets default values when none are specified."""
+        projects_config = self.config["projects"]
+        project_defaults = projects_config["defaults"]
+
+        for project_name in projects_config:
+            if project_name == "defaults":
+                continue
+
+            project_config = projects_config[project_name]
+            # Set the default project values.
+            projects_config[project_name] = apply_dict_defaults(project_config, project_defaults)
+
+        # TODO: remove 'defaults' from CONFIG['projects']?
+        #   - would save later code from having to exclude it
+
+    def configuration_preflight(self):
+        """Ensure that everything necessary for configuration is present."""
+        projects_config = self.config["projects"]
+
+        for project_name in projects_config:
+            if project_name == "defaults":
+                continue
+
+            project_config = projects_config[project_name]
+            file_name = project_config.get("test_file")
+            if file_name:
+                file_path = os.path.join(self.filespath, file_name)
+                if not os.path.exists(file_path):
+                    raise ConfigurationFileException("'%s' does not exist!" % file_path)
+
+            file_name = project_config.get("application_file")
+            if file_name:
+                file_path = os.path.join(self.filespath, file_name)
+                if not os.path.exists(file_path):
+                    raise ConfigurationFileException("'%s' does not exist!" % file_path)
+
+    def configure_device_groups(self, update_bitbar=False):
+        """Configure device groups from configuration.
+
+        :param config: parsed yaml configuration containing
+                       a device_groups attribute which contains
+                       and object for each device group which contains
+                       objects for each contained device.
+
+        All devices and device groups are fetched with one request each and
+        indexed by name. Each device group is then synced in its own thread.
+        """
+        # Cache the bitbar device data in the configuration.
+        devices_cache = self.bitbar_cache["devices"] = {}
+        for device in get_devices():
+            devices_cache[device["displayName"]] = device
+
+        bitbar_device_groups_by_name = index_by_name(get_device_groups(), "displayName")
+
+        device_groups_config = self.config["device_groups"]
+        for device_group_name in device_groups_config:
+            if device_groups_config[device_group_name] is None:
+                # Handle the case where the configured device group is empty.
+                device_groups_config[device_group_name] = {}
+
+        def configure_device_group(device_group_name):
+            return self.configure_device_group_devices(
+                device_group_name,
+                bitbar_device_groups_by_name.get(device_group_name, []),
+                devices_cache,
+                update_bitbar=update_bitbar,
+            )
 
+        device_group_names = list(device_groups_config)
+        for device_group_name, bitbar_device_group in zip(
+            device_group_names, run_concurrently(configure_device_group, device_group_names)
+        ):
+            self.bitbar_cache["device_groups"][device_group_name] = bitbar_device_group
 
-def configure_device_groups(update_bitbar=False):
-    """Configure device groups from configuration.
+    def configure_device_group_devices(
+        self, device_group_name, bitbar_device_groups, devices_cache, update_bitbar=False
+    ):
+        """Sync a single device group at bitbar with the configuration.
 
-    :param config: parsed yaml configuration containing
-                   a device_groups attribute which contains
-                   and object for each device group which contains
-                   objects for each contained device.
-    """
-    # Cache the bitbar device data in the configuration.
-    devices_cache = BITBAR_CACHE["devices"] = {}
-    for device in get_devices():
-        devices_cache[device["displayName"]] = device
+        :param device_group_name: name of the device group in the configuration.
+        :param bitbar_device_groups: list of bitbar device groups with this name.
+        :param devices_cache: dict of bitbar devices by display name.
 
-    device_groups_config = CONFIG["device_groups"]
-    for device_group_name in device_groups_config:
+        Returns the bitbar device group.
+        """
         logger.info("configure_device_groups: configuring group {}".format(device_group_name))
-        device_group_config = device_groups_config[device_group_name]
-        if device_group_config is None:
-            # Handle the case where the configured device group is empty.
-            device_group_config = device_groups_config[device_group_name] = {}
-        new_device_group_names = set(device_group_config.keys())
+        new_device_group_names = set(self.config["device_groups"][device_group_name].keys())
 
         # get the current definition of the device group at bitbar.
-        bitbar_device_groups = get_device_groups(displayname=device_group_name)
         if len(bitbar_device_groups) > 1:
             raise Exception(
                 "device group {} has {} duplicates".format(device_group_name, len(bitbar_device_groups) - 1)
@@ -257,42 +444,136 @@ def configure_device_groups(update_bitbar=False):
                     )
                 )
 
-        BITBAR_CACHE["device_groups"][device_group_name] = bitbar_device_group
-
-
-def configure_projects(update_bitbar=False):
-    """Configure projects from configuration.
-
-    :param config: parsed yaml configuration containing
-                   a projects attribute which contains
-                   and object for each project.
+        return bitbar_device_group
+
+    def configure_files(self, update_bitbar=False):
+        """Resolve the bitbar file for every application_file and test_file in the configuration.
+
+        All files are fetched with one request and indexed by name. Missing files
+        are uploaded concurrently. Files are resolved once even when several
+        projects share them (e.g. via defaults).
+        """
+        projects_config = self.config["projects"]
+        file_names = set()
+        for project_name in projects_config:
+            if project_name == "defaults":
+                continue
+            for file_key in ("test_file", "application_file"):
+                file_name = projects_config[project_name].get(file_key)
+                if file_name:
+                    file_names.add(file_name)
+
+        bitbar_files_by_name = index_by_name(get_files(), "name")
+
+        def configure_file(file_name):
+            logger.info("configure_files: configuring {}".format(file_name))
+            bitbar_files = bitbar_files_by_name.get(file_name, [])
+            if len(bitbar_files) > 0:
+                return bitbar_files[-1]
+            if update_bitbar:
+                TESTDROID.upload_file(os.path.join(self.filespath, file_name))
+                return get_files(name=file_name)[-1]
+            raise Exception("File {} not found and not configured to update bitbar configuration!".format(file_name))
 
-    CONFIG['projects']['defaults'] contains values which will be set
-    on the other projects if they are not already explicitly set.
+        file_names = sorted(file_names)
+        for file_name, bitbar_file in zip(file_names, run_concurrently(configure_file, file_names)):
+            self.bitbar_cache["files"][file_name] = bitbar_file
 
-    """
-    projects_config = CONFIG["projects"]
+    def configure_projects(self, update_bitbar=False):
+        """Configure projects from configuration.
 
-    project_total = len(projects_config)
-    counter = 0
-    for project_name in projects_config:
-        counter += 1
-        log_header = "configure_projects: {} ({}/{})".format(project_name, counter, project_total)
+        :param config: parsed yaml configuration containing
+                       a projects attribute which contains
+                       and object for each project.
 
-        if project_name == "defaults":
-            logger.info("{}: skipping".format(log_header))
-            continue
-        logger.info("{}: configuring...".format(log_header))
+        CONFIG['projects']['defaults'] contains values which will be set
+        on the other projects if they are not already explicitly set.
 
-        project_config = projects_config[project_name]
+        Projects, frameworks and files are each fetched with one request and
+        indexed by name. Projects that need to be created or updated are
+        handled concurrently.
+        """
+        projects_config = self.config["projects"]
 
         # for the project name at bitbar, add user id to the project_name
         # - prevents collision with other users' projects and allows us to
         #   avoid having to share projects
-        api_user_id = get_me_id()
-        user_project_name = "%s-%s" % (api_user_id, project_name)
+        api_user_id = self.get_me_id()
+
+        bitbar_projects_by_name = index_by_name(get_projects(), "name")
+        bitbar_frameworks_by_name = index_by_name(get_frameworks(), "name")
+        self.configure_files(update_bitbar=update_bitbar)
+
+        project_names = [project_name for project_name in projects_config if project_name != "defaults"]
+        project_total = len(project_names)
+
+        def configure_project(counter_and_project_name):
+            counter, project_name = counter_and_project_name
+            log_header = "configure_projects: {} ({}/{})".format(project_name, counter, project_total)
+            logger.info("{}: configuring...".format(log_header))
+            user_project_name = "%s-%s" % (api_user_id, project_name)
+            return self.configure_project_entity(
+                project_name,
+                user_project_name,
+                bitbar_projects_by_name.get(user_project_name, []),
+                update_bitbar=update_bitbar,
+            )
+
+        bitbar_projects = run_concurrently(configure_project, enumerate(project_names, start=1))
+
+        for project_name, bitbar_project in zip(project_names, bitbar_projects):
+            framework_name = projects_config[project_name]["framework_name"]
+            self.bitbar_cache["frameworks"][framework_name] = bitbar_frameworks_by_name[framework_name][0]
+            self.bitbar_cache["projects"][project_name] = bitbar_project
+
+    def configure_project_state(self):
+        """Set up the runtime state of each configured project.
+
+        Adds the Taskcluster access tokens to the project parameters and the
+        lock and stats to each cached bitbar project.
+        """
+        projects_config = self.config["projects"]
+        for project_name in projects_config:
+            if project_name == "defaults":
+                continue
+            project_config = projects_config[project_name]
+
+            additional_parameters = project_config["additional_parameters"]
+            if "TC_WORKER_TYPE" in additional_parameters:
+                # Add the TASKCLUSTER_ACCESS_TOKEN from the environment to
+                # the additional_parameters in order that the bitbar
+                # projects may be configured to use it. Non-taskcluster
+                # projects such as mozilla-docker-build are not invoke by
+                # Taskcluster currently.
+                taskcluster_access_token_name = additional_parameters["TC_WORKER_TYPE"].replace("-", "_")
+                additional_parameters["TASKCLUSTER_ACCESS_TOKEN"] = os.environ[taskcluster_access_token_name]
+
+            self.bitbar_cache["projects"][project_name]["lock"] = threading.Lock()
+
+            device_group_name = project_config["device_group_name"]
+            device_group = self.bitbar_cache["device_groups"][device_group_name]
+
+            self.bitbar_cache["projects"][project_name]["stats"] = {
+                "COUNT": device_group["deviceCount"],
+                "IDLE": 0,
+                "OFFLINE_DEVICES": 0,
+                "OFFLINE": 0,
+                "DISABLED": 0,
+                "RUNNING": 0,
+                "WAITING": 0,
+            }
+
+    def configure_project_entity(self, project_name, user_project_name, bitbar_projects, update_bitbar=False):
+        """Create or update a single project at bitbar to match the configuration.
+
+        :param project_name: name of the project in the configuration.
+        :param user_project_name: name of the project at bitbar.
+        :param bitbar_projects: list of bitbar projects named user_project_name.
+
+        Returns the bitbar project.
+        """
+        project_config = self.config["projects"][project_name]
 
-        bitbar_projects = get_projects(name=user_project_name)
         if len(bitbar_projects) > 1:
             raise DuplicateProjectException(
                 "project {} ({}) has {} duplicates".format(project_name, user_project_name, len(bitbar_projects) - 1)
@@ -311,43 +592,6 @@ def configure_projects(update_bitbar=False):
                     )
                 )
 
-        framework_name = project_config["framework_name"]
-        BITBAR_CACHE["frameworks"][framework_name] = get_frameworks(name=framework_name)[0]
-
-        logger.info("{}: configuring test file".format(log_header))
-        file_name = project_config.get("test_file")
-        if file_name:
-            bitbar_files = get_files(name=file_name)
-            if len(bitbar_files) > 0:
-                bitbar_file = bitbar_files[-1]
-            else:
-                if update_bitbar:
-                    TESTDROID.upload_file(os.path.join(FILESPATH, file_name))
-                    bitbar_file = get_files(name=file_name)[-1]
-                else:
-                    raise Exception(
-                        "Test file {} not found and not configured to update bitbar configuration!".format(file_name)
-                    )
-            BITBAR_CACHE["files"][file_name] = bitbar_file
-
-        logger.info("{}: configuring application file".format(log_header))
-        file_name = project_config.get("application_file")
-        if file_name:
-            bitbar_files = get_files(name=file_name)
-            if len(bitbar_files) > 0:
-                bitbar_file = bitbar_files[-1]
-            else:
-                if update_bitbar:
-                    TESTDROID.upload_file(os.path.join(FILESPATH, file_name))
-                    bitbar_file = get_files(name=file_name)[-1]
-                else:
-                    raise Exception(
-                        "Application file {} not found and not configured to update bitbar configuration!".format(
-                            file_name
-                        )
-                    )
-            BITBAR_CACHE["files"][file_name] = bitbar_file
-
         # Sync the base project properties if they have changed.
         if (
             project_config["archivingStrategy"] != bitbar_project["archivingStrategy"]
@@ -387,28 +631,282 @@ def configure_projects(update_bitbar=False):
                     )
                 )
 
-        additional_parameters = project_config["additional_parameters"]
-        if "TC_WORKER_TYPE" in additional_parameters:
-            # Add the TASKCLUSTER_ACCESS_TOKEN from the environment to
-            # the additional_parameters in order that the bitbar
-            # projects may be configured to use it. Non-taskcluster
-            # projects such as mozilla-docker-build are not invoke by
-            # Taskcluster currently.
-            taskcluster_access_token_name = additional_parameters["TC_WORKER_TYPE"].replace("-", "_")
-            additional_parameters["TASKCLUSTER_ACCESS_TOKEN"] = os.environ[taskcluster_access_token_name]
-
-        BITBAR_CACHE["projects"][project_name] = bitbar_project
-        BITBAR_CACHE["projects"][project_name]["lock"] = threading.Lock()
-
-        device_group_name = project_config["device_group_name"]
-        device_group = BITBAR_CACHE["device_groups"][device_group_name]
-
-        BITBAR_CACHE["projects"][project_name]["stats"] = {
-            "COUNT": device_group["deviceCount"],
-            "IDLE": 0,
-            "OFFLINE_DEVICES": 0,
-            "OFFLINE": 0,
-            "DISABLED": 0,
-            "RUNNING": 0,
-            "WAITING": 0,
-        }
+        return bitbar_project
+
+    def get_config_hash(self, bitbar_configpath):
+        """Return the sha256 hex digest identifying config.yml and the bitbar server it is used with."""
+        digest = hashlib.sha256()
+        with open(bitbar_configpath, "rb") as bitbar_configfile:
+            digest.update(bitbar_configfile.read())
+        digest.update((self.testdroid_url or "").encode("utf-8"))
+        return digest.hexdigest()
+
+    def get_project_cache_entries(self, project_name):
+        """Return the (cache key, name) bitbar_cache entries a project's test runs depend on."""
+        project_config = self.config["projects"][project_name]
+        entries = [
+            ("projects", project_name),
+            ("frameworks", project_config["framework_name"]),
+            ("device_groups", project_config["device_group_name"]),
+        ]
+        for file_key in ("test_file", "application_file"):
+            if file_key in project_config:
+                entries.append(("files", project_config[file_key]))
+        return entries
+
+    def resolve_cache_entry(self, key, name):
+        """Look up the current bitbar entity for a single bitbar_cache entry.
+
+        Unlike configure(), this never modifies bitbar and raises if the entity
+        no longer matches the configuration.
+        """
+        if key == "device_groups":
+            return self.configure_device_group_devices(
+                name, get_device_groups(displayname=name), self.bitbar_cache["devices"]
+            )
+        if key == "files":
+            bitbar_files = get_files(name=name)
+            if not bitbar_files:
+                raise BitbarCacheException("file {} not found".format(name))
+            return bitbar_files[-1]
+        if key == "frameworks":
+            bitbar_frameworks = get_frameworks(name=name)
+            if not bitbar_frameworks:
+                raise BitbarCacheException("framework {} not found".format(name))
+            return bitbar_frameworks[0]
+        if key == "projects":
+            user_project_name = "%s-%s" % (self.get_me_id(), name)
+            return self.configure_project_entity(name, user_project_name, get_projects(name=user_project_name))
+        raise ValueError("unknown cache key {}".format(key))
+
+    def configure_from_bitbar_cache(self, bitbar_configpath, cache_path, update_bitbar=False):
+        """Load bitbar_cache from the persisted cache if it was written for this config.yml.
+
+        Entries the configuration needs but the cache lacks are resolved now.
+        All other entries are validated lazily, see validate_cached_entry().
+
+        Returns True if bitbar_cache was loaded, False if configure() needs to
+        query bitbar.
+        """
+        self.cache_path = cache_path
+        self.unvalidated_entries.clear()
+        if not cache_path:
+            return False
+        self.cache_hash = self.get_config_hash(bitbar_configpath)
+        if update_bitbar:
+            # bitbar has to be synced with the config, so the cache is only written.
+            return False
+
+        try:
+            with open(cache_path) as cache_file:
+                cached = json.load(cache_file)
+        except FileNotFoundError:
+            logger.info("configure: no bitbar cache at {}".format(cache_path))
+            return False
+        except (OSError, ValueError) as e:
+            logger.warning("configure: ignoring unreadable bitbar cache {}: {}".format(cache_path, e))
+            return False
+        if cached.get("config_hash") != self.cache_hash:
+            logger.info("configure: bitbar cache {} was written for a different configuration".format(cache_path))
+            return False
+
+        for key in PERSISTED_CACHE_KEYS:
+            self.bitbar_cache[key] = cached.get(key, {})
+
+        entries = set()
+        for project_name in self.config["projects"]:
+            if project_name != "defaults":
+                entries.update(self.get_project_cache_entries(project_name))
+        missing_entries = sorted(entry for entry in entries if entry[1] not in self.bitbar_cache[entry[0]])
+        try:
+            for key, name in missing_entries:
+                logger.info("configure: resolving {} {} missing from bitbar cache".format(key, name))
+                self.bitbar_cache[key][name] = self.resolve_cache_entry(key, name)
+        except Exception as e:
+            logger.warning("configure: unable to complete the bitbar cache ({}), reconfiguring".format(e))
+            return False
+
+        self.unvalidated_entries.update(entries.difference(missing_entries))
+        if missing_entries:
+            self.save_bitbar_cache()
+        logger.info("configure: loaded bitbar cache {}".format(cache_path))
+        return True
+
+    def save_bitbar_cache(self):
+        """Persist the bitbar ids in bitbar_cache if a cache path was passed to configure()."""
+        if not self.cache_path:
+            return
+        cached = {"config_hash": self.cache_hash}
+        with self.cache_lock:
+            for key in PERSISTED_CACHE_KEYS:
+                cached[key] = self.bitbar_cache[key]
+            cached["projects"] = {
+                project_name: {k: v for k, v in bitbar_project.items() if k not in PROJECT_RUNTIME_KEYS}
+                for project_name, bitbar_project in self.bitbar_cache["projects"].items()
+            }
+            # write a private temporary file and rename it so readers never see a partial cache
+            tmp_path = "{}.tmp".format(self.cache_path)
+            with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as cache_file:
+                json.dump(cached, cache_file)
+            os.replace(tmp_path, self.cache_path)
+
+    def invalidate_bitbar_cache(self):
+        """Remove the persisted bitbar cache so the next configure() queries bitbar."""
+        self.unvalidated_entries.clear()
+        if not self.cache_path:
+            return
+        with self.cache_lock:
+            try:
+                os.remove(self.cache_path)
+                logger.info("removed bitbar cache {}".format(self.cache_path))
+            except FileNotFoundError:
+                pass
+
+    def get_entry_lock(self, key, name):
+        """Return the lock serializing lookups of a single bitbar_cache entry."""
+        with self.cache_lock:
+            return self.entry_locks.setdefault((key, name), threading.Lock())
+
+    def validate_cached_entry(self, key, name):
+        """Check a bitbar_cache entry loaded from the persisted cache against bitbar.
+
+        Each entry is checked once, on first use. Entries that no longer match are
+        re-resolved in place, so references held by other threads stay current, and
+        the persisted cache is rewritten.
+
+        Raises BitbarCacheException, after removing the persisted cache, if the entry
+        can not be re-resolved. Network errors are raised as is and the entry is
+        checked again on its next use.
+        """
+        if (key, name) not in self.unvalidated_entries:
+            return
+        with self.get_entry_lock(key, name):
+            if (key, name) not in self.unvalidated_entries:
+                return
+            try:
+                bitbar_entity = self.resolve_cache_entry(key, name)
+            except (RequestResponseError, requests.exceptions.RequestException):
+                raise
+            except Exception as e:
+                self.invalidate_bitbar_cache()
+                raise BitbarCacheException("cached {} {} could not be re-resolved: {}".format(key, name, e))
+            cached_entity = self.bitbar_cache[key][name]
+            changed = bitbar_entity["id"] != cached_entity["id"]
+            if changed:
+                logger.warning(
+                    "bitbar cache: {} {} changed id from {} to {}".format(
+                        key, name, cached_entity["id"], bitbar_entity["id"]
+                    )
+                )
+            with self.cache_lock:
+                cached_entity.update(bitbar_entity)
+                if changed:
+                    self.generation += 1
+            self.unvalidated_entries.discard((key, name))
+        if changed:
+            self.save_bitbar_cache()
+
+    def validate_cached_project(self, project_name):
+        """Validate all bitbar_cache entries a project's test runs depend on, see validate_cached_entry()."""
+        if not self.unvalidated_entries:
+            return
+        for key, name in self.get_project_cache_entries(project_name):
+            self.validate_cached_entry(key, name)
+
+    def refresh_file(self, file_id):
+        """Replace the cached files whose bitbar file file_id has been archived.
+
+        Each file is looked up again by name and, if bitbar has no other file with
+        that name and configure() was allowed to update bitbar, uploaded again. Only
+        the affected bitbar_cache["files"] entries change, in place and under their
+        entry lock, so other threads keep starting runs. Threads that hit the same
+        archived file wait for the first one to refresh it and then find nothing to do.
+
+        Raises ConfigurationException if a file can not be replaced.
+        """
+        file_names = [
+            file_name for file_name, bitbar_file in self.bitbar_cache["files"].items() if bitbar_file["id"] == file_id
+        ]
+        for file_name in file_names:
+            with self.get_entry_lock("files", file_name):
+                cached_file = self.bitbar_cache["files"][file_name]
+                if cached_file["id"] != file_id:
+                    # refreshed by another thread
+                    continue
+                bitbar_files = [
+                    bitbar_file for bitbar_file in get_files(name=file_name) if bitbar_file["id"] != file_id
+                ]
+                if not bitbar_files:
+                    if not self.update_bitbar:
+                        raise ConfigurationException(
+                            "File {} has been archived, but not configured to update bitbar!".format(file_name)
+                        )
+                    logger.info("refresh_file: uploading {}".format(file_name))
+                    TESTDROID.upload_file(os.path.join(self.filespath, file_name))
+                    bitbar_files = [
+                        bitbar_file for bitbar_file in get_files(name=file_name) if bitbar_file["id"] != file_id
+                    ]
+                    if not bitbar_files:
+                        raise ConfigurationException("File {} could not be uploaded.".format(file_name))
+                logger.info(
+                    "refresh_file: {} changed id from {} to {}".format(file_name, file_id, bitbar_files[-1]["id"])
+                )
+                with self.cache_lock:
+                    cached_file.update(bitbar_files[-1])
+                    self.generation += 1
+                self.unvalidated_entries.discard(("files", file_name))
+            self.save_bitbar_cache()
+
+
+# used by threads that have not selected a configuration, see use()
+DEFAULT_CONFIGURATION = BitbarConfiguration(testdroid=DEFAULT_TESTDROID, testdroid_url=TESTDROID_URL)
+
+
+# module level functions acting on the calling thread's configuration, see use()
+
+
+def get_filespath():
+    """Return files path where application and test files are kept."""
+    return current().get_filespath()
+
+
+def get_me_id():
+    """Returns the Bitbar User ID that the application is using."""
+    return current().get_me_id()
+
+
+def configure(bitbar_configpath, filespath=None, update_bitbar=False, cache_path=None):
+    """Configure the calling thread's configuration, see BitbarConfiguration.configure()."""
+    current().configure(bitbar_configpath, filespath=filespath, update_bitbar=update_bitbar, cache_path=cache_path)
+
+
+def expand_configuration():
+    current().expand_configuration()
+
+
+def get_config_hash(bitbar_configpath):
+    return current().get_config_hash(bitbar_configpath)
+
+
+def configure_from_bitbar_cache(bitbar_configpath, cache_path, update_bitbar=False):
+    return current().configure_from_bitbar_cache(bitbar_configpath, cache_path, update_bitbar=update_bitbar)
+
+
+def save_bitbar_cache():
+    current().save_bitbar_cache()
+
+
+def invalidate_bitbar_cache():
+    current().invalidate_bitbar_cache()
+
+
+def validate_cached_entry(key, name):
+    current().validate_cached_entry(key, name)
+
+
+def validate_cached_project(project_name):
+    current().validate_cached_project(project_name)
+
+
+def refresh_file(file_id):
+    current().refresh_file(file_id)
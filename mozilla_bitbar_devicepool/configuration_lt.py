@@ -2,19 +2,37 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this file,
 # You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import hashlib
+import json
 import logging
 import os
 import pprint
-import subprocess
-import sys
+import shutil
 
 import yaml
 
+from mozilla_bitbar_devicepool.util import misc
 from mozilla_bitbar_devicepool.util.template import apply_dict_defaults
 
+# use libyaml when pyyaml was built with it, it parses lambdatest.yml many times faster
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# bump when the layout of the compiled config changes
+COMPILED_CONFIG_VERSION = 1
+# compiled config cache used by the command line tools, see _load_compiled_config()
+DEFAULT_COMPILED_CONFIG_CACHE = os.path.join(misc.get_cache_dir(), "lambdatest-compiled.json")
+
 
 class ConfigurationLt(object):
-    def __init__(self, ci_mode_envvars=False, ci_mode_fs=False, quiet=False, lightweight=False):
+    def __init__(
+        self,
+        ci_mode_envvars=False,
+        ci_mode_fs=False,
+        quiet=False,
+        lightweight=False,
+        require_hyperexecute=True,
+        compiled_config_cache=None,
+    ):
         # TODO?: mash all values into 'config'?
         self.config = {}
         #
@@ -25,23 +43,154 @@ class ConfigurationLt(object):
         self.quiet = quiet
         # lightweight mode: skip TC env var loading (for tools that only need device config)
         self.lightweight = lightweight
+        # tools that don't launch jobs don't need the hyperexecute binary
+        self.require_hyperexecute = require_hyperexecute
+        # path of the compiled config cache (None disables it), see _load_compiled_config()
+        self.compiled_config_cache = compiled_config_cache
         # see _set_fully_configured_projects() for details
         self.fully_configured_projects = {}
+        # absolute path, mtime (ns) and sha256 of the loaded config file, see has_config_file_changed()
+        self.config_path = None
+        self.config_mtime = None
+        self.config_hash = None
 
         self.global_contract_device_count = -1
 
         if self.ci_mode_envvars and not self.quiet:
             print("ConfigurationLt: Running in CI mode. Using fake credentials.")
 
-    def _load_file_config(self, config_path="config/lambdatest.yml"):
+    def _read_config_file(self, config_path="config/lambdatest.yml"):
+        """Reads the config file and records its path, mtime and hash. Returns its contents (bytes)."""
         # get this file's directory path
         this_dir = os.path.dirname(os.path.realpath(__file__))
         # get the absolute path
-        full_config_path = os.path.join(this_dir, "..", config_path)
+        full_config_path = os.path.abspath(os.path.join(this_dir, "..", config_path))
+
+        # stat before reading, so a write racing the read is seen as a change later
+        config_mtime = os.stat(full_config_path).st_mtime_ns
+        with open(full_config_path, "rb") as lt_configfile:
+            config_data = lt_configfile.read()
+        self.config_path = full_config_path
+        self.config_mtime = config_mtime
+        self.config_hash = hashlib.sha256(config_data).hexdigest()
+        return config_data
+
+    def _get_compiled_config_key(self):
+        """
+        Returns the key the compiled config is stored under.
+
+        The compiled config depends on the config file, on the mode flags and, through
+        _set_fully_configured_projects(), on which user script directories exist.
+        Adding or removing a user script directory changes the mtime of their parent.
+        """
+        user_scripts_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), "lambdatest", "user_scripts")
+        try:
+            user_scripts_mtime = os.stat(user_scripts_dir).st_mtime_ns
+        except OSError:
+            user_scripts_mtime = None
+        return {
+            "version": COMPILED_CONFIG_VERSION,
+            "config_path": self.config_path,
+            "config_hash": self.config_hash,
+            "user_scripts_mtime": user_scripts_mtime,
+            "ci_mode_fs": self.ci_mode_fs,
+            "lightweight": self.lightweight,
+        }
+
+    def _load_compiled_config(self):
+        """
+        Loads the expanded config and fully configured projects from the compiled config cache.
 
-        with open(full_config_path) as lt_configfile:
-            loaded_config = yaml.load(lt_configfile.read(), Loader=yaml.SafeLoader)
-        self.config = loaded_config
+        The cache holds the result of _expand_configuration() and
+        _set_fully_configured_projects(), i.e. no secrets: credentials are always
+        read from the environment afterwards.
+
+        Returns:
+            bool: True if the cache was used, False if the config has to be compiled.
+        """
+        try:
+            with open(self.compiled_config_cache) as cache_file:
+                compiled = json.load(cache_file)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            logging.warning(f"ConfigurationLt: ignoring unreadable compiled config {self.compiled_config_cache}: {e}")
+            return False
+        if compiled.get("key") != self._get_compiled_config_key():
+            return False
+        self.config = compiled["config"]
+        self.fully_configured_projects = compiled["fully_configured_projects"]
+        return True
+
+    def _save_compiled_config(self):
+        """Writes the expanded config to the compiled config cache, see _load_compiled_config()."""
+        compiled = {
+            "key": self._get_compiled_config_key(),
+            "config": self.config,
+            "fully_configured_projects": self.fully_configured_projects,
+        }
+        try:
+            compiled_json = json.dumps(compiled)
+            # e.g. non-string keys don't survive json, don't cache a config that would load differently
+            if json.loads(compiled_json)["config"] != self.config:
+                return
+            os.makedirs(os.path.dirname(self.compiled_config_cache), exist_ok=True)
+            # write a temporary file and rename it so concurrent tools never read a partial cache
+            tmp_path = f"{self.compiled_config_cache}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as cache_file:
+                cache_file.write(compiled_json)
+            os.replace(tmp_path, self.compiled_config_cache)
+        except (OSError, TypeError, ValueError) as e:
+            logging.warning(f"ConfigurationLt: unable to write compiled config {self.compiled_config_cache}: {e}")
+
+    def get_config_file_mtime(self):
+        """
+        Returns the current mtime (ns) of the loaded config file.
+
+        Returns:
+            int or None: The mtime, or None if no file was loaded or it can't be read.
+        """
+        if not self.config_path:
+            return None
+        try:
+            return os.stat(self.config_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def has_config_file_changed(self):
+        """
+        Checks if the loaded config file has been modified since it was loaded.
+
+        Returns:
+            bool: True if the file's mtime differs from the one it was loaded with.
+        """
+        mtime = self.get_config_file_mtime()
+        return mtime is not None and mtime != self.config_mtime
+
+    def reload(self):
+        """
+        Builds a new configuration from the loaded config file.
+
+        The new instance is fully expanded and validated before it is returned and
+        this instance is not modified, so a running manager can swap it in with a
+        single assignment.
+
+        Returns:
+            ConfigurationLt: The new configuration.
+
+        Raises:
+            ValueError, OSError, yaml.YAMLError: If the file can't be loaded or is invalid.
+        """
+        new_config_object = ConfigurationLt(
+            ci_mode_envvars=self.ci_mode_envvars,
+            ci_mode_fs=self.ci_mode_fs,
+            quiet=True,
+            lightweight=self.lightweight,
+            require_hyperexecute=self.require_hyperexecute,
+            compiled_config_cache=self.compiled_config_cache,
+        )
+        new_config_object.configure(config_path=self.config_path)
+        return new_config_object
 
     def get_config(self):
         return self.config
@@ -201,32 +350,35 @@ class ConfigurationLt(object):
         return 0
 
     def configure(self, config_blob=None, config_path=None):
-        # Check for hyperexecute binary on path using a shell command
-        if not self.ci_mode_envvars:
-            cmd = "where" if sys.platform == "win32" else "which"
-            try:
-                subprocess.check_call([cmd, "hyperexecute"], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            except subprocess.CalledProcessError:
+        # Check for hyperexecute binary on path
+        if self.require_hyperexecute and not self.ci_mode_envvars:
+            if shutil.which("hyperexecute") is None:
                 raise FileNotFoundError("hyperexecute binary not found on the system PATH")
 
         if config_blob and config_path:
             raise ValueError("Cannot specify both config_blob and config_path")
 
         # load the data we need
+        config_data = None
         if config_blob:
             self.config = config_blob
-        elif config_path:
-            self._load_file_config(config_path)
         else:
-            self._load_file_config()
+            config_data = self._read_config_file(config_path or "config/lambdatest.yml")
 
-        # expand the configuration (i.e. set defaults)
-        self._expand_configuration()
+        if config_data is None or not self.compiled_config_cache or not self._load_compiled_config():
+            if config_data is not None:
+                self.config = yaml.load(config_data, Loader=YAML_LOADER)
 
-        # set project values/flags
-        # set this flag so downstream jobs can short-circuit if a project isn't configured
-        if not self.lightweight:
-            self._set_fully_configured_projects()
+            # expand the configuration (i.e. set defaults)
+            self._expand_configuration()
+
+            # set project values/flags
+            # set this flag so downstream jobs can short-circuit if a project isn't configured
+            if not self.lightweight:
+                self._set_fully_configured_projects()
+
+            if config_data is not None and self.compiled_config_cache:
+                self._save_compiled_config()
         self._set_disabled()
 
         # validate the configuration
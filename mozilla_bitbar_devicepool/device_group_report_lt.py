@@ -1,7 +1,7 @@
 import argparse
 import pprint
 
-from mozilla_bitbar_devicepool.configuration_lt import ConfigurationLt
+from mozilla_bitbar_devicepool.configuration_lt import DEFAULT_COMPILED_CONFIG_CACHE, ConfigurationLt
 
 # from mozilla_bitbar_devicepool.lambdatest import status
 from mozilla_bitbar_devicepool.util import misc
@@ -13,7 +13,10 @@ class DeviceGroupReportLt:
         self.config_path = config_path
         # Using ConfigurationLt to handle config loading
         self.config_object = ConfigurationLt(
-            ci_mode_envvars=True, quiet=True
+            ci_mode_envvars=True,
+            quiet=True,
+            require_hyperexecute=False,
+            compiled_config_cache=DEFAULT_COMPILED_CONFIG_CACHE,
         )  # ci_mode=True to avoid credentials check
         self.config_object.configure(config_path=self.config_path)
 
@@ -0,0 +1,212 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+# 'jobs to start' strategies for the bitbar test run manager
+#
+# Each project thread creates its own strategy instance with get_strategy() and
+# calls jobs_to_start() once per cycle with the project's stats and the number of
+# pending Taskcluster tasks. The strategy is selected with
+# devicepool_config.jobs_to_start_algorithm and configured with the optional
+# devicepool_config.jobs_to_start_options dict.
+
+import abc
+import inspect
+import math
+import re
+from collections import OrderedDict
+
+STRATEGIES = OrderedDict()
+
+# matches the stats line logged by TestRunManager.handle_queue(), e.g.
+#   mozilla-gw-unittest-p5 INFO     COUNT 10 IDLE 4 OFFLINE 0 DISABLED 0 RUNNING 6 WAITING 0 PENDING 12 STARTING 4
+STATS_LINE_REGEX = re.compile(
+    r"(?P<project>\S+)\s+INFO\s+COUNT (?P<COUNT>\d+) IDLE (?P<IDLE>\d+) OFFLINE (?P<OFFLINE>\d+) "
+    r"DISABLED (?P<DISABLED>\d+) RUNNING (?P<RUNNING>\d+) WAITING (?P<WAITING>\d+) "
+    r"PENDING (?P<PENDING>\d+) STARTING (?P<STARTING>\d+)"
+)
+
+
+def register_strategy(name):
+    """Class decorator adding a strategy to STRATEGIES under name.
+
+    Raises TypeError if the strategy doesn't implement compute().
+    """
+
+    def register(cls):
+        if inspect.isabstract(cls):
+            raise TypeError(f"'jobs to start' strategy {cls.__name__} doesn't implement compute()")
+        cls.name = name
+        STRATEGIES[name] = cls
+        return cls
+
+    return register
+
+
+def get_strategy(name, **options):
+    """Return a new instance of the named strategy.
+
+    Raises RuntimeError if no strategy is registered under name.
+    """
+    if name not in STRATEGIES:
+        raise RuntimeError("Invalid 'jobs to start' algorithm selected or unset.")
+    return STRATEGIES[name](**options)
+
+
+class JobsToStartStrategy(abc.ABC):
+    """Base class for 'jobs to start' strategies."""
+
+    name = None
+
+    def __init__(self, **options):
+        pass
+
+    def jobs_to_start(self, stats, pending_tasks):
+        """Return the number of test runs to start this cycle (never negative).
+
+        :param stats: the project's stats dict (IDLE, WAITING, RUNNING, ...).
+        :param pending_tasks: number of pending Taskcluster tasks.
+        """
+        return max(0, self.compute(stats, pending_tasks))
+
+    @abc.abstractmethod
+    def compute(self, stats, pending_tasks):
+        """Return the number of test runs to start this cycle, may be negative."""
+
+
+@register_strategy("v1")
+class StrategyV1(JobsToStartStrategy):
+    """Start up to the number of idle devices in a group, plus a logarithmic fudge term.
+
+    Aggressive in the number of jobs it starts; caused server issues, so v2 was created.
+    """
+
+    def compute(self, stats, pending_tasks):
+        # warning: only take the log of positive non-zero numbers, or a
+        # "ValueError: math domain error" will be raised
+        return min(
+            pending_tasks,
+            stats["IDLE"] - stats["WAITING"] + 1 + int(math.log10(1 + pending_tasks)),
+        )
+
+
+@register_strategy("v2")
+class StrategyV2(JobsToStartStrategy):
+    """Start up to max_jobs_to_have_waiting jobs, to avoid overloading Bitbar with waiting jobs."""
+
+    # TODO: vary this based on how many devices out of total this queue has
+    #   - set a global limit and then give each queue a fraction of that
+    max_jobs_to_have_waiting = 1
+
+    def compute(self, stats, pending_tasks):
+        if stats["WAITING"] >= self.max_jobs_to_have_waiting or pending_tasks == 0:
+            return 0
+        return max(1, self.max_jobs_to_have_waiting - stats["WAITING"])
+
+
+@register_strategy("v3")
+class StrategyV3(JobsToStartStrategy):
+    """A modified v1 without the fudge term: start enough runs for the unhandled tasks and idle devices."""
+
+    def compute(self, stats, pending_tasks):
+        tasks_that_need_handling = pending_tasks - stats["WAITING"]
+        # TODO: also subtract just started like in lt?
+        return min(tasks_that_need_handling, stats["IDLE"] - stats["WAITING"])
+
+
+@register_strategy("v4")
+class StrategyV4(JobsToStartStrategy):
+    """Closed loop (AIMD) controller holding WAITING near zero while keeping devices busy.
+
+    The demand is the v3 formula. Each cycle the controller also limits the number
+    of runs it lets into the waiting state to an allowance:
+
+      - while no runs are waiting and there is demand, the allowance grows by
+        `increase` each cycle (additive increase), up to the number of devices.
+      - when more than `waiting_target` runs are waiting, the allowance is
+        multiplied by `decrease` (multiplicative decrease), down to `min_allowance`.
+
+    Runs are only started while WAITING is below the allowance, so a group whose
+    runs sit in WAITING quickly stops adding to them, and a group whose runs
+    are picked up promptly ramps back up to starting one run per idle device.
+    """
+
+    def __init__(self, increase=1, decrease=0.5, min_allowance=1, waiting_target=0, **options):
+        super().__init__(**options)
+        self.increase = increase
+        self.decrease = decrease
+        self.min_allowance = min_allowance
+        self.waiting_target = waiting_target
+        self.allowance = min_allowance
+
+    def compute(self, stats, pending_tasks):
+        demand = min(pending_tasks - stats["WAITING"], stats["IDLE"] - stats["WAITING"])
+        if stats["WAITING"] > self.waiting_target:
+            self.allowance = max(self.min_allowance, self.allowance * self.decrease)
+        elif demand > 0:
+            self.allowance = min(max(self.min_allowance, stats["COUNT"]), self.allowance + self.increase)
+        return min(demand, int(self.allowance) - stats["WAITING"])
+
+
+def parse_stats_log(lines):
+    """Return {project name: [stats dict, ...]} from the stats lines in a test run manager log.
+
+    Each stats dict also contains the PENDING and STARTING values that were logged.
+    Note that the manager only logs the stats line while a project has runs RUNNING or WAITING.
+    """
+    recorded = OrderedDict()
+    for line in lines:
+        match = STATS_LINE_REGEX.search(line)
+        if not match:
+            continue
+        stats = {key: int(value) for key, value in match.groupdict().items() if key != "project"}
+        recorded.setdefault(match.group("project"), []).append(stats)
+    return recorded
+
+
+def replay(recorded, strategy_names):
+    """Replay recorded stats through each strategy and summarize their decisions.
+
+    The replay is open loop: each strategy sees the recorded stats, not stats
+    resulting from its own earlier decisions. Stateful strategies (v4) still
+    evolve their state from the recorded WAITING values.
+
+    Returns {strategy name: summary dict} with totals over all projects:
+      started: runs the strategy would have started.
+      started_while_waiting: runs started in cycles where runs were already WAITING.
+      idle_unserved: cycles with pending tasks and idle devices where nothing was started.
+    """
+    results = OrderedDict()
+    for strategy_name in strategy_names:
+        summary = {"cycles": 0, "started": 0, "started_while_waiting": 0, "idle_unserved": 0}
+        for project_stats in recorded.values():
+            strategy = get_strategy(strategy_name)
+            for stats in project_stats:
+                jobs = strategy.jobs_to_start(stats, stats["PENDING"])
+                summary["cycles"] += 1
+                summary["started"] += jobs
+                if stats["WAITING"] > 0:
+                    summary["started_while_waiting"] += jobs
+                if jobs == 0 and stats["PENDING"] > stats["WAITING"] and stats["IDLE"] > stats["WAITING"]:
+                    summary["idle_unserved"] += 1
+        results[strategy_name] = summary
+    return results
+
+
+def format_replay(results):
+    lines = [
+        "{:10s} {:>8s} {:>8s} {:>22s} {:>14s}".format(
+            "strategy", "cycles", "started", "started_while_waiting", "idle_unserved"
+        )
+    ]
+    for strategy_name, summary in results.items():
+        lines.append(
+            "{:10s} {:8d} {:8d} {:22d} {:14d}".format(
+                strategy_name,
+                summary["cycles"],
+                summary["started"],
+                summary["started_while_waiting"],
+                summary["idle_unserved"],
+            )
+        )
+    return "\n".join(lines)
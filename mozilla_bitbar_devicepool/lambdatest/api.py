@@ -5,28 +5,48 @@
 import base64
 import os
 import pprint
+import threading
 from datetime import timedelta
 
 import requests.adapters
-import requests_cache
 from urllib3.util import Retry
 
-# Create a cached session with 10 second expiry
-# Only requests using this session will be cached
-cached_session = requests_cache.CachedSession(
-    cache_name="lambdatest_cache", backend="memory", expire_after=timedelta(seconds=8)
-)
-
-# Configure retry strategy
-retry_strategy = Retry(
-    total=5,
-    backoff_factor=0.1,
-    status_forcelist=[429, 500, 502, 503, 504],
-    allowed_methods=["GET", "POST"],
-)
-adapter = requests.adapters.HTTPAdapter(max_retries=retry_strategy)
-cached_session.mount("http://", adapter)
-cached_session.mount("https://", adapter)
+_cached_session = None
+_cached_session_lock = threading.Lock()
+
+
+def get_cached_session():
+    """
+    Returns the session used for all api calls, creating it on first use.
+
+    Requests made with it are cached for 8 seconds and retried on errors.
+    requests_cache is imported here, it is slow to import.
+    """
+    global _cached_session
+    if _cached_session is None:
+        with _cached_session_lock:
+            if _cached_session is None:
+                import requests_cache
+
+                # Create a cached session with 10 second expiry
+                # Only requests using this session will be cached
+                session = requests_cache.CachedSession(
+                    cache_name="lambdatest_cache", backend="memory", expire_after=timedelta(seconds=8)
+                )
+
+                # Configure retry strategy
+                retry_strategy = Retry(
+                    total=5,
+                    backoff_factor=0.1,
+                    status_forcelist=[429, 500, 502, 503, 504],
+                    allowed_methods=["GET", "POST"],
+                )
+                adapter = requests.adapters.HTTPAdapter(max_retries=retry_strategy)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _cached_session = session
+    return _cached_session
+
 
 # https://www.lambdatest.com/support/api-doc/
 
@@ -80,7 +100,7 @@ def get_jobs(
         if next_cursor:
             url += f"&cursor={next_cursor}"
 
-        response = cached_session.get(url, headers=headers, timeout=timeout)
+        response = get_cached_session().get(url, headers=headers, timeout=timeout)
         if print_url:
             print(f"Fetching {url}...")
         if response.status_code != 200:
@@ -137,8 +157,8 @@ def get_devices(lt_username, lt_api_key, timeout=(10, 30)):
     base64_auth_string = base64.b64encode(auth_string.encode("utf-8")).decode("utf-8")
     headers["Authorization"] = f"Basic {base64_auth_string}"
 
-    # Use cached_session instead of requests directly
-    response = cached_session.get(url, headers=headers, timeout=timeout)
+    # Use the cached session instead of requests directly
+    response = get_cached_session().get(url, headers=headers, timeout=timeout)
     # check the response code
     if response.status_code != 200:
         print(f"Error: {response.status_code}")
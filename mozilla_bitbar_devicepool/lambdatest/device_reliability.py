@@ -0,0 +1,202 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import threading
+import time
+
+import mozilla_bitbar_devicepool.lambdatest.util as util
+from mozilla_bitbar_devicepool.lambdatest.job_archive import parse_time
+from mozilla_bitbar_devicepool.lambdatest.status import extract_failure_phase
+
+# finished job statuses and how they count against the device
+SUCCESS_STATUSES = frozenset(["completed"])
+FAILED_STATUSES = frozenset(["failed", "timeout"])
+# aborted and lambda_error jobs say nothing about the device and are ignored
+
+# failure phase (see status.extract_failure_phase()) -> weight of the failure
+#   - 'pre' failures are setup problems, usually the device itself
+#   - 'testing' failures can also be caused by the tests or the build
+FAILURE_PHASE_WEIGHTS = {"pre": 1.0, "testing": 0.5}
+DEFAULT_FAILURE_WEIGHT = 0.25
+
+
+class DeviceReliability:
+    """
+    Scores devices by the outcomes of their recent jobs.
+
+    The score of a device is its decayed, weighted success rate (1.0 for devices without
+    failures). Devices that fail several jobs in a row are backed off: they aren't
+    offered for new jobs for a time that doubles with each further failure.
+
+    Written by the LT monitor thread (record_jobs()) and read by the job starter
+    threads (partition_devices(), get_rank()).
+    """
+
+    def __init__(
+        self,
+        half_life_seconds=6 * 60 * 60,
+        prior_successes=2.0,
+        backoff_after_failures=2,
+        backoff_base_seconds=5 * 60,
+        backoff_max_seconds=2 * 60 * 60,
+    ):
+        self.half_life_seconds = half_life_seconds
+        # a new device starts as if it had this many successes, so one failure doesn't sink it
+        self.prior_successes = prior_successes
+        self.backoff_after_failures = backoff_after_failures
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        # udid -> {'successes', 'failures', 'updated', 'consecutive_failures', 'backoff_until'}
+        self.devices = {}
+        # finished job numbers of the last record_jobs() call, they are only counted once
+        self.seen_job_numbers = set()
+        self.lock = threading.Lock()
+
+    def _decayed(self, device, now):
+        """Decay the counts of a device to now."""
+        elapsed = now - device["updated"]
+        if elapsed > 0:
+            factor = 0.5 ** (elapsed / self.half_life_seconds)
+            device["successes"] *= factor
+            device["failures"] *= factor
+            device["updated"] = now
+        return device
+
+    def _get_device(self, udid, now):
+        device = self.devices.get(udid)
+        if device is None:
+            device = {
+                "successes": 0.0,
+                "failures": 0.0,
+                "updated": now,
+                "consecutive_failures": 0,
+                "backoff_until": 0,
+            }
+            self.devices[udid] = device
+        return self._decayed(device, now)
+
+    def record_outcome(self, udid, succeeded, failure_weight=1.0, now=None):
+        """
+        Record the outcome of a job on a device.
+
+        Args:
+            udid (str): The device.
+            succeeded (bool): True if the job completed.
+            failure_weight (float): How much a failure counts, see FAILURE_PHASE_WEIGHTS.
+            now (float): Time of the outcome, defaults to time.time().
+        """
+        if now is None:
+            now = time.time()
+        with self.lock:
+            device = self._get_device(udid, now)
+            if succeeded:
+                device["successes"] += 1
+                device["consecutive_failures"] = 0
+                device["backoff_until"] = 0
+                return
+            device["failures"] += failure_weight
+            device["consecutive_failures"] += 1
+            excess_failures = device["consecutive_failures"] - self.backoff_after_failures
+            if excess_failures >= 0:
+                backoff = min(self.backoff_base_seconds * 2**excess_failures, self.backoff_max_seconds)
+                device["backoff_until"] = now + backoff
+
+    def record_jobs(self, jobs, now=None):
+        """
+        Record the outcomes of finished devicepool jobs.
+
+        Jobs are expected to come from repeated fetches of the latest jobs, a job seen by
+        the previous call isn't counted again. The outcomes are recorded oldest first (the
+        api returns the newest first), each at its job's end time, so the consecutive
+        failures and backoffs follow the order the jobs ran in.
+
+        Args:
+            jobs (list): Jobs as returned by api.get_jobs() (its 'data').
+            now (float): Current time, used for jobs without an end time. Defaults to time.time().
+
+        Returns:
+            int: The number of outcomes recorded.
+        """
+        if now is None:
+            now = time.time()
+        finished_job_numbers = set()
+        # (end time, job number, udid, job) of the jobs to record
+        new_outcomes = []
+        for job in jobs:
+            job_status = job.get("status")
+            if job_status not in SUCCESS_STATUSES and job_status not in FAILED_STATUSES:
+                continue
+            finished_job_numbers.add(job["job_number"])
+            if job["job_number"] in self.seen_job_numbers:
+                continue
+            job_labels_list = util.string_list_to_list(job.get("job_label"))
+            if "tcdp" not in job_labels_list:
+                continue
+            udid = util.get_device_from_job_labels(job_labels_list)
+            if not udid:
+                continue
+            end_time = min(parse_time(job.get("end_time")) or now, now)
+            new_outcomes.append((end_time, job["job_number"], udid, job))
+
+        new_outcomes.sort(key=lambda outcome: outcome[:2])
+        for end_time, _job_number, udid, job in new_outcomes:
+            if job["status"] in SUCCESS_STATUSES:
+                self.record_outcome(udid, True, now=end_time)
+            else:
+                phase = extract_failure_phase(job, verbose=False)
+                weight = FAILURE_PHASE_WEIGHTS.get(phase, DEFAULT_FAILURE_WEIGHT)
+                self.record_outcome(udid, False, failure_weight=weight, now=end_time)
+        recorded = len(new_outcomes)
+        self.seen_job_numbers = finished_job_numbers
+        return recorded
+
+    def get_score(self, udid, now=None):
+        """Return the score of a device, from 0.0 (always fails) to 1.0 (no failures)."""
+        if now is None:
+            now = time.time()
+        with self.lock:
+            if udid not in self.devices:
+                return 1.0
+            device = self._decayed(self.devices[udid], now)
+            successes = device["successes"] + self.prior_successes
+            return successes / (successes + device["failures"])
+
+    def is_backed_off(self, udid, now=None):
+        """Check if a device is backed off after consecutive failures."""
+        if now is None:
+            now = time.time()
+        with self.lock:
+            device = self.devices.get(udid)
+            return device is not None and device["backoff_until"] > now
+
+    def get_rank(self, udid, now=None):
+        """
+        Return the rank of a device for job selection, lower ranks are picked first.
+
+        Devices with about the same score (same first decimal) share a rank, so the
+        device selector can spread the work over them (see DeviceSelector.pick()).
+        """
+        return -round(self.get_score(udid, now=now), 1)
+
+    def partition_devices(self, udids, now=None):
+        """
+        Split devices into the ones that can start jobs and the backed off ones.
+
+        Args:
+            udids (list): The available devices.
+            now (float): Defaults to time.time().
+
+        Returns:
+            tuple: (usable udids, backed off udids), both in the order given.
+        """
+        if now is None:
+            now = time.time()
+        usable = []
+        backed_off = []
+        for udid in udids:
+            if self.is_backed_off(udid, now=now):
+                backed_off.append(udid)
+            else:
+                usable.append(udid)
+        return usable, backed_off
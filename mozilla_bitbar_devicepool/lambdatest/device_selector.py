@@ -0,0 +1,72 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import heapq
+import threading
+import time
+
+
+class DeviceSelector:
+    """
+    Picks the devices of a project to start jobs on, least recently launched first.
+
+    Spreads the work evenly over the devices of a project (the api returns devices in a
+    consistent order, taking the first ones would wear them out). Optionally the devices
+    with the least cumulative busy time go first instead.
+
+    One per project. Used by the project's job starter thread (pick(), record_launches())
+    and the LT monitor thread (add_busy_time()).
+    """
+
+    def __init__(self, use_busy_time=False):
+        self.use_busy_time = use_busy_time
+        # udid -> time.time() of the last job started on the device
+        self.last_launch = {}
+        # udid -> seconds seen busy, sampled by the LT monitor thread
+        self.busy_seconds = {}
+        self.lock = threading.Lock()
+
+    def pick(self, udids, count, rank=None):
+        """
+        Pick the devices to start count jobs on.
+
+        Builds a heap of the available devices and pops the count first ones,
+        O(n + count * log n) for n available devices.
+
+        Args:
+            udids (list): The available devices.
+            count (int): Number of devices wanted.
+            rank (callable): Optional udid -> number, devices with a lower rank are picked
+                first regardless of their launch time (e.g. DeviceReliability.get_rank).
+
+        Returns:
+            list: Up to count udids, in pick order.
+        """
+        with self.lock:
+            heap = []
+            for udid in udids:
+                # devices never launched (0) go first, the udid makes the order deterministic
+                key = (
+                    rank(udid) if rank else 0,
+                    self.busy_seconds.get(udid, 0) if self.use_busy_time else 0,
+                    self.last_launch.get(udid, 0),
+                    udid,
+                )
+                heap.append(key)
+            heapq.heapify(heap)
+            return [heapq.heappop(heap)[-1] for _ in range(min(count, len(heap)))]
+
+    def record_launches(self, udids, now=None):
+        """Record that jobs were started on the devices."""
+        if now is None:
+            now = time.time()
+        with self.lock:
+            for udid in udids:
+                self.last_launch[udid] = now
+
+    def add_busy_time(self, udids, seconds):
+        """Add seconds of busy time to each of the devices."""
+        with self.lock:
+            for udid in udids:
+                self.busy_seconds[udid] = self.busy_seconds.get(udid, 0) + seconds
@@ -0,0 +1,73 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import collections
+import json
+import os
+import threading
+import time
+
+from mozilla_bitbar_devicepool.util import misc
+
+# the last decisions of each project's job starter, kept in memory
+#
+# a record holds the inputs of calculate_jobs_to_start(), how the available devices were
+# worked out (quarantined and backed off devices removed), the grant (jobs to start) and
+# the launches. the manager dumps the records as JSON on SIGUSR1 and on
+# /debug/flight-recorder of the metrics server, so an under-launching project can be
+# looked into without running at DEBUG.
+#
+# each project has one writer (its job starter). a record is complete when added, the
+# writer only replaces its launch fields afterwards.
+
+DEFAULT_MAX_RECORDS = 200
+DEFAULT_FLIGHT_RECORDER_DUMP = os.path.join(misc.get_cache_dir(), "lt_flight_recorder.json")
+
+
+class FlightRecorder:
+    def __init__(self, max_records=DEFAULT_MAX_RECORDS):
+        self.max_records = max_records
+        # project name -> deque of records, oldest first
+        self.records = {}
+        # held while adding and copying records, a deque can't be copied while it changes
+        self.lock = threading.Lock()
+
+    def record(self, project_name, **fields):
+        """
+        Adds a decision record for a project, dropping its oldest record when full.
+
+        Returns:
+            dict: The record ('time' and the fields), the caller may update its values.
+        """
+        record = {"time": time.time()}
+        record.update(fields)
+        with self.lock:
+            if project_name not in self.records:
+                self.records[project_name] = collections.deque(maxlen=self.max_records)
+            self.records[project_name].append(record)
+        return record
+
+    def snapshot(self, project_name=None):
+        """Returns {project name: [record, ...]} (oldest first), only project_name if given."""
+        with self.lock:
+            return {
+                name: [dict(record) for record in records]
+                for name, records in sorted(self.records.items())
+                if project_name is None or name == project_name
+            }
+
+    def dump(self, path=DEFAULT_FLIGHT_RECORDER_DUMP):
+        """
+        Writes snapshot() as JSON to path.
+
+        Returns:
+            str: The path written.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # write a temporary file and rename it so readers never see a partial dump
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as dump_file:
+            json.dump(self.snapshot(), dump_file, indent=2)
+        os.replace(tmp_path, path)
+        return path
@@ -0,0 +1,300 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import argparse
+import array
+import datetime
+import json
+import os
+import sys
+import time
+from collections import Counter
+from itertools import compress
+
+import mozilla_bitbar_devicepool.lambdatest.util as util
+from mozilla_bitbar_devicepool.lambdatest.api import get_jobs
+from mozilla_bitbar_devicepool.lambdatest.status import extract_failure_phase
+from mozilla_bitbar_devicepool.util import misc
+
+# an append-only, columnar archive of finished LambdaTest jobs
+#
+# the api only returns the latest jobs, so the reports can only look at a few
+# hundred jobs and have to download them on every run. `lt_job_archive update`
+# adds the jobs that finished since the last update to the archive and the
+# reports can then aggregate weeks of history (see the reports' --archive).
+#
+# layout (one directory):
+#   <column>.bin       values of one column, packed with array.array
+#   dictionaries.json  column -> list of strings, for the dictionary encoded columns
+#   meta.json          number of rows
+#
+# meta.json is written last, rows beyond its row count (from an interrupted
+# update) are ignored and overwritten by the next update. one writer at a time.
+
+DEFAULT_JOB_ARCHIVE = os.path.join(misc.get_cache_dir(), "lt_job_archive")
+
+ARCHIVE_VERSION = 1
+
+# column -> array typecode
+COLUMNS = {
+    "job_number": "q",
+    "project": "I",
+    "udid": "I",
+    "status": "I",
+    "failure_phase": "I",
+    # 1 for jobs started by the devicepool (labeled 'tcdp')
+    "tcdp": "B",
+    # seconds since the epoch, 0 if unknown
+    "start_time": "q",
+    "end_time": "q",
+}
+
+# columns holding indexes into their dictionary
+STRING_COLUMNS = ("project", "udid", "status", "failure_phase")
+
+# jobs in these states can still change, they are archived once they finish
+ACTIVE_STATUSES = frozenset(["created", "initiated", "queued", "running", "in_progress"])
+
+# statuses with a failure phase (see status.extract_failure_phase())
+FAILED_STATUSES = frozenset(["failed", "timeout"])
+
+
+def parse_time(value):
+    """Convert an api timestamp (ISO 8601 string or epoch seconds) to epoch seconds, 0 if unknown."""
+    if not value:
+        return 0
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        parsed = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return 0
+    # the api's times are UTC, don't let a naive one take the host's time zone
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return int(parsed.timestamp())
+
+
+def get_project_from_job_labels(job_labels, device_id):
+    """Return the project label of a job (e.g. 'a55-perf' for ["tcdp","a55-perf","R5CXC1PW7CR"])."""
+    for label in job_labels:
+        if label != "tcdp" and label != device_id:
+            return label
+    return ""
+
+
+class JobArchive:
+    def __init__(self, path=DEFAULT_JOB_ARCHIVE):
+        self.path = path
+        self.rows = 0
+        # column -> array
+        self.columns = {}
+        # column -> list of strings and string -> index, for STRING_COLUMNS
+        self.dictionaries = {}
+        self.dictionary_indexes = {}
+        self.job_numbers = set()
+        self._load()
+
+    def __len__(self):
+        return self.rows
+
+    def _column_path(self, column):
+        return os.path.join(self.path, f"{column}.bin")
+
+    def _read_json(self, name, default):
+        try:
+            with open(os.path.join(self.path, name)) as json_file:
+                return json.load(json_file)
+        except FileNotFoundError:
+            return default
+
+    def _write_json(self, name, data):
+        # write a temporary file and rename it so readers never see a partial file
+        file_path = os.path.join(self.path, name)
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, "w") as json_file:
+            json.dump(data, json_file)
+        os.replace(tmp_path, file_path)
+
+    def _load(self):
+        meta = self._read_json("meta.json", {"version": ARCHIVE_VERSION, "rows": 0})
+        if meta["version"] != ARCHIVE_VERSION:
+            raise ValueError(f"{self.path}: unsupported job archive version {meta['version']}")
+        self.rows = meta["rows"]
+        for column, typecode in COLUMNS.items():
+            values = array.array(typecode)
+            if self.rows:
+                with open(self._column_path(column), "rb") as column_file:
+                    values.fromfile(column_file, self.rows)
+            self.columns[column] = values
+        dictionaries = self._read_json("dictionaries.json", {})
+        for column in STRING_COLUMNS:
+            self.dictionaries[column] = dictionaries.get(column, [])
+            self.dictionary_indexes[column] = {value: i for i, value in enumerate(self.dictionaries[column])}
+        self.job_numbers = set(self.columns["job_number"])
+
+    def _encode(self, column, value):
+        index = self.dictionary_indexes[column].get(value)
+        if index is None:
+            index = len(self.dictionaries[column])
+            self.dictionaries[column].append(value)
+            self.dictionary_indexes[column][value] = index
+        return index
+
+    def ingest(self, jobs):
+        """
+        Appends the finished jobs that aren't archived yet.
+
+        Args:
+            jobs (list): Jobs as returned by api.get_jobs() (its 'data').
+
+        Returns:
+            int: The number of jobs added.
+        """
+        new_rows = {column: array.array(typecode) for column, typecode in COLUMNS.items()}
+        dictionary_sizes = {column: len(self.dictionaries[column]) for column in STRING_COLUMNS}
+        for job in jobs:
+            if job["status"] in ACTIVE_STATUSES or job["job_number"] in self.job_numbers:
+                continue
+            job_labels_list = util.string_list_to_list(job.get("job_label"))
+            device_id = util.get_device_from_job_labels(job_labels_list) or ""
+            failure_phase = ""
+            if job["status"] in FAILED_STATUSES:
+                failure_phase = extract_failure_phase(job, verbose=False)
+
+            new_rows["job_number"].append(job["job_number"])
+            new_rows["project"].append(self._encode("project", get_project_from_job_labels(job_labels_list, device_id)))
+            new_rows["udid"].append(self._encode("udid", device_id))
+            new_rows["status"].append(self._encode("status", job["status"]))
+            new_rows["failure_phase"].append(self._encode("failure_phase", failure_phase))
+            new_rows["tcdp"].append(1 if "tcdp" in job_labels_list else 0)
+            new_rows["start_time"].append(parse_time(job.get("start_time") or job.get("created_at")))
+            new_rows["end_time"].append(parse_time(job.get("end_time")))
+            self.job_numbers.add(job["job_number"])
+
+        added = len(new_rows["job_number"])
+        if not added:
+            return 0
+
+        os.makedirs(self.path, exist_ok=True)
+        if any(len(self.dictionaries[column]) != size for column, size in dictionary_sizes.items()):
+            self._write_json("dictionaries.json", self.dictionaries)
+        for column, values in new_rows.items():
+            column_path = self._column_path(column)
+            with open(column_path, "ab") as column_file:
+                # drop rows of an interrupted update
+                column_file.truncate(self.rows * values.itemsize)
+                values.tofile(column_file)
+            self.columns[column].extend(values)
+        self.rows += added
+        self._write_json("meta.json", {"version": ARCHIVE_VERSION, "rows": self.rows})
+        return added
+
+    # queries
+    #
+    # select() returns a mask (one byte per row) that the aggregations below
+    # apply with itertools.compress, so they run at C speed over the columns.
+
+    def select(self, since=None, until=None, statuses=None, tcdp_only=False):
+        """
+        Returns a mask of the jobs that finished in [since, until).
+
+        Jobs without an end time are placed by their start time.
+
+        Args:
+            since (int): Epoch seconds, None for no lower bound.
+            until (int): Epoch seconds, None for no upper bound.
+            statuses (iterable): Only select jobs with these statuses.
+            tcdp_only (bool): Only select jobs started by the devicepool.
+
+        Returns:
+            bytes: 1 for each selected row, 0 otherwise.
+        """
+        since = since if since is not None else -sys.maxsize
+        until = until if until is not None else sys.maxsize
+        status_codes = None
+        if statuses is not None:
+            status_codes = {
+                self.dictionary_indexes["status"][s] for s in statuses if s in self.dictionary_indexes["status"]
+            }
+        columns = self.columns
+        return bytes(
+            since <= (end_time or start_time) < until
+            and (not tcdp_only or tcdp)
+            and (status_codes is None or status in status_codes)
+            for end_time, start_time, tcdp, status in zip(
+                columns["end_time"], columns["start_time"], columns["tcdp"], columns["status"]
+            )
+        )
+
+    def select_days(self, days, now=None, **kwargs):
+        """Returns a mask of the jobs that finished in the last days days, see select()."""
+        if now is None:
+            now = time.time()
+        return self.select(since=int(now - days * 86400), **kwargs)
+
+    def _decode(self, column, values):
+        if column in STRING_COLUMNS:
+            dictionary = self.dictionaries[column]
+            return [dictionary[value] for value in values]
+        return list(values)
+
+    def count(self, column, mask):
+        """Returns {value: number of selected rows with that value} for a column."""
+        counts = Counter(compress(self.columns[column], mask))
+        keys = self._decode(column, counts)
+        return dict(zip(keys, counts.values()))
+
+    def count_pairs(self, column_1, column_2, mask):
+        """Returns {(value 1, value 2): number of selected rows} for two columns."""
+        counts = Counter(zip(compress(self.columns[column_1], mask), compress(self.columns[column_2], mask)))
+        keys_1 = self._decode(column_1, [key[0] for key in counts])
+        keys_2 = self._decode(column_2, [key[1] for key in counts])
+        return dict(zip(zip(keys_1, keys_2), counts.values()))
+
+    def time_range(self, mask):
+        """Returns the (earliest, latest) start time of the selected rows, None if there are none."""
+        start_times = [start_time for start_time in compress(self.columns["start_time"], mask) if start_time]
+        if not start_times:
+            return None
+        return min(start_times), max(start_times)
+
+
+def main():
+    DEFAULT_JOBS = 1000
+
+    parser = argparse.ArgumentParser(description="Maintain the archive of finished LambdaTest jobs.")
+    parser.add_argument("command", choices=["update", "info"], help="update: archive new jobs, info: show a summary")
+    parser.add_argument(
+        "--archive",
+        default=DEFAULT_JOB_ARCHIVE,
+        help=f"Archive directory (default: {DEFAULT_JOB_ARCHIVE})",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"Number of latest jobs to fetch for update, more than finish between updates (default: {DEFAULT_JOBS})",
+    )
+    args = parser.parse_args()
+
+    archive = JobArchive(args.archive)
+    if args.command == "update":
+        lt_username = os.environ["LT_USERNAME"]
+        lt_api_key = os.environ["LT_ACCESS_KEY"]
+        jobs = get_jobs(lt_username, lt_api_key, jobs=args.jobs)
+        if jobs is None:
+            sys.exit(1)
+        added = archive.ingest(jobs["data"])
+        print(f"Archived {added} new jobs ({len(archive)} total) in {archive.path}")
+    else:
+        mask = archive.select()
+        print(f"Archive: {archive.path}")
+        print(f"  Jobs: {len(archive)}")
+        time_range = archive.time_range(mask)
+        if time_range:
+            start, end = (datetime.datetime.fromtimestamp(t, datetime.timezone.utc).isoformat() for t in time_range)
+            print(f"  Job Date Range: {start} to {end}")
+        print(f"  Statuses: {archive.count('status', mask)}")
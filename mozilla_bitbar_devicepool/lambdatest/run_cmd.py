@@ -11,6 +11,8 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from tqdm import tqdm
 
+from mozilla_bitbar_devicepool.util.rate_limit import TokenBucket
+
 
 def generate_config(udid, command, queue_timeout=900):
     fixed_ip_line = f'fixedIP: "{udid}"'
@@ -187,6 +189,14 @@ def _is_queue_timeout(text):
     return any(p in lower for p in _QUEUE_TIMEOUT_PATTERNS)
 
 
+def _run_rate_limited(start_bucket, udid, *args):
+    # the worker takes the token right before launching, so the launches are spaced
+    # even when the pool is full and the jobs start as others finish
+    if start_bucket is not None:
+        start_bucket.acquire()
+    return run_on_device(udid, *args)
+
+
 def _run_batch(
     udids,
     command,
@@ -198,16 +208,26 @@ def _run_batch(
     script_path,
     label="",
     start_delay=5,
+    start_burst=1,
     on_update=None,
 ):
     results = {}
+    # at most start_burst launches at once, then one every start_delay seconds
+    start_bucket = TokenBucket(1 / start_delay, burst=start_burst) if start_delay > 0 else None
     with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        # all devices are submitted at once, results are collected while launches are still paced
         futures = {}
-        for i, udid in enumerate(udids):
-            if i > 0 and start_delay > 0:
-                time.sleep(start_delay)
+        for udid in udids:
             future = executor.submit(
-                run_on_device, udid, command, project_root_dir, user_script_dir, timeout, queue_timeout, script_path
+                _run_rate_limited,
+                start_bucket,
+                udid,
+                command,
+                project_root_dir,
+                user_script_dir,
+                timeout,
+                queue_timeout,
+                script_path,
             )
             futures[future] = udid
         succeeded = 0
@@ -237,6 +257,7 @@ def run_on_all_devices(
     max_retries=5,
     retry_wait=10,
     start_delay=1,
+    start_burst=1,
     on_update=None,
 ):
     results = _run_batch(
@@ -250,6 +271,7 @@ def run_on_all_devices(
         script_path,
         label=f"attempt 1/{max_retries + 1}",
         start_delay=start_delay,
+        start_burst=start_burst,
         on_update=on_update,
     )
 
@@ -272,6 +294,7 @@ def run_on_all_devices(
             script_path,
             label=f"attempt {attempt + 1}/{max_retries + 1}",
             start_delay=start_delay,
+            start_burst=start_burst,
             on_update=lambda partial: on_update({**results, **partial}) if on_update else None,
         )
         results.update(retry_results)
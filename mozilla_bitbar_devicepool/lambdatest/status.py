@@ -292,8 +292,13 @@ def lt_success_rate_report():
         action="store_true",
         help="Enable verbose output",
     )
+    add_archive_arguments(parser)
     args = parser.parse_args()
 
+    if args.archive:
+        print_success_rate_report(*success_rate_from_archive(args.archive, args.days))
+        return
+
     lt_username = os.environ["LT_USERNAME"]
     lt_api_key = os.environ["LT_ACCESS_KEY"]
 
@@ -379,6 +384,30 @@ def lt_success_rate_report():
     else:
         date_range_string = "(no start_time data found)"
 
+    print_success_rate_report(
+        total_count,
+        date_range_string,
+        skipped_count,
+        running_count,
+        completed_count,
+        success_count,
+        failure_count,
+        failure_phase_dict,
+        failure_phase_device_list_summary,
+    )
+
+
+def print_success_rate_report(
+    total_count,
+    date_range_string,
+    skipped_count,
+    running_count,
+    completed_count,
+    success_count,
+    failure_count,
+    failure_phase_dict,
+    failure_phase_device_list_summary,
+):
     print(f"Job Success Report:")
     print(f"  Total Jobs: {total_count}")
     print(f"    Job Date Range: {date_range_string}")
@@ -397,15 +426,77 @@ def lt_success_rate_report():
         print(f"  Success Rate (success_count / completed_count): {success_count / completed_count * 100:.2f}%")
 
 
-def extract_failure_phase(job):
+def add_archive_arguments(parser):
+    """Adds the options of the reports that can read the job archive (see job_archive.py)."""
+    from mozilla_bitbar_devicepool.lambdatest.job_archive import DEFAULT_JOB_ARCHIVE
+
+    parser.add_argument(
+        "--archive",
+        nargs="?",
+        const=DEFAULT_JOB_ARCHIVE,
+        metavar="DIR",
+        help=f"Report on the job archive instead of the latest jobs (default dir: {DEFAULT_JOB_ARCHIVE})",
+    )
+    parser.add_argument(
+        "--days",
+        type=float,
+        default=7,
+        help="With --archive, report on the jobs that finished in the last DAYS days (default: 7)",
+    )
+
+
+def success_rate_from_archive(archive_path, days):
+    """Returns the print_success_rate_report() arguments for the jobs archived in the last days days."""
+    from mozilla_bitbar_devicepool.lambdatest.job_archive import JobArchive
+
+    archive = JobArchive(archive_path)
+    all_jobs = archive.select_days(days)
+    tcdp_jobs = archive.select_days(days, tcdp_only=True)
+    failed_jobs = archive.select_days(days, tcdp_only=True, statuses=["failed", "timeout"])
+
+    status_counts = archive.count("status", tcdp_jobs)
+    success_count = status_counts.get("completed", 0)
+    failure_count = status_counts.get("failed", 0) + status_counts.get("timeout", 0)
+    completed_count = success_count + failure_count
+    skipped_count = sum(all_jobs) - sum(tcdp_jobs)
+
+    failure_phase_device_list_summary = {}
+    phase_device_counts = archive.count_pairs("failure_phase", "udid", failed_jobs)
+    for (phase, device), count in sorted(phase_device_counts.items(), key=lambda item: item[1], reverse=True):
+        failure_phase_device_list_summary.setdefault(phase, {})[device or None] = count
+
+    time_range = archive.time_range(tcdp_jobs)
+    if time_range:
+        min_time, max_time = (datetime.datetime.fromtimestamp(t, datetime.timezone.utc) for t in time_range)
+        date_range_string = f"{min_time.isoformat()} to {max_time.isoformat()}"
+    else:
+        date_range_string = "(no start_time data found)"
+
+    # the archive only holds finished jobs
+    running_count = 0
+    return (
+        completed_count + running_count + skipped_count,
+        date_range_string,
+        skipped_count,
+        running_count,
+        completed_count,
+        success_count,
+        failure_count,
+        archive.count("failure_phase", failed_jobs),
+        failure_phase_device_list_summary,
+    )
+
+
+def extract_failure_phase(job, verbose=True):
     test_failure_phase = "testing"  # default phase
     # TODO: should we not have a default? should we raise in some cases?
     if "job_summary" in job and job["job_summary"] is not None:
         # print("job summary:")
         # pprint.pprint(job["job_summary"])
         if len(job["job_summary"]) == 0:
-            print("job summary is empty")
-            pprint.pprint(job)
+            if verbose:
+                print("job summary is empty")
+                pprint.pprint(job)
             return test_failure_phase
         for phase, phase_details in job["job_summary"].items():
             # print(f"  - {phase}: {phase_details}")
@@ -414,7 +505,7 @@ def extract_failure_phase(job):
                 # print(f"    - {phase_details['name']}: {phase_details['status']}")
                 # print(f"{phase}: failed zazaaz")
                 test_failure_phase = phase.split("_")[0]
-    else:
+    elif verbose:
         print("job summary not in job or is None")
         pprint.pprint(job)
     return test_failure_phase
@@ -436,22 +527,29 @@ def lt_failed_job_report(verbose=True):
         action="store_true",
         help="Enable verbose output",
     )
+    add_archive_arguments(parser)
     args = parser.parse_args()
 
-    lt_username = os.environ["LT_USERNAME"]
-    lt_api_key = os.environ["LT_ACCESS_KEY"]
-
-    status = Status(lt_username, lt_api_key)
-
-    # pprint.pprint(status.get_running_job_count())
-    # sys.exit()
-
     # maintain a data structure tracking failure counts to devices
     device_failure_count = {}
     failure_phase_count = {}
 
+    if args.archive:
+        from mozilla_bitbar_devicepool.lambdatest.job_archive import JobArchive
+
+        archive = JobArchive(args.archive)
+        failed_jobs = archive.select_days(args.days, tcdp_only=True, statuses=["failed"])
+        device_failure_count = archive.count("udid", failed_jobs)
+        device_failure_count.pop("", None)
+        failure_phase_count = archive.count("failure_phase", failed_jobs)
+        jobs = []
+    else:
+        lt_username = os.environ["LT_USERNAME"]
+        lt_api_key = os.environ["LT_ACCESS_KEY"]
+        jobs = get_jobs(lt_username, lt_api_key, status="failed", jobs=args.jobs)["data"]
+
     # pprint.pprint(status.get_jobs())
-    for job in get_jobs(lt_username, lt_api_key, status="failed", jobs=args.jobs)["data"]:
+    for job in jobs:
         inspection_flag = False
 
         job_labels_list = util.string_list_to_list(job["job_label"])
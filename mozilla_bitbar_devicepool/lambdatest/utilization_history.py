@@ -0,0 +1,320 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import argparse
+import datetime
+import mmap
+import os
+import struct
+import sys
+import time
+
+from mozilla_bitbar_devicepool.util import misc
+
+# a fixed-size, memory-mapped time series of the device counters of the LT manager
+#
+# the reporter thread of the manager records the global and per-project counters
+# every 30 seconds. each sample goes into two rings:
+#   - 30 second buckets for a day
+#   - 5 minute buckets for 30 days
+# a bucket holds the sum, the number of samples and the max of each counter, so
+# the 5 minute buckets downsample as the samples come in (mean and peak).
+#
+# `lt_utilization` shows utilization percentiles and the peak concurrency, e.g.
+# to size global.contract_device_count.
+#
+# layout (one file, HEADER_SIZE bytes of header, then the rings):
+#   header   magic, version, MAX_SERIES and FIELDS count, then MAX_SERIES names, then
+#            the time each series was last recorded (q)
+#   bucket   start time (q), samples (q), then for each series and field: sum (i), max (i)
+#
+# one writer (the manager). the writer clears a bucket by zeroing its sample count
+# first and writes the count last, readers skip buckets without samples.
+#
+# a series that hasn't been recorded for SERIES_RETENTION (e.g. a project removed from
+# the config) gives up its slot to a new series once all slots are taken.
+
+DEFAULT_UTILIZATION_HISTORY = os.path.join(misc.get_cache_dir(), "lt_utilization.bin")
+
+MAGIC = b"LTUH"
+HISTORY_VERSION = 1
+HEADER_SIZE = 4096
+MAX_SERIES = 24
+SERIES_NAME_SIZE = 48
+GLOBAL_SERIES = "global"
+
+# counters of each series, 'contract' is only set for the global series
+FIELDS = ("devices", "contract", "active", "busy", "cleanup", "tc_jobs")
+
+# (bucket seconds, buckets)
+TIERS = (
+    (30, 24 * 60 * 2),
+    (5 * 60, 30 * 24 * 12),
+)
+
+# the data of a series is gone from both rings after this long
+SERIES_RETENTION = max(seconds * buckets for seconds, buckets in TIERS)
+
+_HEADER = struct.Struct("<4sIII")
+_LAST_RECORDED = struct.Struct(f"<{MAX_SERIES}q")
+_LAST_RECORDED_OFFSET = _HEADER.size + MAX_SERIES * SERIES_NAME_SIZE
+_BUCKET_HEAD = struct.Struct("<qq")
+_BUCKET_VALUES = struct.Struct(f"<{MAX_SERIES * len(FIELDS) * 2}i")
+BUCKET_SIZE = _BUCKET_HEAD.size + _BUCKET_VALUES.size
+
+
+def get_file_size():
+    return HEADER_SIZE + sum(buckets for _seconds, buckets in TIERS) * BUCKET_SIZE
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of a sorted, non-empty list."""
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class UtilizationHistory:
+    def __init__(self, path=DEFAULT_UTILIZATION_HISTORY, writable=False):
+        self.path = path
+        self.writable = writable
+        if writable and not os.path.exists(path):
+            self._create()
+        with open(path, "r+b" if writable else "rb") as history_file:
+            self.mmap = mmap.mmap(
+                history_file.fileno(), get_file_size(), access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+            )
+        magic, version, max_series, field_count = _HEADER.unpack_from(self.mmap, 0)
+        if magic != MAGIC or version != HISTORY_VERSION or max_series != MAX_SERIES or field_count != len(FIELDS):
+            self.close()
+            raise ValueError(f"{path}: not a utilization history of version {HISTORY_VERSION}")
+
+    def _create(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # write a temporary file and rename it so readers never see a partial header
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as history_file:
+            # sparse, the rings are only allocated as they are written
+            history_file.truncate(get_file_size())
+            history_file.write(_HEADER.pack(MAGIC, HISTORY_VERSION, MAX_SERIES, len(FIELDS)))
+        os.replace(tmp_path, self.path)
+
+    def close(self):
+        self.mmap.close()
+
+    def get_series_names(self):
+        """Returns the names of the recorded series, by slot."""
+        names = []
+        for slot in range(MAX_SERIES):
+            offset = _HEADER.size + slot * SERIES_NAME_SIZE
+            name = self.mmap[offset : offset + SERIES_NAME_SIZE].rstrip(b"\0").decode(errors="replace")
+            names.append(name or None)
+        return names
+
+    def get_last_recorded(self):
+        """Returns the time each series was last recorded, by slot (0 if never)."""
+        return list(_LAST_RECORDED.unpack_from(self.mmap, _LAST_RECORDED_OFFSET))
+
+    def _get_free_slot(self, series_names, last_recorded, now):
+        if None in series_names:
+            return series_names.index(None)
+        # the least recently recorded series, if its data has expired
+        slot = min(range(MAX_SERIES), key=lambda slot: last_recorded[slot])
+        if last_recorded[slot] <= now - SERIES_RETENTION:
+            return slot
+        return None
+
+    def _add_series(self, name, series_names, last_recorded, now):
+        encoded_name = name.encode()
+        # a cut name wouldn't be found again (and could split a character)
+        if len(encoded_name) > SERIES_NAME_SIZE:
+            return None
+        slot = self._get_free_slot(series_names, last_recorded, now)
+        if slot is None:
+            return None
+        offset = _HEADER.size + slot * SERIES_NAME_SIZE
+        self.mmap[offset : offset + SERIES_NAME_SIZE] = encoded_name.ljust(SERIES_NAME_SIZE, b"\0")
+        series_names[slot] = name
+        last_recorded[slot] = now
+        return slot
+
+    def _bucket_offset(self, tier, bucket_start):
+        seconds, buckets = TIERS[tier]
+        offset = HEADER_SIZE + sum(tier_buckets for _seconds, tier_buckets in TIERS[:tier]) * BUCKET_SIZE
+        return offset + (bucket_start // seconds) % buckets * BUCKET_SIZE
+
+    def record(self, samples, now=None):
+        """
+        Adds a sample of the counters to the history.
+
+        Args:
+            samples (dict): {series name: {field: value}}, see FIELDS (missing fields are 0).
+                New series are dropped while MAX_SERIES series were recorded within
+                SERIES_RETENTION, as are series with names longer than SERIES_NAME_SIZE bytes.
+            now (float): Time of the sample, defaults to time.time().
+
+        Returns:
+            list: The names of the series that were dropped.
+        """
+        if now is None:
+            now = time.time()
+        now = int(now)
+        series_names = self.get_series_names()
+        last_recorded = self.get_last_recorded()
+        for slot, name in enumerate(series_names):
+            # a series from before the times were kept, its data expires from now on
+            if name is not None and not last_recorded[slot]:
+                last_recorded[slot] = now
+        slot_samples = {}
+        # the known series first, so a series being recorded is never taken for a new one
+        for name, counters in samples.items():
+            if name in series_names:
+                slot = series_names.index(name)
+                slot_samples[slot] = counters
+                last_recorded[slot] = now
+        dropped = []
+        for name, counters in samples.items():
+            if name in series_names:
+                continue
+            slot = self._add_series(name, series_names, last_recorded, now)
+            if slot is None:
+                dropped.append(name)
+                continue
+            slot_samples[slot] = counters
+        _LAST_RECORDED.pack_into(self.mmap, _LAST_RECORDED_OFFSET, *last_recorded)
+
+        for tier, (seconds, _buckets) in enumerate(TIERS):
+            bucket_start = now - now % seconds
+            offset = self._bucket_offset(tier, bucket_start)
+            start, count = _BUCKET_HEAD.unpack_from(self.mmap, offset)
+            if start != bucket_start:
+                # the bucket holds data from an older lap of the ring
+                _BUCKET_HEAD.pack_into(self.mmap, offset, start, 0)
+                values = [0] * (MAX_SERIES * len(FIELDS) * 2)
+                count = 0
+            else:
+                values = list(_BUCKET_VALUES.unpack_from(self.mmap, offset + _BUCKET_HEAD.size))
+            for slot, counters in slot_samples.items():
+                for field_index, field in enumerate(FIELDS):
+                    value = int(counters.get(field, 0))
+                    index = (slot * len(FIELDS) + field_index) * 2
+                    values[index] += value
+                    values[index + 1] = max(values[index + 1], value) if count else value
+            _BUCKET_VALUES.pack_into(self.mmap, offset + _BUCKET_HEAD.size, *values)
+            _BUCKET_HEAD.pack_into(self.mmap, offset, bucket_start, count + 1)
+        return dropped
+
+    def flush(self):
+        self.mmap.flush()
+
+    def query(self, series, since, until=None):
+        """
+        Returns the buckets of a series in [since, until), oldest first.
+
+        Uses the 30 second buckets if they cover since, the 5 minute buckets otherwise.
+
+        Returns:
+            list: (bucket start, {field: mean}, {field: max}) tuples.
+        """
+        if until is None:
+            until = time.time()
+        series_names = self.get_series_names()
+        if series not in series_names:
+            return []
+        slot = series_names.index(series)
+
+        # the first tier that reaches back to since
+        tier = len(TIERS) - 1
+        for tier_index, (seconds, buckets) in enumerate(TIERS):
+            if until - since <= seconds * buckets:
+                tier = tier_index
+                break
+        seconds, buckets = TIERS[tier]
+        first_offset = self._bucket_offset(tier, 0)
+
+        results = []
+        for bucket in range(buckets):
+            offset = first_offset + bucket * BUCKET_SIZE
+            start, count = _BUCKET_HEAD.unpack_from(self.mmap, offset)
+            if not count or not since <= start < until:
+                continue
+            values = _BUCKET_VALUES.unpack_from(self.mmap, offset + _BUCKET_HEAD.size)
+            means = {}
+            maxes = {}
+            for field_index, field in enumerate(FIELDS):
+                index = (slot * len(FIELDS) + field_index) * 2
+                means[field] = values[index] / count
+                maxes[field] = values[index + 1]
+            results.append((start, means, maxes))
+        results.sort(key=lambda result: result[0])
+        return results
+
+
+def get_utilization_summary(buckets, series):
+    """
+    Summarizes the buckets of a series (see UtilizationHistory.query()).
+
+    Utilization is busy devices / contract devices for the global series and busy devices /
+    devices for projects.
+
+    Returns:
+        dict: 'buckets', 'capacity', utilization 'percentiles' ({percent: utilization %}) of
+            the bucket means, 'peak_busy' and 'peak_time' (bucket start), None if there are
+            no buckets.
+    """
+    if not buckets:
+        return None
+    capacity_field = "contract" if series == GLOBAL_SERIES else "devices"
+    # the latest capacity, it can change with the config
+    capacity = buckets[-1][2][capacity_field]
+    busy_means = sorted(means["busy"] for _start, means, _maxes in buckets)
+    peak_time, _means, peak_maxes = max(buckets, key=lambda bucket: bucket[2]["busy"])
+    return {
+        "buckets": len(buckets),
+        "capacity": capacity,
+        "percentiles": {
+            percent: (percentile(busy_means, percent) / capacity * 100 if capacity > 0 else 0.0)
+            for percent in (50, 90, 95, 99)
+        },
+        "peak_busy": peak_maxes["busy"],
+        "peak_time": peak_time,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the device utilization recorded by the LambdaTest manager.")
+    parser.add_argument(
+        "--history",
+        default=DEFAULT_UTILIZATION_HISTORY,
+        help=f"Utilization history file (default: {DEFAULT_UTILIZATION_HISTORY})",
+    )
+    parser.add_argument("--days", type=float, default=1, help="Days to look back (default: 1)")
+    parser.add_argument(
+        "--series",
+        action="append",
+        help=f"Series to show, '{GLOBAL_SERIES}' or a project name (default: all, can be repeated)",
+    )
+    args = parser.parse_args()
+
+    try:
+        history = UtilizationHistory(args.history)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Unable to open the utilization history: {e}")
+        sys.exit(1)
+
+    now = time.time()
+    series_names = args.series or [name for name in history.get_series_names() if name]
+    print(f"Utilization over the last {args.days:g} {misc.pluralize('day', args.days)} ({args.history}):")
+    for series in series_names:
+        summary = get_utilization_summary(history.query(series, since=now - args.days * 86400, until=now), series)
+        if summary is None:
+            print(f"  {series}: no data")
+            continue
+        capacity_name = "contract" if series == GLOBAL_SERIES else "devices"
+        percentiles = ", ".join(f"p{percent}: {value:.1f}%" for percent, value in summary["percentiles"].items())
+        peak_time = datetime.datetime.fromtimestamp(summary["peak_time"], datetime.timezone.utc).isoformat()
+        print(
+            f"  {series} ({summary['capacity']} {capacity_name}, {summary['buckets']} samples): {percentiles}, "
+            f"peak busy: {summary['peak_busy']} at {peak_time}"
+        )
+    history.close()
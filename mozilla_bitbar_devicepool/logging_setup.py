@@ -1,12 +1,59 @@
 # logging_setup.py
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
 
+# records are put on a queue by the logging threads and written by a listener thread,
+# so a slow stderr (e.g. journald under load) doesn't hold up the scheduling threads.
+#
+# the queue handler only formats the message of records that pass the level, use lazy
+# %-style arguments for messages logged every cycle:
+#   logging.debug("%s Available for Job Start: %s", logging_header, available_devices)
 
-def setup_logging(level=logging.INFO, disable_timestamps=False):
-    """Configure logging with timestamps and levels."""
+# the running listener, see stop_logging()
+_listener = None
 
-    # Assuming your setup function configures the root logger
-    logging.basicConfig(level=level)  # Or however you set the root level
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # merge the arguments now, they may change (e.g. device lists) before the record is
+        # written. the base class also formats and copies the record on the logging thread,
+        # there is only this handler and exc_info can cross threads, so neither is needed.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(entry)
+
+
+def setup_logging(level=logging.INFO, disable_timestamps=False, json_output=False, use_queue=True, stream=None):
+    """
+    Configure logging with timestamps and levels.
+
+    Args:
+        json_output (bool): Write one JSON object per record instead of text.
+        use_queue (bool): Write the records from a listener thread (see the top of this file).
+        stream: Stream to write to, defaults to sys.stderr.
+    """
+    global _listener
 
     # for requests, it gets too chatty
     # TODO: make -vv show these or something
@@ -31,17 +78,56 @@ def setup_logging(level=logging.INFO, disable_timestamps=False):
         format_string = "%(levelname)s - %(message)s"
         format_string_with_time = "%(asctime)s - %(levelname)s - %(message)s"
 
-    if disable_timestamps:
+    handler = logging.StreamHandler(stream)
+    if json_output:
+        # structured output always has the time
+        handler.setFormatter(JsonFormatter(datefmt="%Y-%m-%dT%H:%M:%S%z"))
+    elif disable_timestamps:
         # Disable timestamps in the log messages
-        logging.basicConfig(
-            level=level,
-            format=format_string,
-            force=True,  # Force reconfiguration of the root logger
-        )
+        handler.setFormatter(logging.Formatter(format_string))
     else:
-        logging.basicConfig(
-            level=level,
-            format=format_string_with_time,
-            datefmt="%Y-%m-%d %H:%M:%S",
-            force=True,  # Force reconfiguration of the root logger
-        )
+        handler.setFormatter(logging.Formatter(format_string_with_time, datefmt="%Y-%m-%d %H:%M:%S"))
+
+    # Force reconfiguration of the root logger
+    stop_logging()
+    root_logger = logging.getLogger()
+    for existing_handler in list(root_logger.handlers):
+        root_logger.removeHandler(existing_handler)
+        existing_handler.close()
+    root_logger.setLevel(level)
+
+    if use_queue:
+        log_queue = queue.SimpleQueue()
+        root_logger.addHandler(_QueueHandler(log_queue))
+        _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+        _listener.start()
+        # once, setup_logging() may be called again
+        atexit.unregister(stop_logging)
+        atexit.register(stop_logging)
+    else:
+        root_logger.addHandler(handler)
+
+
+def stop_logging(timeout=None):
+    """
+    Writes the queued records and stops the listener thread, if any.
+
+    Args:
+        timeout (float): Seconds to wait for the records to be written, None to wait until
+            they are. A listener stuck writing (e.g. a blocked stderr) is left behind.
+    """
+    global _listener
+
+    listener = _listener
+    if listener is None:
+        return
+    _listener = None
+    if timeout is None:
+        listener.stop()
+        return
+    # QueueListener.stop() without the unbounded join
+    thread = listener._thread
+    if thread is not None:
+        listener.enqueue_sentinel()
+        thread.join(timeout)
+        listener._thread = None
@@ -3,6 +3,7 @@
 # You can obtain one at http://mozilla.org/MPL/2.0/.
 
 import argparse
+import logging
 import os
 import sys
 import zipfile
@@ -10,11 +11,12 @@ import zipfile
 from mozilla_bitbar_devicepool import (
     TESTDROID,
     configuration,
+    jobs_to_start,
     logger,
     modulepath,
 )
 from mozilla_bitbar_devicepool.bitbar.runs import run_test_for_project
-from mozilla_bitbar_devicepool.test_run_manager import TestRunManager
+from mozilla_bitbar_devicepool.test_run_manager import MultiServerTestRunManager, TestRunManager, init_sentry
 from mozilla_bitbar_devicepool.util.network import download_file
 
 testdroid_apk_url = "https://github.com/bitbar/test-samples/raw/master/apps/android/testdroid-sample-app.apk"
@@ -40,23 +42,55 @@ def empty_test_zip(args):
 
 
 def test_run_manager(args):
-    if not TESTDROID:
-        logger.warning("The environment variabels TESTDROID_URL, TESTDROID_APIKEY both need to be set.")
+    bitbar_configpaths = args.bitbar_config or [os.path.join(modulepath, "config", "config.yml")]
+    bitbar_cache_paths = args.bitbar_cache or [None] * len(bitbar_configpaths)
+    if len(bitbar_cache_paths) != len(bitbar_configpaths):
+        logger.warning("--bitbar-cache must be given once for each --bitbar-config.")
         sys.exit(1)
 
-    if args.bitbar_config is None:
-        bitbar_configpath = os.path.join(modulepath, "config", "config.yml")
+    bitbar_configurations = []
+    for bitbar_configpath, bitbar_cache_path in zip(bitbar_configpaths, bitbar_cache_paths):
+        bitbar_configuration = configuration.BitbarConfiguration(
+            os.path.splitext(os.path.basename(bitbar_configpath))[0]
+        )
+        try:
+            bitbar_configuration.configure(
+                bitbar_configpath,
+                filespath=args.files,
+                update_bitbar=args.update_bitbar,
+                cache_path=bitbar_cache_path,
+            )
+        except configuration.DuplicateProjectException as e:
+            logger.warning("Duplicate project found! Please archive all but one and restart. Exiting...")
+            logger.warning(e)
+            sys.exit(1)
+        except configuration.ConfigurationException as e:
+            logger.warning(e)
+            sys.exit(1)
+        for other in bitbar_configurations:
+            if other.testdroid_url == bitbar_configuration.testdroid_url:
+                logger.warning(
+                    "%s and %s both use %s. Exiting..."
+                    % (other.name, bitbar_configuration.name, bitbar_configuration.testdroid_url)
+                )
+                sys.exit(1)
+        bitbar_configurations.append(bitbar_configuration)
+
+    if len(bitbar_configurations) == 1:
+        manager = TestRunManager(wait=args.wait, bitbar_configuration=bitbar_configurations[0])
     else:
-        bitbar_configpath = args.bitbar_config
-
-    try:
-        configuration.configure(bitbar_configpath, filespath=args.files, update_bitbar=args.update_bitbar)
-    except configuration.DuplicateProjectException as e:
-        logger.warning("Duplicate project found! Please archive all but one and restart. Exiting...")
-        logger.warning(e)
-        sys.exit(1)
-
-    manager = TestRunManager(wait=args.wait)
+        manager = MultiServerTestRunManager(
+            [
+                TestRunManager(
+                    wait=args.wait,
+                    bitbar_configuration=bitbar_configuration,
+                    thread_name_prefix="%s/" % bitbar_configuration.name,
+                )
+                for bitbar_configuration in bitbar_configurations
+            ],
+            wait=args.wait,
+        )
+    init_sentry()
     manager.run()
 
 
@@ -76,6 +110,15 @@ def run_test(args):
     logger.info("run started for project '%s'" % args.project_name)
 
 
+def replay_jobs_to_start(args):
+    with open(args.log) as log_file:
+        recorded = jobs_to_start.parse_stats_log(log_file)
+    if not recorded:
+        logger.warning("No stats lines found in %s." % args.log)
+        sys.exit(1)
+    print(jobs_to_start.format_replay(jobs_to_start.replay(recorded, args.strategies)))
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Mozilla Android Hardware testing at Bitbar.",
@@ -89,6 +132,9 @@ start the test_run_manager.
 TESTDROID_URL
 TESTDROID_APIKEY
 
+A Bitbar config file can name other variables for its server with
+devicepool_config.testdroid_url_env and testdroid_apikey_env.
+
 To get additional help for each positional sub-command, add
 --help to the sub-command.
 
@@ -147,7 +193,13 @@ Terminate Now
 
     ### test-run-manager ###
     subparser = subparsers.add_parser("start-test-run-manager", help="Run the test run manager.")
-    subparser.add_argument("--bitbar-config", "-b", help="Path to Bitbar yaml configuration file.")
+    subparser.add_argument(
+        "--bitbar-config",
+        "-b",
+        action="append",
+        help="Path to Bitbar yaml configuration file. May be given several times to drive several Bitbar "
+        "servers from one process, see devicepool_config.testdroid_url_env and testdroid_apikey_env.",
+    )
     subparser.add_argument(
         "--wait",
         dest="wait",
@@ -161,8 +213,31 @@ Terminate Now
         default=False,
         help="Update the remote bitbar configuration to reflect the config file.",
     )
+    subparser.add_argument(
+        "--bitbar-cache",
+        dest="bitbar_cache",
+        action="append",
+        help="Path to a file where Bitbar ids are kept between restarts. "
+        "Cached ids are reused while the config file is unchanged and are validated on first use. "
+        "Give once for each --bitbar-config.",
+    )
     subparser.set_defaults(func=test_run_manager)
 
+    ### replay-jobs-to-start ###
+    subparser = subparsers.add_parser(
+        "replay-jobs-to-start",
+        help="Compare 'jobs to start' strategies on the stats recorded in a test run manager log then exit.",
+    )
+    subparser.add_argument("log", help="Path to a test run manager log.")
+    subparser.add_argument(
+        "--strategies",
+        nargs="+",
+        choices=list(jobs_to_start.STRATEGIES),
+        default=list(jobs_to_start.STRATEGIES),
+        help="Strategies to compare. Defaults to all.",
+    )
+    subparser.set_defaults(func=replay_jobs_to_start)
+
     ### run-test ###
     subparser = subparsers.add_parser("run-test", help="Run test for a project then exit.")
     subparser.add_argument("--bitbar-config", help="Path to Bitbar yaml configuration file.")
@@ -181,6 +256,9 @@ Terminate Now
 
     args = parser.parse_args()
 
+    # force: testdroid configures logging when it's imported
+    # TODO: put %(asctime)s back in?
+    logging.basicConfig(format="%(threadName)26s %(levelname)-8s %(message)s", force=True)
     logger.setLevel(level=args.log_level)
 
     try:
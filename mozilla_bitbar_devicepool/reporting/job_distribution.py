@@ -0,0 +1,246 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import json
+import statistics
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import mozilla_bitbar_devicepool.lambdatest.util as util
+from mozilla_bitbar_devicepool.lambdatest.api import get_devices, get_jobs
+from mozilla_bitbar_devicepool.taskcluster_client import TaskclusterClient
+
+# the job distribution report in three steps:
+#   fetch_snapshot()            one concurrent fetch of everything the report needs
+#   compute_job_distribution()  pure, works on the snapshot only
+#   render_text()/render_json() output
+
+PROVISIONER_ID = "proj-autophone"
+
+
+def get_project_worker_types(config):
+    """Returns {project: TC_WORKER_TYPE} for the projects with devices."""
+    device_groups = config.get("device_groups", {})
+    worker_types = {}
+    for project_name, project_config in config.get("projects", {}).items():
+        if device_groups.get(project_name) and project_config.get("TC_WORKER_TYPE"):
+            worker_types[project_name] = project_config["TC_WORKER_TYPE"]
+    return worker_types
+
+
+def _fetch_device_states(lt_username, lt_api_key):
+    output = get_devices(lt_username, lt_api_key)
+    if not output:
+        raise Exception("unable to fetch the LambdaTest device list")
+    return {device["udid"]: device["status"] for device in output["data"]["private_cloud_devices"]}
+
+
+def _fetch_job_counts(lt_username, lt_api_key, jobs, archive_path, days):
+    if archive_path:
+        from mozilla_bitbar_devicepool.lambdatest.job_archive import JobArchive
+
+        archive = JobArchive(archive_path)
+        return Counter(archive.count_pairs("udid", "status", archive.select_days(days)))
+    output = get_jobs(lt_username, lt_api_key, jobs=jobs)
+    if output is None:
+        raise Exception("unable to fetch the LambdaTest jobs")
+    job_counts = Counter()
+    for job in output["data"]:
+        device_id = util.get_device_from_job_labels(util.string_list_to_list(job["job_label"]))
+        job_counts[(device_id or "", job["status"])] += 1
+    return job_counts
+
+
+def _fetch_quarantined(worker_type):
+    return TaskclusterClient(verbose=False).get_quarantined_worker_names(PROVISIONER_ID, worker_type)
+
+
+def get_spread(job_counts):
+    """
+    Returns how evenly jobs are spread over devices.
+
+    Args:
+        job_counts (list): Number of jobs of each device, including devices without jobs.
+
+    Returns:
+        dict: 'min', 'max' and 'mean' jobs per device and 'cv', the coefficient of
+            variation (standard deviation / mean, 0 is a perfectly even spread).
+    """
+    if not job_counts:
+        return {"min": 0, "max": 0, "mean": 0.0, "cv": 0.0}
+    mean = statistics.fmean(job_counts)
+    cv = statistics.pstdev(job_counts) / mean if mean else 0.0
+    return {"min": min(job_counts), "max": max(job_counts), "mean": round(mean, 2), "cv": round(cv, 2)}
+
+
+def fetch_snapshot(lt_username, lt_api_key, worker_types, jobs=400, archive_path=None, days=7, max_workers=8):
+    """
+    Fetches the LT device list, the job window and the quarantined workers of each
+    worker type concurrently, so the report takes about as long as the slowest fetch.
+
+    Args:
+        worker_types (iterable): Taskcluster worker types to fetch quarantine data for.
+        jobs (int): Number of latest jobs to fetch, unless archive_path is set.
+        archive_path (str): Read the jobs of the last days days from this job archive.
+
+    Returns:
+        dict: 'device_states' ({udid: LT state}), 'job_counts' ({(udid, status): count},
+            udid '' for jobs without a device), 'quarantined' ({worker type: [worker ids]})
+            and 'errors' ({source: message}) for the fetches that failed.
+    """
+    snapshot = {"device_states": {}, "job_counts": Counter(), "quarantined": {}, "errors": {}}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report") as executor:
+        futures = {
+            ("device_states", None): executor.submit(_fetch_device_states, lt_username, lt_api_key),
+            ("job_counts", None): executor.submit(_fetch_job_counts, lt_username, lt_api_key, jobs, archive_path, days),
+        }
+        for worker_type in sorted(set(worker_types)):
+            futures[("quarantined", worker_type)] = executor.submit(_fetch_quarantined, worker_type)
+
+        for (key, worker_type), future in futures.items():
+            try:
+                result = future.result()
+            except Exception as e:
+                snapshot["errors"][worker_type or key] = str(e)
+                continue
+            if worker_type:
+                snapshot["quarantined"][worker_type] = result
+            else:
+                snapshot[key] = result
+    return snapshot
+
+
+def compute_job_distribution(snapshot, device_groups, project_worker_types):
+    """
+    Computes the job distribution report from a snapshot (see fetch_snapshot()).
+
+    Args:
+        device_groups (dict): The configuration's device groups ({group: [udid, ...]}).
+        project_worker_types (dict): {project: worker type}, see get_project_worker_types().
+
+    Returns:
+        dict: The report, see render_text().
+    """
+    udid_to_group = {}
+    for group_name, devices in device_groups.items():
+        for udid in devices or []:
+            udid_to_group[udid] = group_name
+    quarantined = set()
+    for worker_ids in snapshot["quarantined"].values():
+        quarantined.update(worker_ids)
+    device_states = snapshot["device_states"]
+
+    device_job_count = Counter()
+    device_failure_count = Counter()
+    for (device_id, status), count in snapshot["job_counts"].items():
+        if not device_id:
+            continue
+        device_job_count[device_id] += count
+        if status == "failed":
+            device_failure_count[device_id] += count
+
+    # sort by count descending
+    device_jobs = [
+        {
+            "udid": udid,
+            "group": udid_to_group.get(udid, "unknown"),
+            "jobs": count,
+            "failures": device_failure_count[udid],
+        }
+        for udid, count in sorted(device_job_count.items(), key=lambda item: (-item[1], item[0]))
+    ]
+
+    unseen_devices = sorted(set(device_states) - set(device_job_count))
+    # group by config group, preserving config order; unknown devices go last
+    unseen_not_quarantined = {}
+    for group in list(device_groups) + ["unknown"]:
+        devices = [
+            {"udid": udid, "lt_state": device_states.get(udid, "unknown")}
+            for udid in unseen_devices
+            if udid not in quarantined and udid_to_group.get(udid, "unknown") == group
+        ]
+        if devices:
+            unseen_not_quarantined[group] = devices
+
+    projects = {}
+    for project_name, worker_type in sorted(project_worker_types.items()):
+        devices = device_groups.get(project_name) or []
+        projects[project_name] = {
+            "worker_type": worker_type,
+            "devices": len(devices),
+            "devices_seen": sum(1 for udid in devices if udid in device_job_count),
+            "jobs": sum(device_job_count[udid] for udid in devices),
+            "failures": sum(device_failure_count[udid] for udid in devices),
+            "spread": get_spread([device_job_count[udid] for udid in devices]),
+            "quarantined": (
+                sum(1 for udid in devices if udid in quarantined) if worker_type in snapshot["quarantined"] else None
+            ),
+        }
+
+    return {
+        "jobs_inspected": sum(snapshot["job_counts"].values()),
+        "device_jobs": device_jobs,
+        "unseen_devices": unseen_devices,
+        "unseen_not_quarantined": unseen_not_quarantined,
+        "projects": projects,
+        "lt_device_count": len(device_states),
+        "seen_device_count": len(device_job_count),
+        "errors": dict(snapshot["errors"]),
+    }
+
+
+def render_json(report):
+    return json.dumps(report, indent=2)
+
+
+def render_text(report, verbose=False):
+    lines = [""]
+    for source, message in sorted(report["errors"].items()):
+        lines.append(f"WARNING: unable to fetch {source}: {message}")
+    if report["errors"]:
+        lines.append("")
+
+    lines.append("Device job counts:")
+    if not report["device_jobs"]:
+        lines.append("  No jobs found.")
+    for device in report["device_jobs"]:
+        lines.append(f"  {device['udid']}: {device['jobs']} jobs, {device['failures']} failures")
+    lines.append("")
+
+    if verbose:
+        lines.append(f"Devices with no jobs run ({len(report['unseen_devices'])} devices):")
+        if not report["unseen_devices"]:
+            lines.append("  All devices have jobs run on them.")
+        for udid in report["unseen_devices"]:
+            lines.append(f"  {udid}")
+        lines.append("")
+
+    unseen_not_quarantined = report["unseen_not_quarantined"]
+    unseen_count = sum(len(devices) for devices in unseen_not_quarantined.values())
+    lines.append(f"Devices not seen that aren't quarantined ({unseen_count} devices):")
+    if not unseen_count:
+        lines.append("  All unseen devices are quarantined.")
+    for group, devices in unseen_not_quarantined.items():
+        lines.append(f"  {group}")
+        for device in devices:
+            lines.append(f"    {device['udid']} (lt api: {device['lt_state']})")
+    lines.append("")
+
+    lines.append("Projects:")
+    for project_name, project in report["projects"].items():
+        quarantined = "unknown" if project["quarantined"] is None else project["quarantined"]
+        lines.append(
+            f"  {project_name} ({project['worker_type']}): {project['devices_seen']}/{project['devices']} devices seen, "
+            f"{project['jobs']} jobs, {project['failures']} failures, {quarantined} quarantined"
+        )
+        spread = project["spread"]
+        lines.append(
+            f"    jobs per device min/mean/max: {spread['min']}/{spread['mean']}/{spread['max']}, cv: {spread['cv']}"
+        )
+    lines.append("")
+
+    lines.append(f"Jobs inspected:  {report['jobs_inspected']}")
+    lines.append(f"Total devices available (from LT devices): {report['lt_device_count']}")
+    lines.append(f"Total devices seen (from LT jobs): {report['seen_device_count']}")
+    return "\n".join(lines)
@@ -48,6 +48,13 @@ def main():
         metavar="SECS",
         help="Seconds between job submissions to avoid overwhelming the API (default: 1)",
     )
+    parser.add_argument(
+        "--start-burst",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Jobs that may start at once before --start-delay spacing applies (default: 1)",
+    )
     parser.add_argument(
         "--timeout", type=int, default=1800, metavar="SECS", help="Per-device job timeout in seconds (default: 1800)"
     )
@@ -83,7 +90,9 @@ def main():
     handler.setFormatter(logging.Formatter("%(asctime)s %(threadName)s %(levelname)s %(message)s"))
     logging.basicConfig(level=log_level, handlers=[handler])
 
-    config_object = configuration_lt.ConfigurationLt(lightweight=True)
+    config_object = configuration_lt.ConfigurationLt(
+        lightweight=True, compiled_config_cache=configuration_lt.DEFAULT_COMPILED_CONFIG_CACHE
+    )
     config_object.configure()
 
     device_groups = config_object.config.get("device_groups", {})
@@ -168,6 +177,7 @@ def main():
         max_retries=args.retries,
         retry_wait=args.retry_wait,
         start_delay=args.start_delay,
+        start_burst=args.start_burst,
         on_update=write_report,
     )
 
@@ -0,0 +1,92 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import logging
+import os
+import threading
+import time
+
+# sentry_sdk is imported by init_sentry(), it is slow to import
+
+# performance tracing sample rates, override with the environment variables
+#   - the managers are daemons, tracing every transaction is a lot of overhead and events
+TRACES_SAMPLE_RATE_ENV = "SENTRY_TRACES_SAMPLE_RATE"
+DEFAULT_TRACES_SAMPLE_RATE = 0.01
+# used for a while after an error, so the slow paths around errors are visible
+ERROR_TRACES_SAMPLE_RATE_ENV = "SENTRY_ERROR_TRACES_SAMPLE_RATE"
+DEFAULT_ERROR_TRACES_SAMPLE_RATE = 0.5
+ERROR_BOOST_SECONDS_ENV = "SENTRY_ERROR_BOOST_SECONDS"
+DEFAULT_ERROR_BOOST_SECONDS = 10 * 60
+
+
+def get_env_float(name, default, minimum=0.0, maximum=None):
+    """Returns the float in environment variable name, default if it isn't set or invalid."""
+    value = os.environ.get(name)
+    if not value:
+        return default
+    try:
+        result = float(value)
+    except ValueError:
+        logging.warning(f"{name} is not a number ({value!r}), using {default}.")
+        return default
+    if result < minimum or (maximum is not None and result > maximum):
+        logging.warning(f"{name} is out of range ({value!r}), using {default}.")
+        return default
+    return result
+
+
+class ErrorBoostedSampler:
+    """
+    A Sentry traces_sampler that samples more transactions after an error.
+
+    Transactions are sampled at base_rate, and at error_rate for boost_seconds after an
+    error event is sent (see before_send()). Transactions with a sampled parent follow
+    the parent's decision.
+    """
+
+    def __init__(self, base_rate, error_rate, boost_seconds):
+        self.base_rate = base_rate
+        self.error_rate = error_rate
+        self.boost_seconds = boost_seconds
+        # time.monotonic() until which error_rate is used
+        self.boost_until = 0
+        self.lock = threading.Lock()
+
+    def note_error(self):
+        with self.lock:
+            self.boost_until = time.monotonic() + self.boost_seconds
+
+    def __call__(self, sampling_context):
+        parent_sampled = sampling_context.get("parent_sampled")
+        if parent_sampled is not None:
+            return float(parent_sampled)
+        if time.monotonic() < self.boost_until:
+            return self.error_rate
+        return self.base_rate
+
+    def before_send(self, event, hint):
+        if event.get("level") in ("error", "fatal") or event.get("exception"):
+            self.note_error()
+        return event
+
+
+def init_sentry(dsn, **kwargs):
+    """
+    Initializes the Sentry SDK with error boosted trace sampling (see ErrorBoostedSampler).
+
+    The rates come from SENTRY_TRACES_SAMPLE_RATE, SENTRY_ERROR_TRACES_SAMPLE_RATE and
+    SENTRY_ERROR_BOOST_SECONDS. Other arguments are passed to sentry_sdk.init().
+
+    Returns:
+        ErrorBoostedSampler: The sampler.
+    """
+    import sentry_sdk
+
+    sampler = ErrorBoostedSampler(
+        get_env_float(TRACES_SAMPLE_RATE_ENV, DEFAULT_TRACES_SAMPLE_RATE, maximum=1.0),
+        get_env_float(ERROR_TRACES_SAMPLE_RATE_ENV, DEFAULT_ERROR_TRACES_SAMPLE_RATE, maximum=1.0),
+        get_env_float(ERROR_BOOST_SECONDS_ENV, DEFAULT_ERROR_BOOST_SECONDS),
+    )
+    sentry_sdk.init(dsn=dsn, traces_sampler=sampler, before_send=sampler.before_send, **kwargs)
+    return sampler
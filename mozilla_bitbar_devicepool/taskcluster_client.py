@@ -6,12 +6,13 @@ import json
 import logging
 import os
 import pprint
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # import datetime
 from datetime import datetime
 
 import requests
-import taskcluster
 from natsort import natsorted
 from requests.adapters import HTTPAdapter
 from urllib3.util import Retry
@@ -55,6 +56,9 @@ class TaskclusterClient:
 
         creds = {"clientId": data["clientId"], "accessToken": data["accessToken"]}
 
+        # imported here, it is slow to import and only the clients use it
+        import taskcluster
+
         self.tc_wm = taskcluster.WorkerManager({"rootUrl": ROOT_URL, "credentials": creds})
         self.tc_queue = taskcluster.Queue({"rootUrl": ROOT_URL, "credentials": creds})
         self.tc_ai = taskcluster.Auth({"rootUrl": ROOT_URL, "credentials": creds})
@@ -86,6 +90,8 @@ class TaskclusterClient:
     def get_quarantined_workers(self, provisioner, worker_type, results=None):
         if results is None:
             results = self.tc_wm.listWorkers(provisioner, worker_type)
+        import taskcluster
+
         # do filtering
         quarantined_workers = []
         for item in results["workers"]:
@@ -154,9 +160,92 @@ def get_taskcluster_pending_tasks(provisioner_id, worker_type, verbose=False):
     if verbose:
         print("r.status_code: %s" % r.status_code)
         print("r.text: %s" % r.text if r.text else "r.content: %s" % r.content)
-    if r.ok:
-        return r.json()["pendingTasks"]
-    return 0
+    # raise on the responses that aren't retried (e.g. 401, 404), a count of 0 would
+    # read as a confirmed empty queue
+    r.raise_for_status()
+    return r.json()["pendingTasks"]
+
+
+class PendingTasksPoller:
+    """
+    Fetches the pending task counts for a set of worker types and publishes them as a snapshot.
+
+    The counts for all worker types are fetched in parallel by poll(). Readers call
+    get_pending_tasks(), which only does a dict lookup on the current snapshot. A new
+    snapshot dict is built on each poll and swapped in with a single assignment, so
+    readers never need a lock and never wait on network I/O.
+
+    If the snapshot is older than max_age (the polling thread is stuck or keeps
+    failing), readers get 0 pending tasks and no confirmed counts instead of
+    stale ones.
+    """
+
+    def __init__(self, queues, max_workers=8, max_age=None):
+        """
+        Args:
+            queues (iterable): (provisioner_id, worker_type) tuples to poll.
+            max_workers (int): Maximum number of concurrent requests.
+            max_age (float): Seconds after which the snapshot is stale, None to never expire it.
+        """
+        self.queues = sorted(set(queues))
+        self.max_workers = max_workers
+        self.max_age = max_age
+        # (provisioner_id, worker_type) -> pending task count
+        self.snapshot = {}
+        # queues whose count could not be fetched by the latest poll (reported as 0)
+        self.failed_queues = frozenset()
+        self.last_poll_time = None
+
+    def poll(self):
+        """Fetch pending counts for all queues and publish a new snapshot.
+
+        A queue whose fetch fails reports 0 pending tasks, so callers don't start
+        jobs on the basis of a count we couldn't confirm.
+
+        Returns:
+            dict: The newly published snapshot.
+        """
+        new_snapshot = {}
+        failed_queues = set()
+        if self.queues:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(self.queues))) as executor:
+                futures = {
+                    executor.submit(get_taskcluster_pending_tasks, provisioner_id, worker_type): (
+                        provisioner_id,
+                        worker_type,
+                    )
+                    for provisioner_id, worker_type in self.queues
+                }
+                for future in as_completed(futures):
+                    queue = futures[future]
+                    try:
+                        new_snapshot[queue] = future.result()
+                    except requests.RequestException as e:
+                        logging.warning("exception raised when fetching pending tasks for %s/%s." % queue)
+                        logging.warning(e)
+                        new_snapshot[queue] = 0
+                        failed_queues.add(queue)
+        self.snapshot = new_snapshot
+        self.failed_queues = frozenset(failed_queues)
+        self.last_poll_time = time.time()
+        return new_snapshot
+
+    def is_stale(self):
+        """Return True if the snapshot is older than max_age."""
+        if self.max_age is None or self.last_poll_time is None:
+            return False
+        return time.time() - self.last_poll_time > self.max_age
+
+    def get_pending_tasks(self, provisioner_id, worker_type):
+        """Return the pending task count from the latest snapshot (0 if never polled or stale)."""
+        if self.is_stale():
+            return 0
+        return self.snapshot.get((provisioner_id, worker_type), 0)
+
+    def is_confirmed(self, provisioner_id, worker_type):
+        """Return True if the latest snapshot is current and has a fetched count for the queue."""
+        queue = (provisioner_id, worker_type)
+        return queue in self.snapshot and queue not in self.failed_queues and not self.is_stale()
 
 
 # main
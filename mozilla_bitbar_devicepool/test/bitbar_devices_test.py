@@ -0,0 +1,59 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+from mozilla_bitbar_devicepool.bitbar.devices import partition_offline_devices
+
+
+def device_problem(device_name, problem_types):
+    return {
+        "deviceName": device_name,
+        "deviceModelName": device_name,
+        "problems": [{"type": problem_type} for problem_type in problem_types],
+    }
+
+
+DEVICE_GROUP_INDEX = {
+    "pixel5-01": "pixel5-unit",
+    "pixel5-02": "pixel5-unit",
+    "pixel5-03": "pixel5-perf",
+    "s24-01": "s24-unit",
+}
+
+PROJECTS = {
+    "mozilla-gw-unittest-p5": ("pixel5-unit", "pixel5"),
+    "mozilla-gw-perftest-p5": ("pixel5-perf", "pixel5"),
+    "mozilla-gw-unittest-s24": ("s24-unit", None),
+}
+
+
+def test_partition_offline_devices():
+    device_problems = [
+        device_problem("pixel5-01", ["OFFLINE"]),
+        device_problem("pixel5-02", ["LOW_BATTERY"]),
+        device_problem("pixel5-03", ["LOW_BATTERY", "OFFLINE"]),
+        device_problem("s24-01", ["OFFLINE"]),
+        # not in any configured device group
+        device_problem("pixel5-99", ["OFFLINE"]),
+        device_problem("Docker Builder", ["OFFLINE"]),
+    ]
+    result = partition_offline_devices(device_problems, DEVICE_GROUP_INDEX, PROJECTS)
+    assert result == {
+        "mozilla-gw-unittest-p5": ["pixel5-01"],
+        "mozilla-gw-perftest-p5": ["pixel5-03"],
+        "mozilla-gw-unittest-s24": ["s24-01"],
+    }
+
+
+def test_partition_offline_devices_device_model_prefix():
+    # device is in the group but doesn't match the project's device_model prefix
+    device_problems = [device_problem("s24-01", ["OFFLINE"])]
+    projects = {"mozilla-gw-unittest-s24": ("s24-unit", "pixel5")}
+    result = partition_offline_devices(device_problems, DEVICE_GROUP_INDEX, projects)
+    assert result == {"mozilla-gw-unittest-s24": []}
+
+
+def test_partition_offline_devices_repeated_problem_counted_once():
+    device_problems = [device_problem("pixel5-01", ["OFFLINE", "OFFLINE"])]
+    result = partition_offline_devices(device_problems, DEVICE_GROUP_INDEX, PROJECTS)
+    assert result["mozilla-gw-unittest-p5"] == ["pixel5-01"]
@@ -0,0 +1,35 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+from mozilla_bitbar_devicepool.bitbar import host_throttle
+from mozilla_bitbar_devicepool.bitbar.host_throttle import HostStartThrottle
+
+DEVICE_STATUSES = [
+    {"deviceName": "pixel5-01", "clusterName": "host1.mv.mozilla.hc.bitbar"},
+    {"deviceName": "pixel5-02", "clusterName": "host1.mv.mozilla.hc.bitbar"},
+    {"deviceName": "pixel5-03", "clusterName": "host2.mv.mozilla.hc.bitbar"},
+    {"deviceName": "s24-01", "clusterName": "host2.mv.mozilla.hc.bitbar"},
+]
+
+
+def test_acquire_spreads_over_hosts(mocker):
+    mocker.patch.object(host_throttle.time, "time", return_value=1000.0)
+    throttle = HostStartThrottle(2, window_seconds=60)
+    throttle.update_device_hosts(DEVICE_STATUSES)
+
+    assert throttle.acquire(["pixel5-01", "pixel5-02", "pixel5-03"], 3) == 3
+    # host2 has one start left, shared with the s24 group
+    assert throttle.acquire(["s24-01"], 3) == 1
+    assert throttle.acquire(["pixel5-01", "pixel5-03"], 3) == 0
+
+    # starts leave the window
+    host_throttle.time.time.return_value = 1061.0
+    assert throttle.acquire(["s24-01"], 3) == 2
+
+
+def test_acquire_unknown_hosts():
+    throttle = HostStartThrottle(1)
+    assert throttle.acquire(["pixel5-01"], 5) == 5
+    throttle.update_device_hosts(DEVICE_STATUSES)
+    assert throttle.acquire(["pixel5-01", "unknown-01"], 5) == 1
@@ -0,0 +1,90 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+from mozilla_bitbar_devicepool.bitbar import run_tracker
+from mozilla_bitbar_devicepool.bitbar.run_tracker import RunTracker
+
+
+def make_run(run_id, project_name, state, end_time=None):
+    return {"id": run_id, "projectName": project_name, "state": state, "endTime": end_time}
+
+
+def project_name_for_run(run):
+    if run["projectName"] in ("p5-unit", "p5-perf"):
+        return run["projectName"]
+    return None
+
+
+def test_full_sync_counts():
+    tracker = RunTracker(project_name_for_run)
+    changed = tracker.full_sync(
+        [
+            make_run(1, "p5-unit", "RUNNING"),
+            make_run(2, "p5-unit", "WAITING"),
+            make_run(3, "p5-perf", "RUNNING"),
+            make_run(4, "other", "RUNNING"),
+        ]
+    )
+    assert changed == {"p5-unit", "p5-perf"}
+    assert tracker.get_state_count("p5-unit", "RUNNING") == 1
+    assert tracker.get_state_count("p5-unit", "WAITING") == 1
+    assert tracker.get_state_count("p5-perf", "WAITING") == 0
+    assert 4 not in tracker.runs
+
+    # only p5-perf changed, its run ended
+    assert tracker.full_sync([make_run(1, "p5-unit", "RUNNING"), make_run(2, "p5-unit", "WAITING")]) == {"p5-perf"}
+    assert tracker.get_runs("p5-perf") == []
+
+
+def test_apply_updates():
+    tracker = RunTracker(project_name_for_run)
+    tracker.full_sync([make_run(1, "p5-unit", "WAITING"), make_run(2, "p5-perf", "RUNNING")])
+
+    changed = tracker.apply_updates(
+        [
+            # started
+            make_run(1, "p5-unit", "RUNNING"),
+            # ended
+            make_run(2, "p5-perf", "FINISHED", end_time=1700000000000),
+            # created
+            make_run(3, "p5-unit", "WAITING"),
+            # ended before we ever saw it
+            make_run(4, "p5-perf", "FINISHED", end_time=1700000000000),
+        ]
+    )
+    assert changed == {"p5-unit", "p5-perf"}
+    assert tracker.get_state_count("p5-unit", "RUNNING") == 1
+    assert tracker.get_state_count("p5-unit", "WAITING") == 1
+    assert tracker.get_state_count("p5-perf", "RUNNING") == 0
+    assert sorted(run["id"] for run in tracker.get_runs("p5-unit")) == [1, 3]
+
+    # applying the same updates again (watermark overlap) changes nothing
+    assert tracker.apply_updates([make_run(1, "p5-unit", "RUNNING"), make_run(3, "p5-unit", "WAITING")]) == set()
+    assert tracker.get_state_count("p5-unit", "WAITING") == 1
+
+
+def test_poll_full_then_delta(mocker):
+    get_active_test_runs = mocker.patch.object(
+        run_tracker, "get_active_test_runs", return_value=[make_run(1, "p5-unit", "WAITING")]
+    )
+    get_updated_test_runs = mocker.patch.object(
+        run_tracker, "get_updated_test_runs", return_value=[make_run(1, "p5-unit", "RUNNING")]
+    )
+    mocker.patch.object(run_tracker.time, "time", return_value=1000.0)
+    tracker = RunTracker(project_name_for_run, full_sync_interval=60, watermark_overlap_seconds=30)
+
+    assert tracker.poll() == {"p5-unit"}
+    get_active_test_runs.assert_called_once()
+    assert tracker.watermark == 970000
+
+    run_tracker.time.time.return_value = 1010.0
+    assert tracker.poll() == {"p5-unit"}
+    get_updated_test_runs.assert_called_once_with(970000)
+    assert tracker.get_state_count("p5-unit", "RUNNING") == 1
+    assert tracker.watermark == 980000
+
+    # the full sync interval has passed
+    run_tracker.time.time.return_value = 1061.0
+    tracker.poll()
+    assert get_active_test_runs.call_count == 2
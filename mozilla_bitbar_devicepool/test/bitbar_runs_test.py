@@ -0,0 +1,62 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import json
+
+import pytest
+
+from mozilla_bitbar_devicepool import configuration
+from mozilla_bitbar_devicepool.bitbar import runs
+
+
+@pytest.fixture
+def configured(monkeypatch):
+    bitbar_configuration = configuration.BitbarConfiguration("test")
+    bitbar_configuration.config = {
+        "projects": {
+            "p5-unit": {
+                "framework_name": "mozilla-usb",
+                "os_type": "ANDROID",
+                "scheduler": "SINGLE",
+                "timeout": 0,
+                "device_group_name": "pixel5-unit",
+                "test_file": "empty-test.zip",
+                "application_file": "Testdroid.apk",
+                "additional_parameters": {"TC_WORKER_TYPE": "gecko-t-bitbar-gw-unit-p5"},
+            }
+        }
+    }
+    bitbar_configuration.bitbar_cache = {
+        "frameworks": {"mozilla-usb": {"id": 1}},
+        "projects": {"p5-unit": {"id": 2}},
+        "device_groups": {"pixel5-unit": {"id": 3}},
+        "files": {"empty-test.zip": {"id": 4}, "Testdroid.apk": {"id": 5}},
+    }
+    monkeypatch.setattr(runs, "TEST_RUN_PAYLOADS", {})
+    configuration.use(bitbar_configuration)
+    yield bitbar_configuration
+    configuration.use(None)
+
+
+def test_get_test_run_payload(configured):
+    payload = runs.get_test_run_payload("p5-unit")
+    assert json.loads(payload) == {
+        "frameworkId": 1,
+        "osType": "ANDROID",
+        "projectId": 2,
+        "scheduler": "SINGLE",
+        "timeout": 0,
+        "deviceGroupId": 3,
+        "testRunParameters": [{"key": "TC_WORKER_TYPE", "value": "gecko-t-bitbar-gw-unit-p5"}],
+        "files": [{"id": 4, "action": "RUN_TEST"}, {"id": 5, "action": "INSTALL"}],
+    }
+
+
+def test_get_test_run_payload_is_reused_until_generation_changes(configured):
+    payload = runs.get_test_run_payload("p5-unit")
+    configured.bitbar_cache["files"]["empty-test.zip"]["id"] = 6
+    assert runs.get_test_run_payload("p5-unit") is payload
+
+    configured.generation += 1
+    assert json.loads(runs.get_test_run_payload("p5-unit"))["files"][0]["id"] == 6
@@ -0,0 +1,38 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+from mozilla_bitbar_devicepool.bitbar.stale_runs import StaleRunJanitor
+
+
+def make_run(run_id, state, create_time):
+    return {"id": run_id, "projectId": 1, "state": state, "createTime": create_time * 1000}
+
+
+def test_select_stale_waiting_runs():
+    janitor = StaleRunJanitor(600, batch_size=2)
+    project_runs = {
+        "p5-unit": [
+            make_run(1, "WAITING", 0),
+            make_run(2, "WAITING", 100),
+            make_run(3, "WAITING", 900),
+            make_run(4, "RUNNING", 0),
+            make_run(5, "WAITING", 50),
+        ],
+        "p5-perf": [make_run(6, "WAITING", 0)],
+    }
+    pending_tasks = {"p5-unit": 0, "p5-perf": 3}
+
+    stale_runs = janitor.select(project_runs, pending_tasks, now=1000)
+    # oldest first, bounded by the batch size, p5-perf still has tasks to run
+    assert [(project_name, run["id"]) for project_name, run, _ in stale_runs] == [("p5-unit", 1), ("p5-unit", 5)]
+    assert stale_runs[0][2] == "WAITING for 1000s with no pending tasks"
+
+    # selected runs are not selected again while tracked
+    stale_runs = janitor.select(project_runs, pending_tasks, now=1000)
+    assert [run["id"] for _, run, _ in stale_runs] == [2]
+    assert janitor.select(project_runs, pending_tasks, now=1000) == []
+
+    # ended runs are forgotten
+    janitor.select({"p5-unit": [make_run(2, "WAITING", 100)]}, pending_tasks, now=1000)
+    assert set(janitor.selected) == {2}
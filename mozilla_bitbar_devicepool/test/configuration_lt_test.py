@@ -494,3 +494,84 @@ def test_get_path_to_user_script_directory_2(configured_lt_instance):
     project_name = "test-1"
     expected_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "lambdatest", "user_scripts", "v11"))
     assert configured_lt_instance.get_path_to_user_script_directory(project_name) == expected_path
+
+
+def test_has_config_file_changed_and_reload(sample_file_config):
+    """
+    Tests that a changed config file is detected and reloaded into a new instance.
+    """
+    config_lt = ConfigurationLt(ci_mode_envvars=True, ci_mode_fs=True)
+    config_lt.configure(config_path=sample_file_config)
+    assert not config_lt.has_config_file_changed()
+
+    with open(sample_file_config, "w") as f:
+        f.write(SAMPLE_FILE_CONFIG_YAML.replace("TEST_1: blah", "TEST_1: changed"))
+    # make sure the mtime moves even on filesystems with coarse timestamps
+    os.utime(sample_file_config, ns=(config_lt.config_mtime + 10**9, config_lt.config_mtime + 10**9))
+    assert config_lt.has_config_file_changed()
+
+    new_config_lt = config_lt.reload()
+    assert new_config_lt is not config_lt
+    assert new_config_lt.config["projects"]["a55-alpha"]["TEST_1"] == "changed"
+    assert not new_config_lt.has_config_file_changed()
+    # the old instance is untouched
+    assert config_lt.config["projects"]["a55-alpha"]["TEST_1"] == "blah"
+
+
+def test_reload_invalid_config(sample_file_config):
+    """
+    Tests that reloading an invalid config file raises and keeps the old configuration.
+    """
+    config_lt = ConfigurationLt(ci_mode_envvars=True, ci_mode_fs=True)
+    config_lt.configure(config_path=sample_file_config)
+
+    with open(sample_file_config, "w") as f:
+        f.write("projects: [")
+    with pytest.raises(yaml.YAMLError):
+        config_lt.reload()
+    assert config_lt.config["projects"]["a55-alpha"]["TEST_1"] == "blah"
+
+
+def test_compiled_config_cache(sample_file_config, tmp_path, mocker):
+    """
+    Tests that the compiled config is reused, keeps no secrets and is rebuilt when the file changes.
+    """
+    cache_path = str(tmp_path / "cache" / "compiled.json")
+    config_lt = ConfigurationLt(ci_mode_envvars=True, ci_mode_fs=True, compiled_config_cache=cache_path)
+    config_lt.configure(config_path=sample_file_config)
+    assert os.path.exists(cache_path)
+    with open(cache_path) as f:
+        assert "TASKCLUSTER_ACCESS_TOKEN" not in f.read()
+
+    expand = mocker.spy(ConfigurationLt, "_expand_configuration")
+    cached_config_lt = ConfigurationLt(ci_mode_envvars=True, ci_mode_fs=True, compiled_config_cache=cache_path)
+    cached_config_lt.configure(config_path=sample_file_config)
+    expand.assert_not_called()
+    assert cached_config_lt.config == config_lt.config
+    assert cached_config_lt.get_fully_configured_projects() == config_lt.get_fully_configured_projects()
+    # secrets are still set from the environment
+    assert cached_config_lt.config["projects"]["a55-perf"]["TASKCLUSTER_ACCESS_TOKEN"] == "fake123"
+
+    with open(sample_file_config, "w") as f:
+        f.write(SAMPLE_FILE_CONFIG_YAML.replace("TEST_1: blah", "TEST_1: changed"))
+    changed_config_lt = ConfigurationLt(ci_mode_envvars=True, ci_mode_fs=True, compiled_config_cache=cache_path)
+    changed_config_lt.configure(config_path=sample_file_config)
+    expand.assert_called_once()
+    assert changed_config_lt.config["projects"]["a55-alpha"]["TEST_1"] == "changed"
+
+
+def test_configure_hyperexecute_check(sample_file_config, mocker):
+    """
+    Tests that the hyperexecute binary is only required by tools that launch jobs.
+    """
+    mocker.patch.dict(os.environ, {"LT_USERNAME": "user", "LT_ACCESS_KEY": "key"})
+    which = mocker.patch("mozilla_bitbar_devicepool.configuration_lt.shutil.which", return_value=None)
+
+    config_lt = ConfigurationLt(ci_mode_fs=True, lightweight=True)
+    with pytest.raises(FileNotFoundError):
+        config_lt.configure(config_path=sample_file_config)
+    which.assert_called_once_with("hyperexecute")
+
+    config_lt = ConfigurationLt(ci_mode_fs=True, lightweight=True, require_hyperexecute=False)
+    config_lt.configure(config_path=sample_file_config)
+    assert config_lt.lt_username == "user"
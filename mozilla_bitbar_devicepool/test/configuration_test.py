@@ -2,10 +2,14 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this file,
 # You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import os
+import threading
+from unittest import mock
+
 import pytest
 import yaml
 
-from mozilla_bitbar_devicepool import configuration
+from mozilla_bitbar_devicepool import TESTDROID, configuration
 
 test_configuration_1 = """
 projects:
@@ -83,3 +87,162 @@ def test_unique_filenames_bad_config():
     config = yaml.load(test_configuration_2, Loader=yaml.SafeLoader)
     with pytest.raises(configuration.ConfigurationFileDuplicateFilenamesException):
         configuration.ensure_filenames_are_unique(config)
+
+
+@pytest.fixture
+def bitbar_configuration():
+    bitbar_configuration = configuration.BitbarConfiguration("test", testdroid_url="https://bitbar.example.com")
+    configuration.use(bitbar_configuration)
+    yield bitbar_configuration
+    configuration.use(None)
+
+
+@pytest.fixture
+def bitbar_cache(tmp_path, bitbar_configuration):
+    config_path = tmp_path / "config.yml"
+    config_path.write_text(test_configuration_1)
+    bitbar_configuration.config = yaml.load(test_configuration_1, Loader=yaml.SafeLoader)
+    bitbar_configuration.expand_configuration()
+    bitbar_configuration.bitbar_cache = {
+        "device_groups": {"blah1-group": {"id": 1}, "blah2-group": {"id": 2}},
+        "devices": {},
+        "files": {
+            "aerickson-Testdroid.apk": {"id": 10},
+            "aerickson-empty-test.zip": {"id": 11},
+            "aerickson-empty-test2.zip": {"id": 12},
+        },
+        "frameworks": {"mozilla-usb": {"id": 20}},
+        "me": {"id": 30},
+        "projects": {"blah1": {"id": 40, "lock": None, "stats": {}}, "blah2": {"id": 41}},
+        "test_runs": {},
+    }
+    bitbar_configuration.cache_path = str(tmp_path / "bitbar_cache.json")
+    bitbar_configuration.cache_hash = bitbar_configuration.get_config_hash(str(config_path))
+    bitbar_configuration.save_bitbar_cache()
+    return config_path
+
+
+def test_bitbar_cache_load(bitbar_cache, bitbar_configuration):
+    saved_cache = bitbar_configuration.bitbar_cache
+    bitbar_configuration.bitbar_cache = {"test_runs": {}}
+    assert configuration.configure_from_bitbar_cache(str(bitbar_cache), bitbar_configuration.cache_path)
+    assert configuration.BITBAR_CACHE["projects"]["blah1"] == {"id": 40}
+    assert configuration.BITBAR_CACHE["files"] == saved_cache["files"]
+    assert ("files", "aerickson-empty-test2.zip") in configuration.UNVALIDATED_ENTRIES
+    assert ("projects", "blah2") in configuration.UNVALIDATED_ENTRIES
+
+
+def test_bitbar_cache_config_changed(bitbar_cache, bitbar_configuration):
+    bitbar_cache.write_text(test_configuration_1.replace("blah1 is great", "blah1 is greater"))
+    assert not configuration.configure_from_bitbar_cache(str(bitbar_cache), bitbar_configuration.cache_path)
+    assert not bitbar_configuration.unvalidated_entries
+
+
+def test_bitbar_cache_server_changed(bitbar_cache, bitbar_configuration):
+    bitbar_configuration.testdroid_url = "https://bitbar-v3.example.com"
+    assert not bitbar_configuration.configure_from_bitbar_cache(str(bitbar_cache), bitbar_configuration.cache_path)
+
+
+def test_bitbar_cache_validate_entry(bitbar_cache, bitbar_configuration, mocker):
+    configuration.configure_from_bitbar_cache(str(bitbar_cache), bitbar_configuration.cache_path)
+    get_files = mocker.patch.object(
+        configuration, "get_files", return_value=[{"id": 12}, {"id": 13, "name": "aerickson-empty-test2.zip"}]
+    )
+    test_file = bitbar_configuration.bitbar_cache["files"]["aerickson-empty-test2.zip"]
+
+    configuration.validate_cached_entry("files", "aerickson-empty-test2.zip")
+    configuration.validate_cached_entry("files", "aerickson-empty-test2.zip")
+
+    get_files.assert_called_once_with(name="aerickson-empty-test2.zip")
+    # updated in place, so references held elsewhere see the new id
+    assert test_file["id"] == 13
+    assert ("files", "aerickson-empty-test2.zip") not in bitbar_configuration.unvalidated_entries
+    with open(bitbar_configuration.cache_path) as cache_file:
+        assert '"id": 13' in cache_file.read()
+
+
+def test_bitbar_cache_validate_entry_failure(bitbar_cache, bitbar_configuration, mocker):
+    configuration.configure_from_bitbar_cache(str(bitbar_cache), bitbar_configuration.cache_path)
+    mocker.patch.object(configuration, "get_files", return_value=[])
+
+    with pytest.raises(configuration.BitbarCacheException):
+        configuration.validate_cached_entry("files", "aerickson-empty-test2.zip")
+    assert not os.path.exists(bitbar_configuration.cache_path)
+
+
+def test_refresh_file(bitbar_cache, bitbar_configuration, mocker):
+    mocker.patch.object(
+        configuration, "get_files", return_value=[{"id": 11, "name": "aerickson-empty-test.zip"}, {"id": 14}]
+    )
+    generation = bitbar_configuration.generation
+
+    configuration.refresh_file(11)
+    # a second thread hitting the same archived file finds nothing to do
+    configuration.refresh_file(11)
+
+    assert bitbar_configuration.bitbar_cache["files"]["aerickson-empty-test.zip"]["id"] == 14
+    assert bitbar_configuration.bitbar_cache["files"]["aerickson-empty-test2.zip"]["id"] == 12
+    assert bitbar_configuration.generation == generation + 1
+    configuration.get_files.assert_called_once_with(name="aerickson-empty-test.zip")
+
+
+def test_refresh_file_upload(bitbar_cache, bitbar_configuration, mocker):
+    bitbar_configuration.update_bitbar = True
+    bitbar_configuration.filespath = "/files"
+    mocker.patch.object(configuration, "get_files", side_effect=[[{"id": 11}], [{"id": 11}, {"id": 15}]])
+    testdroid = mocker.patch.object(configuration, "TESTDROID")
+
+    bitbar_configuration.refresh_file(11)
+
+    testdroid.upload_file.assert_called_once_with("/files/aerickson-empty-test.zip")
+    assert bitbar_configuration.bitbar_cache["files"]["aerickson-empty-test.zip"]["id"] == 15
+
+
+def test_refresh_file_no_update(bitbar_cache, bitbar_configuration, mocker):
+    bitbar_configuration.update_bitbar = False
+    mocker.patch.object(configuration, "get_files", return_value=[{"id": 11}])
+
+    with pytest.raises(configuration.ConfigurationException):
+        bitbar_configuration.refresh_file(11)
+
+
+def test_use_selects_thread_configuration():
+    first = configuration.BitbarConfiguration("first", testdroid=mock.Mock())
+    second = configuration.BitbarConfiguration("second", testdroid=mock.Mock())
+    seen = {}
+
+    def worker(bitbar_configuration):
+        configuration.use(bitbar_configuration)
+        TESTDROID.get_me()
+        seen[bitbar_configuration.name] = configuration.current()
+
+    threads = [threading.Thread(target=worker, args=(c,)) for c in (first, second)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert seen == {"first": first, "second": second}
+    first.testdroid.get_me.assert_called_once_with()
+    second.testdroid.get_me.assert_called_once_with()
+    # threads that never called use() get the default configuration
+    assert configuration.current() is configuration.DEFAULT_CONFIGURATION
+
+
+def test_configure_testdroid_from_environment(monkeypatch):
+    monkeypatch.setenv("TESTDROID_V3_URL", "https://bitbar-v3.example.com")
+    monkeypatch.setenv("TESTDROID_V3_APIKEY", "secret")
+    bitbar_configuration = configuration.BitbarConfiguration("v3")
+    bitbar_configuration.config = {
+        "devicepool_config": {"testdroid_url_env": "TESTDROID_V3_URL", "testdroid_apikey_env": "TESTDROID_V3_APIKEY"}
+    }
+
+    bitbar_configuration.configure_testdroid()
+
+    assert bitbar_configuration.testdroid_url == "https://bitbar-v3.example.com"
+    assert bitbar_configuration.testdroid.cloud_url == "https://bitbar-v3.example.com"
+
+    monkeypatch.delenv("TESTDROID_V3_APIKEY")
+    bitbar_configuration.testdroid = None
+    with pytest.raises(configuration.ConfigurationException):
+        bitbar_configuration.configure_testdroid()
@@ -0,0 +1,49 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# entry point module -> slow to import modules it must not load on import
+# (see benchmarks/import_time.py for the import time budgets)
+FORBIDDEN_MODULES = {
+    "mozilla_bitbar_devicepool.main": ["taskcluster", "git", "sentry_sdk", "requests_cache"],
+    "mozilla_bitbar_devicepool.device_group_report_lt": ["testdroid", "taskcluster", "git", "sentry_sdk", "requests"],
+    "mozilla_bitbar_devicepool.lambdatest.status": ["testdroid", "taskcluster", "git", "sentry_sdk", "requests_cache"],
+    "mozilla_bitbar_devicepool.compare_to_api_lt": ["testdroid", "taskcluster", "git", "sentry_sdk", "requests_cache"],
+    "mozilla_bitbar_devicepool.reporting.main": ["testdroid", "taskcluster", "git", "sentry_sdk", "requests_cache"],
+    "mozilla_bitbar_devicepool.run_cmd_lt": ["testdroid", "taskcluster", "git", "sentry_sdk", "requests_cache"],
+    "mozilla_bitbar_devicepool.test_run_manager_lt": ["testdroid", "taskcluster", "git", "requests_cache"],
+    "mozilla_bitbar_devicepool.lambdatest.utilization_history": [
+        "testdroid",
+        "taskcluster",
+        "git",
+        "sentry_sdk",
+        "requests",
+    ],
+}
+
+
+@pytest.mark.parametrize("module", sorted(FORBIDDEN_MODULES))
+def test_entry_point_imports(module):
+    """Test that importing an entry point doesn't load modules it doesn't need."""
+    code = "import logging, sys, {}; print(len(logging.getLogger().handlers), *sorted(sys.modules))".format(module)
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=REPO_DIR,
+        env=dict(os.environ, PYTHONPATH=REPO_DIR),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    root_handler_count, *loaded = result.stdout.split()
+    assert [name for name in FORBIDDEN_MODULES[module] if name in loaded] == []
+    # configuring logging is up to the entry point's main() (testdroid does it on import, see main.py)
+    if "testdroid" in FORBIDDEN_MODULES[module]:
+        assert root_handler_count == "0"
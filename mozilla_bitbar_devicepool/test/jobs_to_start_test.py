@@ -0,0 +1,73 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import pytest
+
+from mozilla_bitbar_devicepool import jobs_to_start
+
+
+def make_stats(count=10, idle=0, waiting=0, running=0):
+    return {"COUNT": count, "IDLE": idle, "WAITING": waiting, "RUNNING": running}
+
+
+def test_get_strategy_invalid():
+    with pytest.raises(RuntimeError):
+        jobs_to_start.get_strategy(None)
+
+
+def test_register_strategy_without_compute():
+    with pytest.raises(TypeError):
+
+        @jobs_to_start.register_strategy("incomplete")
+        class StrategyIncomplete(jobs_to_start.JobsToStartStrategy):
+            pass
+
+    assert "incomplete" not in jobs_to_start.STRATEGIES
+
+
+@pytest.mark.parametrize(
+    "name,stats,pending_tasks,expected",
+    [
+        ("v1", make_stats(idle=4), 20, 6),
+        ("v1", make_stats(idle=4), 0, 0),
+        ("v2", make_stats(idle=4), 20, 1),
+        ("v2", make_stats(idle=4, waiting=1), 20, 0),
+        ("v3", make_stats(idle=4, waiting=1), 20, 3),
+        ("v3", make_stats(idle=4, waiting=1), 2, 1),
+        ("v3", make_stats(idle=0, waiting=2), 20, 0),
+    ],
+)
+def test_static_strategies(name, stats, pending_tasks, expected):
+    assert jobs_to_start.get_strategy(name).jobs_to_start(stats, pending_tasks) == expected
+
+
+def test_v4_aimd():
+    strategy = jobs_to_start.get_strategy("v4")
+    # additive increase while nothing is waiting
+    assert [strategy.jobs_to_start(make_stats(idle=8), 20) for _ in range(3)] == [2, 3, 4]
+    # multiplicative decrease once runs pile up in WAITING
+    assert strategy.jobs_to_start(make_stats(idle=8, waiting=3), 20) == 0
+    assert strategy.allowance == 2
+    assert strategy.jobs_to_start(make_stats(idle=8, waiting=1), 20) == 0
+    assert strategy.allowance == 1
+    # never more than the number of devices
+    for _ in range(20):
+        strategy.jobs_to_start(make_stats(idle=8), 20)
+    assert strategy.allowance == 10
+
+
+def test_replay():
+    log = [
+        "    mozilla-gw-unittest-p5 INFO     COUNT 10 IDLE 4 OFFLINE 0 DISABLED 0 RUNNING 6 WAITING 0 PENDING 12 STARTING 4",
+        "    mozilla-gw-unittest-p5 INFO     getting active runs",
+        "    mozilla-gw-unittest-p5 INFO     COUNT 10 IDLE 4 OFFLINE 0 DISABLED 0 RUNNING 6 WAITING 2 PENDING 12 STARTING 2",
+    ]
+    recorded = jobs_to_start.parse_stats_log(log)
+    assert list(recorded) == ["mozilla-gw-unittest-p5"]
+    assert recorded["mozilla-gw-unittest-p5"][1]["WAITING"] == 2
+
+    results = jobs_to_start.replay(recorded, ["v3", "v4"])
+    assert results["v3"] == {"cycles": 2, "started": 6, "started_while_waiting": 2, "idle_unserved": 0}
+    assert results["v4"]["started_while_waiting"] == 0
+    assert "strategy" in jobs_to_start.format_replay(results)
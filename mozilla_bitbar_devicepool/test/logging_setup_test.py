@@ -0,0 +1,95 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import io
+import json
+import logging
+import threading
+import time
+
+import pytest
+
+from mozilla_bitbar_devicepool import logging_setup
+
+
+@pytest.fixture
+def restore_root_logger():
+    root_logger = logging.getLogger()
+    handlers = list(root_logger.handlers)
+    level = root_logger.level
+    yield
+    logging_setup.stop_logging()
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+    for handler in handlers:
+        root_logger.addHandler(handler)
+    root_logger.setLevel(level)
+
+
+def test_queued_text_output(restore_root_logger):
+    stream = io.StringIO()
+    logging_setup.setup_logging(logging.INFO, disable_timestamps=True, stream=stream)
+
+    logging.info("%s started %s jobs", "[ a55-perf ]", 3)
+    logging.debug("%s not logged", "[ a55-perf ]")
+    # writes the queued records
+    logging_setup.stop_logging()
+
+    assert stream.getvalue() == "INFO - [ a55-perf ] started 3 jobs\n"
+
+
+def test_lazy_arguments_below_level(restore_root_logger):
+    class Expensive:
+        def __str__(self):
+            raise AssertionError("formatted below the level")
+
+    logging_setup.setup_logging(logging.INFO, stream=io.StringIO())
+    logging.debug("devices: %s", Expensive())
+
+
+def test_json_output(restore_root_logger):
+    stream = io.StringIO()
+    logging_setup.setup_logging(logging.DEBUG, json_output=True, use_queue=False, stream=stream)
+
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logging.getLogger("lt").warning("devices: %s", ["udid1", "udid2"], exc_info=True)
+
+    entry = json.loads(stream.getvalue())
+    assert entry["level"] == "WARNING"
+    assert entry["logger"] == "lt"
+    assert entry["message"] == "devices: ['udid1', 'udid2']"
+    assert "ValueError: boom" in entry["exc_info"]
+    assert entry["thread"] == "MainThread"
+
+
+def test_stop_logging_timeout(restore_root_logger):
+    stream = io.StringIO()
+    logging_setup.setup_logging(logging.INFO, disable_timestamps=True, stream=stream)
+    logging.info("exiting")
+    logging_setup.stop_logging(timeout=5)
+    assert stream.getvalue() == "INFO - exiting\n"
+
+
+def test_stop_logging_timeout_with_blocked_stream(restore_root_logger):
+    class BlockedStream:
+        def __init__(self):
+            self.unblock = threading.Event()
+
+        def write(self, text):
+            self.unblock.wait()
+
+        def flush(self):
+            pass
+
+    stream = BlockedStream()
+    logging_setup.setup_logging(logging.INFO, stream=stream)
+    logging.info("stuck")
+
+    start = time.monotonic()
+    logging_setup.stop_logging(timeout=0.2)
+    assert time.monotonic() - start < 5
+    assert logging_setup._listener is None
+    stream.unblock.set()
@@ -0,0 +1,108 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import pytest
+
+from mozilla_bitbar_devicepool.lambdatest.device_reliability import DeviceReliability
+
+NOW = 1_000_000
+
+
+def make_job(job_number, udid, status, failed_phase=None, end_time=None):
+    job_summary = None
+    if failed_phase:
+        job_summary = {f"{failed_phase}_phase": {"failed": 1}}
+    return {
+        "job_number": job_number,
+        "job_label": f'["tcdp","a55-perf","{udid}"]',
+        "status": status,
+        "job_summary": job_summary,
+        "end_time": end_time,
+    }
+
+
+def test_record_jobs_counts_finished_jobs_once():
+    reliability = DeviceReliability()
+    jobs = [
+        make_job(1, "A1", "completed"),
+        make_job(2, "A2", "failed", "pre"),
+        make_job(3, "A3", "running"),
+        make_job(4, "A3", "aborted"),
+        dict(make_job(5, "A4", "failed", "pre"), job_label='["other","A4"]'),
+    ]
+
+    assert reliability.record_jobs(jobs, now=NOW) == 2
+    # the next fetch overlaps the previous one
+    assert reliability.record_jobs(jobs + [make_job(6, "A1", "completed")], now=NOW) == 1
+
+    assert reliability.devices["A1"]["successes"] == 2
+    assert reliability.get_score("A2", now=NOW) == pytest.approx(2 / 3)
+    assert reliability.get_score("A3", now=NOW) == 1.0
+    assert "A4" not in reliability.devices
+
+
+def test_record_jobs_replays_oldest_first():
+    reliability = DeviceReliability(backoff_after_failures=2, backoff_base_seconds=600)
+    # newest first, as returned by the api
+    jobs = [
+        make_job(14, "RECOVERED", "completed", end_time=NOW - 60),
+        make_job(13, "FAILING", "failed", "pre", end_time=NOW - 120),
+        make_job(12, "RECOVERED", "failed", "pre", end_time=NOW - 180),
+        make_job(11, "FAILING", "failed", "pre", end_time=NOW - 240),
+        make_job(10, "RECOVERED", "failed", "pre", end_time=NOW - 300),
+        make_job(9, "FAILING", "completed", end_time=NOW - 360),
+    ]
+
+    assert reliability.record_jobs(jobs, now=NOW) == 6
+
+    # passed after its failures
+    assert not reliability.is_backed_off("RECOVERED", now=NOW)
+    assert reliability.devices["RECOVERED"]["consecutive_failures"] == 0
+    # failed twice after an older pass, backed off from its last failure
+    assert reliability.is_backed_off("FAILING", now=NOW)
+    assert reliability.devices["FAILING"]["backoff_until"] == NOW - 120 + 600
+
+
+def test_failure_phase_weights_and_decay():
+    reliability = DeviceReliability(half_life_seconds=3600)
+    reliability.record_jobs([make_job(1, "A1", "failed", "pre"), make_job(2, "A2", "failed", "testing")], now=NOW)
+
+    assert reliability.get_score("A1", now=NOW) < reliability.get_score("A2", now=NOW)
+    # one half life later the failure counts half
+    assert reliability.get_score("A1", now=NOW + 3600) == pytest.approx(2 / 2.5)
+
+
+def test_exponential_backoff():
+    reliability = DeviceReliability(backoff_after_failures=2, backoff_base_seconds=60, backoff_max_seconds=150)
+
+    reliability.record_outcome("A1", False, now=NOW)
+    assert not reliability.is_backed_off("A1", now=NOW)
+    reliability.record_outcome("A1", False, now=NOW)
+    assert reliability.is_backed_off("A1", now=NOW + 59)
+    assert not reliability.is_backed_off("A1", now=NOW + 60)
+    reliability.record_outcome("A1", False, now=NOW + 60)
+    assert reliability.devices["A1"]["backoff_until"] == NOW + 60 + 120
+    # capped
+    reliability.record_outcome("A1", False, now=NOW + 180)
+    assert reliability.devices["A1"]["backoff_until"] == NOW + 180 + 150
+
+    # a success ends the backoff
+    reliability.record_outcome("A1", True, now=NOW + 200)
+    assert not reliability.is_backed_off("A1", now=NOW + 200)
+
+
+def test_partition_devices_and_rank():
+    reliability = DeviceReliability(backoff_after_failures=3)
+    reliability.record_outcome("BAD", False, now=NOW)
+    reliability.record_outcome("BAD", False, now=NOW)
+    for _ in range(3):
+        reliability.record_outcome("BROKEN", False, now=NOW)
+    reliability.record_outcome("GOOD", True, now=NOW)
+
+    usable, backed_off = reliability.partition_devices(["BAD", "BROKEN", "GOOD", "NEW"], now=NOW)
+
+    assert usable == ["BAD", "GOOD", "NEW"]
+    assert backed_off == ["BROKEN"]
+    assert reliability.get_rank("GOOD", now=NOW) == reliability.get_rank("NEW", now=NOW) == -1.0
+    assert reliability.get_rank("BAD", now=NOW) == -0.5
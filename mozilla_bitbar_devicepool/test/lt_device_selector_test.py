@@ -0,0 +1,41 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+from mozilla_bitbar_devicepool.lambdatest.device_selector import DeviceSelector
+
+NOW = 1_000_000
+
+
+def test_pick_least_recently_launched():
+    selector = DeviceSelector()
+    udids = ["A1", "A2", "A3", "A4"]
+
+    # devices never launched go first
+    selector.record_launches(["A1"], now=NOW)
+    selector.record_launches(["A3"], now=NOW + 10)
+    assert selector.pick(udids, 3) == ["A2", "A4", "A1"]
+
+    # every device gets a job before any device gets a second one
+    picked = []
+    for i in range(8):
+        udid = selector.pick(udids, 1)[0]
+        selector.record_launches([udid], now=NOW + 100 + i)
+        picked.append(udid)
+    assert sorted(picked[:4]) == sorted(udids)
+    assert picked[4:] == picked[:4]
+
+    assert selector.pick(udids, 10) == picked[4:]
+    assert selector.pick([], 1) == []
+
+
+def test_pick_rank_and_busy_time():
+    selector = DeviceSelector(use_busy_time=True)
+    selector.record_launches(["A1"], now=NOW)
+    selector.add_busy_time(["A2"], 30)
+    selector.add_busy_time(["A2", "A3"], 30)
+
+    assert selector.pick(["A1", "A2", "A3"], 3) == ["A1", "A3", "A2"]
+    # the rank goes before launch and busy time
+    ranks = {"A1": 0, "A2": -1, "A3": 0}
+    assert selector.pick(["A1", "A2", "A3"], 3, rank=ranks.get) == ["A2", "A1", "A3"]
@@ -0,0 +1,45 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import json
+
+from mozilla_bitbar_devicepool.lambdatest.flight_recorder import FlightRecorder
+
+
+def test_records_are_kept_per_project():
+    recorder = FlightRecorder(max_records=3)
+    for jobs_to_start in range(5):
+        recorder.record("a55-perf", jobs_to_start=jobs_to_start)
+    recorder.record("a55-alpha", jobs_to_start=1)
+
+    snapshot = recorder.snapshot()
+    assert list(snapshot) == ["a55-alpha", "a55-perf"]
+    # the oldest records are dropped
+    assert [record["jobs_to_start"] for record in snapshot["a55-perf"]] == [2, 3, 4]
+    assert list(recorder.snapshot("a55-alpha")) == ["a55-alpha"]
+
+
+def test_record_can_be_updated():
+    recorder = FlightRecorder()
+    record = recorder.record("a55-perf", jobs_to_start=2, launched_devices=[])
+    assert "time" in record
+    record["launched_devices"] = ["udid1", "udid2"]
+
+    [snapshot_record] = recorder.snapshot()["a55-perf"]
+    assert snapshot_record["launched_devices"] == ["udid1", "udid2"]
+    # snapshots are copies
+    snapshot_record["jobs_to_start"] = 0
+    assert record["jobs_to_start"] == 2
+
+
+def test_dump(tmp_path):
+    recorder = FlightRecorder()
+    recorder.record("a55-perf", available_devices=["udid1"], jobs_to_start=1)
+
+    path = recorder.dump(str(tmp_path / "dumps" / "flight_recorder.json"))
+
+    with open(path) as dump_file:
+        dump = json.load(dump_file)
+    assert dump["a55-perf"][0]["available_devices"] == ["udid1"]
+    assert not (tmp_path / "dumps" / "flight_recorder.json.tmp").exists()
@@ -0,0 +1,87 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import os
+import time
+
+import pytest
+
+from mozilla_bitbar_devicepool.lambdatest.job_archive import JobArchive, parse_time
+
+
+@pytest.fixture
+def jobs():
+    this_file_dir = os.path.dirname(os.path.abspath(__file__))
+    data_path = os.path.join(this_file_dir, "test_data", "lt_get_jobs_2.txt")
+    with open(data_path) as f:
+        return eval(f.read())["data"]
+
+
+def test_ingest_is_incremental(tmp_path, jobs):
+    archive = JobArchive(str(tmp_path / "archive"))
+
+    # initiated and running jobs are archived once they finish
+    assert archive.ingest(jobs) == 5
+    assert archive.ingest(jobs) == 0
+    finished_job = dict(jobs[0], status="completed", end_time="2025-05-09T04:10:00Z")
+    assert archive.ingest([finished_job]) == 1
+
+    reopened = JobArchive(archive.path)
+    assert len(reopened) == 6
+    assert list(reopened.columns["job_number"]) == [9812, 9813, 9775, 9790, 9766, 9821]
+    assert reopened.count("status", reopened.select()) == {
+        "failed": 1,
+        "completed": 2,
+        "aborted": 1,
+        "lambda_error": 1,
+        "timeout": 1,
+    }
+
+
+def test_interrupted_update_is_ignored(tmp_path, jobs):
+    archive = JobArchive(str(tmp_path / "archive"))
+    archive.ingest(jobs[:3])
+    # a column written by an update that didn't get to meta.json
+    with open(archive._column_path("job_number"), "ab") as column_file:
+        column_file.write(b"\x01" * 8)
+
+    reopened = JobArchive(archive.path)
+    assert len(reopened) == 1
+    assert reopened.ingest(jobs[3:]) == 4
+    assert list(JobArchive(archive.path).columns["job_number"]) == [9812, 9813, 9775, 9790, 9766]
+
+
+def test_queries(tmp_path, jobs):
+    archive = JobArchive(str(tmp_path / "archive"))
+    archive.ingest(jobs)
+
+    failed = archive.select(statuses=["failed", "timeout"])
+    assert archive.count("failure_phase", failed) == {"testing": 2}
+    assert archive.count_pairs("project", "udid", failed) == {
+        ("a55-perf", "R5CX4089QNL"): 1,
+        ("a55-alpha", "R5CXC1HZKLR"): 1,
+    }
+
+    # jobs are placed by their end time
+    since = parse_time("2025-05-09T03:00:00Z")
+    recent = archive.select(since=since)
+    assert archive.count("udid", recent) == {"R5CX4089QNL": 1, "R5CXC1HZKLR": 1}
+    assert archive.select_days(1 / 24, now=since + 3600) == recent
+    assert archive.time_range(recent) == (parse_time("2025-05-09T03:02:03Z"), parse_time("2025-05-09T03:10:36Z"))
+    assert archive.time_range(archive.select(statuses=["unknown"])) is None
+
+
+def test_parse_time_naive_is_utc(monkeypatch):
+    # a host time zone far from UTC
+    monkeypatch.setenv("TZ", "America/Los_Angeles")
+    time.tzset()
+    try:
+        assert parse_time("2025-05-09T04:10:00") == parse_time("2025-05-09T04:10:00Z") == 1746763800
+        assert parse_time("2025-05-09 04:10:00") == 1746763800
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+    assert parse_time("2025-05-09T06:10:00+02:00") == 1746763800
+    assert parse_time(1746763800) == 1746763800
+    assert parse_time("") == parse_time("not a time") == 0
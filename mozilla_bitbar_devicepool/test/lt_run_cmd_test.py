@@ -0,0 +1,42 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import time
+
+from mozilla_bitbar_devicepool.lambdatest import run_cmd
+
+
+def test_run_batch_paces_launches(mocker):
+    """Test that the launches are paced by start_delay after a start_burst."""
+    launch_times = {}
+    updates = []
+
+    def fake_run_on_device(udid, *args):
+        launch_times[udid] = time.monotonic()
+        return (udid, f"output {udid}", "ok" if udid != "udid3" else "failed")
+
+    mocker.patch.object(run_cmd, "run_on_device", side_effect=fake_run_on_device)
+    udids = [f"udid{i}" for i in range(5)]
+
+    results = run_cmd._run_batch(
+        udids,
+        "true",
+        "/root",
+        "/scripts",
+        max_parallel=10,
+        timeout=60,
+        queue_timeout=60,
+        script_path=None,
+        start_delay=0.05,
+        start_burst=2,
+        on_update=lambda partial: updates.append(len(partial)),
+    )
+
+    assert results["udid0"] == ("output udid0", "ok")
+    assert results["udid3"] == ("output udid3", "failed")
+    assert updates == [1, 2, 3, 4, 5]
+    launches = sorted(launch_times.values())
+    # two at once, then spaced by start_delay
+    assert launches[1] - launches[0] < 0.04
+    assert launches[4] - launches[0] >= 0.14
@@ -0,0 +1,151 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import os
+
+import pytest
+
+from mozilla_bitbar_devicepool.lambdatest import utilization_history
+from mozilla_bitbar_devicepool.lambdatest.utilization_history import (
+    UtilizationHistory,
+    get_utilization_summary,
+)
+
+# the start of a 5 minute bucket
+NOW = 1_800_000_000 - 1_800_000_000 % 300
+
+
+def sample(busy, contract=10, project_busy=None):
+    samples = {"global": {"devices": 12, "contract": contract, "active": 12 - busy, "busy": busy}}
+    if project_busy is not None:
+        samples["a55-perf"] = {"devices": 4, "busy": project_busy}
+    return samples
+
+
+def test_record_and_query(tmp_path):
+    path = str(tmp_path / "history.bin")
+    history = UtilizationHistory(path, writable=True)
+    assert os.path.getsize(path) == utilization_history.get_file_size()
+
+    # ten samples a minute apart, five in each 5 minute bucket
+    for i in range(10):
+        history.record(sample(busy=i, project_busy=i % 4), now=NOW + i * 60)
+    history.close()
+
+    reader = UtilizationHistory(path)
+    assert reader.get_series_names()[:3] == ["global", "a55-perf", None]
+
+    buckets = reader.query("global", since=NOW, until=NOW + 600)
+    assert [start for start, _means, _maxes in buckets] == [NOW + i * 60 for i in range(10)]
+    assert buckets[3][1]["busy"] == 3
+
+    # longer than a day, downsampled to 5 minute buckets
+    buckets = reader.query("global", since=NOW - 2 * 86400, until=NOW + 600)
+    assert [(start, means["busy"], maxes["busy"]) for start, means, maxes in buckets] == [
+        (NOW, 2, 4),
+        (NOW + 300, 7, 9),
+    ]
+    assert [means["busy"] for _start, means, _maxes in reader.query("a55-perf", since=NOW, until=NOW + 300)] == [
+        0,
+        1,
+        2,
+        3,
+        0,
+    ]
+    assert reader.query("p9-perf", since=NOW, until=NOW + 300) == []
+
+
+def test_ring_wraps(tmp_path):
+    history = UtilizationHistory(str(tmp_path / "history.bin"), writable=True)
+    seconds, buckets = utilization_history.TIERS[0]
+    history.record(sample(busy=1), now=NOW)
+    # the same bucket, one lap later
+    history.record(sample(busy=5), now=NOW + seconds * buckets)
+
+    assert history.query("global", since=NOW, until=NOW + 60) == []
+    lap = NOW + seconds * buckets
+    assert [means["busy"] for _start, means, _maxes in history.query("global", since=lap, until=lap + 60)] == [5]
+
+
+def test_full_history_drops_series(tmp_path):
+    history = UtilizationHistory(str(tmp_path / "history.bin"), writable=True)
+    samples = {f"project-{i}": {"busy": 1} for i in range(utilization_history.MAX_SERIES + 2)}
+    assert history.record(samples, now=NOW) == ["project-24", "project-25"]
+
+
+def test_expired_series_slots_are_reused(tmp_path):
+    history = UtilizationHistory(str(tmp_path / "history.bin"), writable=True)
+    old_names = [f"project-{i}" for i in range(utilization_history.MAX_SERIES)]
+    history.record({name: {"busy": 1} for name in old_names}, now=NOW)
+    # project-0 keeps being recorded
+    history.record({"project-0": {"busy": 2}}, now=NOW + 300)
+
+    # all slots were recorded within the retention
+    expired = NOW + utilization_history.SERIES_RETENTION
+    assert history.record({"new-project": {"busy": 3}}, now=expired - 1) == ["new-project"]
+
+    # the oldest expired series gives up its slot, a recent one doesn't
+    assert history.record({"new-project": {"busy": 3}}, now=expired) == []
+    series_names = history.get_series_names()
+    assert "new-project" in series_names
+    assert "project-0" in series_names
+    assert series_names.count(None) == 0
+    assert [
+        means["busy"] for _start, means, _maxes in history.query("new-project", since=expired, until=expired + 30)
+    ] == [3]
+
+    # a series in the sample keeps its slot even when it is the oldest
+    series = {"project-0": {"busy": 1}, "another-project": {"busy": 1}}
+    assert history.record(series, now=expired + 300) == []
+    assert "project-0" in history.get_series_names()
+
+
+def test_series_from_older_files_expire(tmp_path):
+    path = str(tmp_path / "history.bin")
+    history = UtilizationHistory(path, writable=True)
+    history.record({f"project-{i}": {"busy": 1} for i in range(utilization_history.MAX_SERIES)}, now=NOW)
+    # a file written before the last recorded times were kept
+    history.mmap[
+        utilization_history._LAST_RECORDED_OFFSET : utilization_history._LAST_RECORDED_OFFSET
+        + utilization_history._LAST_RECORDED.size
+    ] = bytes(utilization_history._LAST_RECORDED.size)
+
+    later = NOW + utilization_history.SERIES_RETENTION
+    assert history.record({"new-project": {"busy": 1}}, now=later) == ["new-project"]
+    assert history.get_last_recorded() == [later] * utilization_history.MAX_SERIES
+    assert history.record({"new-project": {"busy": 1}}, now=later + utilization_history.SERIES_RETENTION) == []
+
+
+def test_long_series_names_are_dropped(tmp_path):
+    history = UtilizationHistory(str(tmp_path / "history.bin"), writable=True)
+    long_name = "a55-perf-" + "x" * utilization_history.SERIES_NAME_SIZE
+    # fits in characters, not in utf-8 bytes
+    multibyte_name = "\u00e9" * (utilization_history.SERIES_NAME_SIZE - 1)
+    longest_name = "y" * utilization_history.SERIES_NAME_SIZE
+    samples = {long_name: {"busy": 1}, multibyte_name: {"busy": 2}, longest_name: {"busy": 3}}
+
+    for i in range(utilization_history.MAX_SERIES + 1):
+        assert history.record(samples, now=NOW + i * 30) == [long_name, multibyte_name]
+
+    # no slot was taken by the dropped series
+    assert history.get_series_names() == [longest_name] + [None] * (utilization_history.MAX_SERIES - 1)
+    assert len(history.query(longest_name, since=NOW, until=NOW + 86400)) == utilization_history.MAX_SERIES + 1
+
+
+def test_invalid_file(tmp_path):
+    path = tmp_path / "history.bin"
+    path.write_bytes(b"\0" * utilization_history.get_file_size())
+    with pytest.raises(ValueError):
+        UtilizationHistory(str(path))
+
+
+def test_get_utilization_summary():
+    buckets = [(NOW + i * 30, {"busy": busy}, {"busy": busy, "contract": 10}) for i, busy in enumerate(range(1, 11))]
+    summary = get_utilization_summary(buckets, "global")
+
+    assert summary["capacity"] == 10
+    assert summary["percentiles"] == {50: 50.0, 90: 90.0, 95: 100.0, 99: 100.0}
+    assert summary["peak_busy"] == 10
+    assert summary["peak_time"] == NOW + 9 * 30
+    assert get_utilization_summary([], "global") is None
@@ -0,0 +1,77 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from mozilla_bitbar_devicepool.util import metrics
+
+
+def test_render():
+    registry = metrics.MetricsRegistry()
+    launched = registry.counter("launched", "Jobs launched.", ["project"])
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1))
+    registry.gauge_callback("devices", "Devices.", ["project", "state"], lambda: {("a55", "busy"): 3})
+    registry.counter_callback("started", "Jobs started.", [], lambda: {(): 5})
+
+    launched.labels("a55").inc()
+    launched.labels("a55").inc(2)
+    launched.labels('p9 "x"').inc()
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.observe(value)
+
+    assert registry.render().splitlines() == [
+        "# TYPE launched counter",
+        "# HELP launched Jobs launched.",
+        'launched_total{project="a55"} 3',
+        'launched_total{project="p9 \\"x\\""} 1',
+        "# TYPE latency_seconds histogram",
+        "# HELP latency_seconds Latency.",
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_count 4",
+        "latency_seconds_sum 3.65",
+        "# TYPE devices gauge",
+        "# HELP devices Devices.",
+        'devices{project="a55",state="busy"} 3',
+        "# TYPE started counter",
+        "# HELP started Jobs started.",
+        "started_total 5",
+        "# EOF",
+    ]
+
+
+def test_errors():
+    registry = metrics.MetricsRegistry()
+    registry.gauge_callback("broken", "Broken.", [], lambda: 1 / 0)
+    counter = registry.counter("launched", "Jobs launched.", ["project"])
+
+    # a failing callback leaves the other metrics
+    assert registry.render().splitlines() == ["# TYPE launched counter", "# HELP launched Jobs launched.", "# EOF"]
+    with pytest.raises(ValueError):
+        counter.labels()
+    with pytest.raises(ValueError):
+        registry.counter("launched", "Again.")
+
+
+def test_metrics_server():
+    registry = metrics.MetricsRegistry()
+    registry.counter("launched", "Jobs launched.").inc()
+    server = metrics.start_metrics_server(registry, 0, debug_handlers={"/debug/timings": lambda: {"LT API": {}}})
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            assert response.headers["Content-Type"] == metrics.CONTENT_TYPE
+            assert "launched_total 1" in response.read().decode()
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/debug/timings") as response:
+            assert json.load(response) == {"LT API": {}}
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/other")
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,55 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import pytest
+
+from mozilla_bitbar_devicepool.util.rate_limit import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_burst_then_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(2, burst=3, clock=clock, sleep=clock.sleep)
+
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+    # reserved ahead, spaced 1 / rate apart
+    assert [bucket.reserve() for _ in range(3)] == [0.5, 1.0, 1.5]
+
+
+def test_refill_is_capped_at_burst():
+    clock = FakeClock()
+    bucket = TokenBucket(1, burst=2, clock=clock, sleep=clock.sleep)
+    bucket.reserve()
+    bucket.reserve()
+
+    clock.now += 60
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 1.0]
+
+
+def test_acquire_sleeps_until_due():
+    clock = FakeClock()
+    bucket = TokenBucket(4, clock=clock, sleep=clock.sleep)
+    for _ in range(3):
+        bucket.acquire()
+
+    assert clock.sleeps == [0.25, 0.25]
+    assert clock.now == 100.5
+
+
+@pytest.mark.parametrize("rate, burst", [(0, 1), (1, 0)])
+def test_invalid(rate, burst):
+    with pytest.raises(ValueError):
+        TokenBucket(rate, burst=burst)
@@ -0,0 +1,117 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import json
+import threading
+from collections import Counter
+
+from mozilla_bitbar_devicepool.reporting import job_distribution
+
+DEVICE_GROUPS = {"a55-perf": ["A1", "A2", "A3"], "p9-perf": ["P1", "P2"], "empty": None}
+PROJECT_WORKER_TYPES = {"a55-perf": "gecko-t-lambda-perf-a55", "p9-perf": "gecko-t-lambda-perf-p9"}
+
+
+def test_get_project_worker_types():
+    config = {
+        "projects": {
+            "a55-perf": {"TC_WORKER_TYPE": "gecko-t-lambda-perf-a55"},
+            "p9-perf": {"TC_WORKER_TYPE": "gecko-t-lambda-perf-p9"},
+            "empty": {"TC_WORKER_TYPE": "gecko-t-lambda-empty"},
+        },
+        "device_groups": DEVICE_GROUPS,
+    }
+    assert job_distribution.get_project_worker_types(config) == PROJECT_WORKER_TYPES
+
+
+def test_fetch_snapshot_fetches_concurrently(mocker):
+    # every fetch waits for all the others, so this only finishes if they run at the same time
+    barrier = threading.Barrier(4, timeout=5)
+
+    def fetch(result):
+        def wait(*args, **kwargs):
+            barrier.wait()
+            return result
+
+        return wait
+
+    mocker.patch.object(
+        job_distribution,
+        "get_devices",
+        side_effect=fetch({"data": {"private_cloud_devices": [{"udid": "A1", "status": "busy"}]}}),
+    )
+    mocker.patch.object(
+        job_distribution,
+        "get_jobs",
+        side_effect=fetch({"data": [{"job_label": '["tcdp","a55-perf","A1"]', "status": "failed"}]}),
+    )
+    quarantined = mocker.patch.object(job_distribution, "_fetch_quarantined", side_effect=fetch(["P2"]))
+
+    snapshot = job_distribution.fetch_snapshot("user", "key", PROJECT_WORKER_TYPES.values(), jobs=10)
+
+    assert snapshot["device_states"] == {"A1": "busy"}
+    assert snapshot["job_counts"] == Counter({("A1", "failed"): 1})
+    assert snapshot["quarantined"] == {"gecko-t-lambda-perf-a55": ["P2"], "gecko-t-lambda-perf-p9": ["P2"]}
+    assert snapshot["errors"] == {}
+    assert quarantined.call_count == 2
+
+
+def test_fetch_snapshot_records_errors(mocker):
+    mocker.patch.object(job_distribution, "get_devices", return_value=None)
+    mocker.patch.object(job_distribution, "get_jobs", return_value={"data": []})
+    mocker.patch.object(job_distribution, "_fetch_quarantined", side_effect=Exception("401"))
+
+    snapshot = job_distribution.fetch_snapshot("user", "key", ["gecko-t-lambda-perf-a55"])
+
+    assert snapshot["errors"] == {
+        "device_states": "unable to fetch the LambdaTest device list",
+        "gecko-t-lambda-perf-a55": "401",
+    }
+
+
+def test_compute_job_distribution():
+    snapshot = {
+        "device_states": {"A1": "busy", "A2": "online", "A3": "offline", "P1": "online", "P2": "online", "X": "online"},
+        "job_counts": Counter({("A1", "completed"): 3, ("A1", "failed"): 1, ("P1", "failed"): 2, ("", "completed"): 1}),
+        "quarantined": {"gecko-t-lambda-perf-a55": ["A3"]},
+        "errors": {"gecko-t-lambda-perf-p9": "401"},
+    }
+
+    report = job_distribution.compute_job_distribution(snapshot, DEVICE_GROUPS, PROJECT_WORKER_TYPES)
+
+    assert report["jobs_inspected"] == 7
+    assert report["device_jobs"] == [
+        {"udid": "A1", "group": "a55-perf", "jobs": 4, "failures": 1},
+        {"udid": "P1", "group": "p9-perf", "jobs": 2, "failures": 2},
+    ]
+    assert report["unseen_devices"] == ["A2", "A3", "P2", "X"]
+    assert report["unseen_not_quarantined"] == {
+        "a55-perf": [{"udid": "A2", "lt_state": "online"}],
+        "p9-perf": [{"udid": "P2", "lt_state": "online"}],
+        "unknown": [{"udid": "X", "lt_state": "online"}],
+    }
+    assert report["projects"]["a55-perf"] == {
+        "worker_type": "gecko-t-lambda-perf-a55",
+        "devices": 3,
+        "devices_seen": 1,
+        "jobs": 4,
+        "failures": 1,
+        "quarantined": 1,
+        "spread": {"min": 0, "max": 4, "mean": 1.33, "cv": 1.41},
+    }
+    # the quarantine data couldn't be fetched
+    assert report["projects"]["p9-perf"]["quarantined"] is None
+
+    assert json.loads(job_distribution.render_json(report)) == report
+    text = job_distribution.render_text(report, verbose=True)
+    assert "WARNING: unable to fetch gecko-t-lambda-perf-p9: 401" in text
+    assert "  A1: 4 jobs, 1 failures" in text
+    assert "Devices not seen that aren't quarantined (3 devices):" in text
+    assert "  p9-perf (gecko-t-lambda-perf-p9): 1/2 devices seen, 2 jobs, 2 failures, unknown quarantined" in text
+    assert "    jobs per device min/mean/max: 0/1.0/2, cv: 1.0" in text
+
+
+def test_get_spread():
+    assert job_distribution.get_spread([3, 3, 3]) == {"min": 3, "max": 3, "mean": 3.0, "cv": 0.0}
+    assert job_distribution.get_spread([0, 0]) == {"min": 0, "max": 0, "mean": 0.0, "cv": 0.0}
+    assert job_distribution.get_spread([]) == {"min": 0, "max": 0, "mean": 0.0, "cv": 0.0}
@@ -0,0 +1,52 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import pytest
+
+from mozilla_bitbar_devicepool import sentry_setup
+
+
+def test_sampler_base_rate():
+    sampler = sentry_setup.ErrorBoostedSampler(0.01, 0.5, 600)
+    assert sampler({}) == 0.01
+    assert sampler({"parent_sampled": None}) == 0.01
+
+
+def test_sampler_follows_parent():
+    sampler = sentry_setup.ErrorBoostedSampler(0.01, 0.5, 600)
+    assert sampler({"parent_sampled": True}) == 1.0
+    assert sampler({"parent_sampled": False}) == 0.0
+
+
+def test_sampler_boosted_after_error(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(sentry_setup.time, "monotonic", lambda: now[0])
+    sampler = sentry_setup.ErrorBoostedSampler(0.01, 0.5, 600)
+
+    # messages and breadcrumbs don't boost
+    event = {"level": "info"}
+    assert sampler.before_send(event, {}) is event
+    assert sampler({}) == 0.01
+
+    sampler.before_send({"level": "error"}, {})
+    assert sampler({}) == 0.5
+    now[0] += 599
+    assert sampler({}) == 0.5
+    now[0] += 1
+    assert sampler({}) == 0.01
+
+    sampler.before_send({"level": "warning", "exception": {"values": []}}, {})
+    assert sampler({}) == 0.5
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [(None, 0.01), ("", 0.01), ("0.2", 0.2), ("0", 0.0), ("1", 1.0), ("abc", 0.01), ("-1", 0.01), ("1.5", 0.01)],
+)
+def test_get_env_float(monkeypatch, value, expected):
+    if value is None:
+        monkeypatch.delenv(sentry_setup.TRACES_SAMPLE_RATE_ENV, raising=False)
+    else:
+        monkeypatch.setenv(sentry_setup.TRACES_SAMPLE_RATE_ENV, value)
+    assert sentry_setup.get_env_float(sentry_setup.TRACES_SAMPLE_RATE_ENV, 0.01, maximum=1.0) == expected
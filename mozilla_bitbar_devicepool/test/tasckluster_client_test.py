@@ -1,6 +1,11 @@
 import pytest
+import requests
 
-from mozilla_bitbar_devicepool.taskcluster_client import TaskclusterClient
+from mozilla_bitbar_devicepool.taskcluster_client import (
+    PendingTasksPoller,
+    TaskclusterClient,
+    get_taskcluster_pending_tasks,
+)
 
 
 @pytest.fixture
@@ -33,3 +38,82 @@ def test_get_quarantined_workers(client):
     assert [w["workerId"] for w in result] == ["worker-2", "worker-4"]
     for w in result:
         assert w["quarantined"]
+
+
+def test_pending_tasks_poller_snapshot(mocker):
+    counts = {"type-a": 3, "type-b": 0}
+    mocker.patch(
+        "mozilla_bitbar_devicepool.taskcluster_client.get_taskcluster_pending_tasks",
+        side_effect=lambda provisioner_id, worker_type: counts[worker_type],
+    )
+    poller = PendingTasksPoller([("prov", "type-a"), ("prov", "type-b"), ("prov", "type-a")])
+    # duplicate queues are only polled once
+    assert poller.queues == [("prov", "type-a"), ("prov", "type-b")]
+    # nothing published before the first poll
+    assert poller.get_pending_tasks("prov", "type-a") == 0
+
+    snapshot = poller.poll()
+    assert snapshot == {("prov", "type-a"): 3, ("prov", "type-b"): 0}
+    assert poller.get_pending_tasks("prov", "type-a") == 3
+    assert poller.get_pending_tasks("prov", "unknown") == 0
+
+
+def test_pending_tasks_poller_error_reports_zero(mocker):
+    def fake_pending(provisioner_id, worker_type):
+        if worker_type == "broken":
+            raise requests.ConnectionError("boom")
+        return 7
+
+    mocker.patch("mozilla_bitbar_devicepool.taskcluster_client.get_taskcluster_pending_tasks", side_effect=fake_pending)
+    poller = PendingTasksPoller([("prov", "ok"), ("prov", "broken")])
+    poller.poll()
+    assert poller.get_pending_tasks("prov", "ok") == 7
+    assert poller.get_pending_tasks("prov", "broken") == 0
+    assert poller.is_confirmed("prov", "ok")
+    assert not poller.is_confirmed("prov", "broken")
+    assert not poller.is_confirmed("prov", "never-polled")
+
+
+def test_pending_tasks_poller_stale_snapshot(mocker):
+    mocker.patch("mozilla_bitbar_devicepool.taskcluster_client.get_taskcluster_pending_tasks", return_value=4)
+    now = [1000.0]
+    mocker.patch("mozilla_bitbar_devicepool.taskcluster_client.time.time", side_effect=lambda: now[0])
+    poller = PendingTasksPoller([("prov", "type-a")], max_age=300)
+    poller.poll()
+    now[0] += 300
+    assert not poller.is_stale()
+    assert poller.get_pending_tasks("prov", "type-a") == 4
+    assert poller.is_confirmed("prov", "type-a")
+
+    # the polling thread stopped publishing, don't act on the old counts
+    now[0] += 1
+    assert poller.is_stale()
+    assert poller.get_pending_tasks("prov", "type-a") == 0
+    assert not poller.is_confirmed("prov", "type-a")
+
+    poller.poll()
+    assert poller.get_pending_tasks("prov", "type-a") == 4
+
+
+def make_response(status_code, content=b""):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    return response
+
+
+def test_get_taskcluster_pending_tasks(mocker):
+    mocker.patch.object(requests.Session, "get", return_value=make_response(200, b'{"pendingTasks": 5}'))
+    assert get_taskcluster_pending_tasks("prov", "type-a") == 5
+
+
+def test_pending_tasks_poller_http_error_is_unconfirmed(mocker):
+    mocker.patch.object(requests.Session, "get", return_value=make_response(404, b'{"code": "ResourceNotFound"}'))
+    with pytest.raises(requests.HTTPError):
+        get_taskcluster_pending_tasks("prov", "type-a")
+
+    poller = PendingTasksPoller([("prov", "type-a")])
+    poller.poll()
+    assert poller.failed_queues == {("prov", "type-a")}
+    assert poller.get_pending_tasks("prov", "type-a") == 0
+    assert not poller.is_confirmed("prov", "type-a")
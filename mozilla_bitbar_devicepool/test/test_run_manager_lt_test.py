@@ -1,5 +1,13 @@
+import copy
+import json
+import logging
+import signal
+import threading
+import time
+
 import pytest
 
+from mozilla_bitbar_devicepool.lambdatest.utilization_history import UtilizationHistory
 from mozilla_bitbar_devicepool.test_run_manager_lt import TestRunManagerLT
 
 
@@ -76,3 +84,177 @@ def test_calculate_jobs_to_start_edge_cases(test_manager):
 
     # All high numbers but limited by available devices
     assert test_manager.calculate_jobs_to_start(100, 4, 0, 50) == 4
+
+
+def test_apply_config_syncs_job_starters(test_manager, mocker):
+    """Test that a reloaded config starts and stops job starter threads."""
+    thread_class = mocker.patch("mozilla_bitbar_devicepool.test_run_manager_lt.threading.Thread")
+    thread_class.return_value.is_alive.return_value = True
+    config_object = test_manager.config_object
+    mocker.patch.object(config_object, "get_fully_configured_projects", return_value=["a55-perf"])
+    mocker.patch.object(config_object, "is_project_disabled", return_value=False)
+
+    assert test_manager.sync_job_starters() == (["a55-perf"], [])
+    # already running
+    assert test_manager.sync_job_starters() == ([], [])
+
+    new_config_object = copy.copy(config_object)
+    new_config_object.config = dict(config_object.config)
+    new_config_object.config["projects"] = dict(config_object.config["projects"], **{"new-project": {}})
+    mocker.patch.object(new_config_object, "get_fully_configured_projects", return_value=["new-project"])
+    mocker.patch.object(new_config_object, "is_project_disabled", return_value=False)
+
+    assert test_manager.apply_config(new_config_object) == (["new-project"], ["a55-perf"])
+    assert test_manager.config_object is new_config_object
+    assert "new-project" in test_manager.job_trackers
+    assert "new-project" in test_manager.shared_data[test_manager.SHARED_PROJECTS]
+    assert test_manager.job_starters["a55-perf"][1].is_set()
+    assert not test_manager.job_starters["new-project"][1].is_set()
+
+
+def test_sync_job_starters_waits_for_stopping_thread(test_manager, mocker):
+    """Test that a project re-enabled while its old thread is stopping never gets two starters."""
+    thread_class = mocker.patch("mozilla_bitbar_devicepool.test_run_manager_lt.threading.Thread")
+    old_thread = mocker.Mock()
+    old_thread.is_alive.return_value = True
+    new_thread = mocker.Mock()
+    new_thread.is_alive.return_value = True
+    thread_class.side_effect = [old_thread, new_thread]
+    config_object = test_manager.config_object
+    mocker.patch.object(config_object, "get_fully_configured_projects", return_value=["a55-perf"])
+    disabled = mocker.patch.object(config_object, "is_project_disabled", return_value=False)
+
+    assert test_manager.sync_job_starters() == (["a55-perf"], [])
+    disabled.return_value = True
+    assert test_manager.sync_job_starters() == ([], ["a55-perf"])
+    old_stop_event = test_manager.job_starters["a55-perf"][1]
+    assert old_stop_event.is_set()
+
+    # re-enabled while the old thread still finishes its cycle
+    disabled.return_value = False
+    assert test_manager.sync_job_starters() == ([], [])
+    old_thread.join.assert_called_once_with(timeout=test_manager.JOB_STARTER_STOP_TIMEOUT)
+    assert test_manager.job_starters["a55-perf"] == (old_thread, old_stop_event)
+    assert test_manager.job_starters_out_of_sync
+
+    # retried (by the config watcher) once the old thread is gone
+    old_thread.is_alive.return_value = False
+    assert test_manager.sync_job_starters() == (["a55-perf"], [])
+    assert test_manager.job_starters["a55-perf"][0] is new_thread
+    assert not test_manager.job_starters["a55-perf"][1].is_set()
+    assert not test_manager.job_starters_out_of_sync
+
+
+def test_job_starter_wait_wakes_on_stop(test_manager):
+    """Test that a job starter's sleep ends when it is stopped."""
+    stop_event = threading.Event()
+    assert not test_manager._wait_for_job_starter_stop(stop_event, 0.01)
+
+    threading.Timer(0.05, stop_event.set).start()
+    start = time.monotonic()
+    assert test_manager._wait_for_job_starter_stop(stop_event, 30)
+    assert time.monotonic() - start < 5
+
+
+def test_record_utilization(test_manager, mocker, tmp_path):
+    """Test that the reporter's counters go into the utilization history."""
+    config_object = test_manager.config_object
+    mocker.patch.object(config_object, "get_fully_configured_projects", return_value=["a55-perf"])
+    project_data = test_manager.shared_data[test_manager.SHARED_PROJECTS]["a55-perf"]
+    project_data[test_manager.PROJECT_LT_BUSY_DEVICE_COUNT] = 3
+    project_data[test_manager.PROJECT_TC_JOB_COUNT] = 7
+    test_manager.shared_data[test_manager.SHARED_LT_G_BUSY_DEVICES] = 5
+
+    history = UtilizationHistory(str(tmp_path / "history.bin"), writable=True)
+    test_manager.record_utilization(history, now=1000)
+
+    [(_start, global_means, _maxes)] = history.query("global", since=990, until=1020)
+    assert global_means["busy"] == 5
+    assert global_means["tc_jobs"] == 7
+    [(_start, project_means, _maxes)] = history.query("a55-perf", since=990, until=1020)
+    assert project_means["busy"] == 3
+    assert project_means["devices"] == len(config_object.config["device_groups"]["a55-perf"])
+
+
+def test_record_utilization_warns_once(test_manager, mocker, caplog):
+    """Test that a series the history has no room for is warned about once."""
+    history = mocker.Mock()
+    history.record.return_value = ["a55-perf"]
+
+    with caplog.at_level(logging.WARNING):
+        test_manager.record_utilization(history, now=1000)
+        test_manager.record_utilization(history, now=1030)
+    assert len([record for record in caplog.records if "a55-perf" in record.getMessage()]) == 1
+
+    # recorded again, then dropped again
+    history.record.return_value = []
+    test_manager.record_utilization(history, now=1060)
+    history.record.return_value = ["a55-perf"]
+    caplog.clear()
+    with caplog.at_level(logging.WARNING):
+        test_manager.record_utilization(history, now=1090)
+    assert len(caplog.records) == 1
+
+
+def test_metrics(test_manager):
+    """Test that the manager's state is served as metrics."""
+    project_data = test_manager.shared_data[test_manager.SHARED_PROJECTS]["a55-perf"]
+    project_data[test_manager.PROJECT_TC_JOB_COUNT] = 7
+    project_data[test_manager.PROJECT_LT_BUSY_DEVICE_COUNT] = 3
+    test_manager.job_starter_stats["a55-perf"] = {
+        "recently_started": 1,
+        "need_handling": 6,
+        "available_devices": 4,
+        "backed_off_devices": 0,
+        "jobs_to_start": 4,
+    }
+    test_manager.jobs_launched.labels("a55-perf").inc()
+    test_manager.monitor_loop_seconds.labels(test_manager.LT_THREAD_NAME).observe(0.2)
+
+    lines = test_manager.metrics.render().splitlines()
+    assert 'ltdp_tc_pending_jobs{project="a55-perf"} 7' in lines
+    assert 'ltdp_lt_devices{project="a55-perf",state="busy"} 3' in lines
+    assert 'ltdp_job_starter_jobs_to_start{project="a55-perf"} 4' in lines
+    assert 'ltdp_jobs_launched_total{project="a55-perf"} 1' in lines
+    assert 'ltdp_monitor_loop_seconds_count{thread="LT API"} 1' in lines
+    assert "ltdp_session_started_jobs_total 0" in lines
+
+
+def test_loop_timings(test_manager):
+    """Test that the loop timers of the threads are collected for the dumps and summaries."""
+    timer = test_manager.get_loop_timer(test_manager.LT_THREAD_NAME, ["fetch", "parse"])
+    assert test_manager.get_loop_timer(test_manager.LT_THREAD_NAME, ["fetch", "parse"]) is timer
+    timer.start()
+    timer.mark("fetch")
+    timer.stop()
+
+    timings = test_manager.get_loop_timings()
+    assert timings[test_manager.LT_THREAD_NAME]["fetch"]["count"] == 1
+    assert timings[test_manager.LT_THREAD_NAME]["parse"]["count"] == 0
+    [summary] = test_manager.get_loop_timing_summaries()
+    assert summary.startswith("LT API (1 loops): fetch ")
+
+
+def test_flight_recorder_dump_on_sigusr1(test_manager, tmp_path):
+    """Test that SIGUSR1 dumps the flight recorder without stopping the manager."""
+    test_manager.flight_recorder_path = str(tmp_path / "flight_recorder.json")
+    test_manager.flight_recorder.record("a55-perf", tc_jobs=3, jobs_to_start=2)
+
+    test_manager.handle_signal(signal.SIGUSR1, None)
+
+    with open(test_manager.flight_recorder_path) as dump_file:
+        [record] = json.load(dump_file)["a55-perf"]
+    assert record["jobs_to_start"] == 2
+    assert not test_manager.shutdown_event.is_set()
+    assert test_manager.interrupt_signal_count == 0
+
+
+def test_debug_areas():
+    """Test that the detailed DEBUG logging areas can be selected."""
+    manager = TestRunManagerLT(unit_testing_mode=True, debug_areas=["job_calculation"])
+    assert manager.DEBUG_JOB_CALCULATION
+    assert not manager.DEBUG_JOB_STARTER
+    assert not manager.DEBUG_DEVICE_SELECTION
+
+    with pytest.raises(ValueError):
+        TestRunManagerLT(unit_testing_mode=True, debug_areas=["scheduling"])
@@ -0,0 +1,121 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+from unittest import mock
+
+from mozilla_bitbar_devicepool import configuration, test_run_manager
+from mozilla_bitbar_devicepool.test_run_manager import MultiServerTestRunManager, TestRunManager
+
+
+def make_configuration(name, worker_type):
+    bitbar_configuration = configuration.BitbarConfiguration(name, testdroid=mock.Mock())
+    bitbar_configuration.config = {
+        "projects": {
+            "defaults": {},
+            "{}-project".format(name): {
+                "taskcluster_provisioner_id": "proj-autophone",
+                "additional_parameters": {"TC_WORKER_TYPE": worker_type},
+            },
+        },
+        "device_groups": {},
+    }
+    return bitbar_configuration
+
+
+def test_start_thread_uses_manager_configuration():
+    managers = [
+        TestRunManager(bitbar_configuration=make_configuration(name, name), thread_name_prefix="%s/" % name)
+        for name in ("legacy", "v3")
+    ]
+    seen = {}
+
+    def record(name):
+        seen[name] = configuration.current()
+
+    for manager in managers:
+        manager.config["threads"] = []
+        manager.start_thread(record, "record", args=(manager.configuration.name,))
+    for manager in managers:
+        manager.config["threads"][0].join()
+        assert manager.config["threads"][0].name == "%s/record" % manager.configuration.name
+
+    assert seen == {"legacy": managers[0].configuration, "v3": managers[1].configuration}
+
+
+def test_multi_server_shares_pending_tasks_poller(mocker):
+    managers = [
+        TestRunManager(bitbar_configuration=make_configuration("legacy", "gecko-t-bitbar-gw-unit-p5")),
+        TestRunManager(bitbar_configuration=make_configuration("v3", "gecko-t-bitbar-gw-perf-a55")),
+    ]
+    for manager in managers:
+        mocker.patch.object(manager, "start")
+        mocker.patch.object(manager, "update_stats")
+    poller_class = mocker.patch.object(test_run_manager, "PendingTasksPoller")
+    mocker.patch.object(test_run_manager.signal, "signal")
+    mocker.patch.object(test_run_manager.threading, "Thread")
+    multi_manager = MultiServerTestRunManager(managers)
+    # one pass of the main loop, then a server stops
+    mocker.patch.object(
+        test_run_manager.time, "sleep", side_effect=lambda seconds: setattr(managers[1], "state", "STOP")
+    )
+
+    multi_manager.run()
+
+    poller_class.assert_called_once_with(
+        [("proj-autophone", "gecko-t-bitbar-gw-unit-p5"), ("proj-autophone", "gecko-t-bitbar-gw-perf-a55")],
+        max_age=test_run_manager.STALE_POLLS * 60,
+    )
+    poller_class.return_value.poll.assert_called_once_with()
+    for manager in managers:
+        assert manager.pending_tasks_poller is poller_class.return_value
+        manager.start.assert_called_once_with()
+    managers[0].update_stats.assert_called_once_with()
+    # one server stopping stops them all
+    assert multi_manager.state == "STOP"
+    assert managers[0].state == "STOP"
+
+
+def test_thread_pending_tasks_survives_poll_errors(mocker):
+    manager = TestRunManager(bitbar_configuration=make_configuration("v3", "gecko-t-bitbar-gw-perf-a55"))
+    manager.pending_tasks_poller = mock.Mock()
+    manager.pending_tasks_poller.poll.side_effect = [KeyError("pendingTasks"), {}]
+    report = mocker.patch.object(test_run_manager.misc, "report_handled_exception_to_sentry")
+    sleeps = []
+
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 2:
+            manager.state = "STOP"
+
+    mocker.patch.object(test_run_manager.time, "sleep", side_effect=fake_sleep)
+
+    manager.thread_pending_tasks()
+
+    assert manager.pending_tasks_poller.poll.call_count == 2
+    report.assert_called_once()
+    assert isinstance(report.call_args[0][0], KeyError)
+
+
+def test_abort_stale_runs(mocker):
+    bitbar_configuration = make_configuration("v3", "gecko-t-bitbar-gw-perf-a55")
+    bitbar_configuration.config["devicepool_config"] = {"stale_waiting_timeout": 600}
+    bitbar_configuration.bitbar_cache["projects"] = {"v3-project": {"id": 1}}
+    manager = TestRunManager(bitbar_configuration=bitbar_configuration)
+    manager.pending_tasks_poller = mock.Mock()
+    manager.pending_tasks_poller.get_pending_tasks.return_value = 0
+    mocker.patch.object(
+        manager.run_tracker,
+        "get_runs",
+        return_value=[{"id": 7, "projectId": 1, "state": "WAITING", "createTime": 1000}],
+    )
+    abort_test_run = mocker.patch.object(test_run_manager, "abort_test_run")
+
+    # the pending task count couldn't be fetched, don't guess
+    manager.pending_tasks_poller.is_confirmed.return_value = False
+    manager.abort_stale_runs()
+    abort_test_run.assert_not_called()
+
+    manager.pending_tasks_poller.is_confirmed.return_value = True
+    manager.abort_stale_runs()
+    abort_test_run.assert_called_once_with(1, 7)
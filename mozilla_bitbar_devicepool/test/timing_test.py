@@ -0,0 +1,60 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import pytest
+
+from mozilla_bitbar_devicepool.util import timing
+
+
+@pytest.mark.parametrize("ns", [0, 3, 4, 7, 8, 15, 1000, 123_456_789, 2**63])
+def test_bucket_bounds(ns):
+    lowest, highest = timing._bucket_bounds(timing._bucket_index(ns))
+    assert lowest <= ns <= highest
+    # within 25%
+    assert highest - lowest <= max(1, lowest // 4)
+
+
+def test_histogram_percentiles():
+    histogram = timing.TimingHistogram()
+    assert histogram.percentile(50) == 0
+    for ms in range(1, 101):
+        histogram.record(ms * 1_000_000)
+
+    assert histogram.percentile(50) == pytest.approx(50_000_000, rel=0.25)
+    assert histogram.percentile(95) == pytest.approx(95_000_000, rel=0.25)
+    assert histogram.percentile(100) == 100_000_000
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 100
+    assert snapshot["mean_ms"] == 50.5
+    assert snapshot["max_ms"] == 100
+
+
+def test_loop_timer(monkeypatch):
+    now = [0]
+    monkeypatch.setattr(timing.time, "perf_counter_ns", lambda: now[0])
+    timer = timing.LoopTimer("JS a55-perf", ["partition", "decision", "spawn"])
+
+    timer.start()
+    now[0] += 2_000_000
+    timer.mark("partition")
+    now[0] += 1_000_000
+    timer.mark("decision")
+    # a wait
+    now[0] += 500_000_000
+    timer.skip()
+    now[0] += 3_000_000
+    timer.mark("decision")
+    assert timer.stop() == 6_000_000
+
+    snapshot = timer.snapshot()
+    assert snapshot["decision"]["count"] == 1
+    assert snapshot["decision"]["max_ms"] == 4
+    assert snapshot["total"]["max_ms"] == 6
+    # not marked in the loop
+    assert snapshot["spawn"]["count"] == 0
+    summary = timer.summary()
+    assert summary.startswith("JS a55-perf (1 loops): partition ")
+    assert summary.endswith("total 5.8/5.8/6.0")
+    assert "spawn" not in summary
+    assert timing.LoopTimer("Cleaner", ["clean"]).summary() == "Cleaner: no loops"
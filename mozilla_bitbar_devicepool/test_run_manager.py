@@ -3,24 +3,29 @@
 # You can obtain one at http://mozilla.org/MPL/2.0/.
 
 import faulthandler
-import math
 import re
 import signal
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
-import sentry_sdk
 from testdroid import RequestResponseError
 
-from mozilla_bitbar_devicepool import configuration, logger
+from mozilla_bitbar_devicepool import configuration, logger, sentry_setup
+from mozilla_bitbar_devicepool.bitbar.admin_devices import get_device_statuses
 from mozilla_bitbar_devicepool.bitbar.device_groups import get_device_group_devices
-from mozilla_bitbar_devicepool.bitbar.devices import get_offline_devices
-from mozilla_bitbar_devicepool.bitbar.runs import (
-    get_active_test_runs,
-    run_test_for_project,
+from mozilla_bitbar_devicepool.bitbar.devices import (
+    get_device_problems,
+    partition_offline_devices,
 )
-from mozilla_bitbar_devicepool.taskcluster_client import get_taskcluster_pending_tasks
+from mozilla_bitbar_devicepool.bitbar.host_throttle import HostStartThrottle
+from mozilla_bitbar_devicepool.bitbar.run_tracker import RunTracker
+from mozilla_bitbar_devicepool.bitbar.runs import abort_test_run, run_test_for_project
+from mozilla_bitbar_devicepool.bitbar.stale_runs import StaleRunJanitor
+from mozilla_bitbar_devicepool.jobs_to_start import get_strategy
+from mozilla_bitbar_devicepool.taskcluster_client import PendingTasksPoller
+from mozilla_bitbar_devicepool.util import misc
 
 #
 # WARNING: not used everywhere yet!!!
@@ -28,18 +33,29 @@ from mozilla_bitbar_devicepool.taskcluster_client import get_taskcluster_pending
 # don't fire calls at bitbar, just mention you would
 TESTING = False
 
-CACHE = None
-CONFIG = None
-ARCHIVED_FILE_REGEX = r"FileEntity with id [\d]* does not exist"
+ARCHIVED_FILE_REGEX = r"FileEntity with id ([\d]+) does not exist"
 PROJECT_DOES_NOT_EXIST_REGEX = r"Project with id [\d]* does not exist"
 
-sentry_sdk.init(
-    dsn="https://6219c1b8ecb6484b82586c55ad99a87e@o1069899.ingest.sentry.io/4504301875691520",
-    # Set traces_sample_rate to 1.0 to capture 100%
-    # of transactions for performance monitoring.
-    # We recommend adjusting this value in production.
-    traces_sample_rate=1.0,
-)
+
+def init_sentry():
+    """Start reporting to Sentry. Called by the test run manager entry point, not on import."""
+    # traces are sampled, see sentry_setup for the environment variables setting the rates
+    sentry_setup.init_sentry("https://6219c1b8ecb6484b82586c55ad99a87e@o1069899.ingest.sentry.io/4504301875691520")
+
+
+# polling intervals after which the pending task counts are too old to act on
+STALE_POLLS = 5
+
+
+def poll_pending_tasks(pending_tasks_poller):
+    """Polls the pending task counts, an error must not stop the polling thread."""
+    try:
+        pending_tasks_poller.poll()
+    except Exception as e:
+        logger.warning("Failed to poll pending tasks (%s: %s)." % (e.__class__.__name__, e), exc_info=True)
+        misc.report_handled_exception_to_sentry(e)
+
+
 # will dump a stack trace for all threads to sys.stderr on SIGSEGV, SIGFPE, SIGABRT, SIGBUS and SIGILL and exit
 #   - USAGE: `kill -s SIGABRT <PID OF TEST_RUN_MANAGER>`
 faulthandler.enable()
@@ -56,17 +72,54 @@ class TestRunManager(object):
     # tell pytest to ignore this class, it's not a test class
     __test__ = False
 
-    def __init__(self, wait=60):
-        global CACHE, CONFIG
-
-        CACHE = configuration.BITBAR_CACHE
-        CONFIG = configuration.CONFIG
+    def __init__(self, wait=60, submit_max_workers=8, bitbar_configuration=None, thread_name_prefix=""):
+        """
+        Args:
+            bitbar_configuration (BitbarConfiguration): The configured bitbar server to
+                drive. Defaults to the calling thread's configuration.
+            thread_name_prefix (str): Prefix of the names of the threads started,
+                to tell servers apart in the logs of a MultiServerTestRunManager.
+        """
+        self.configuration = bitbar_configuration or configuration.current()
+        self.cache = self.configuration.bitbar_cache
+        self.config = self.configuration.config
+        self.thread_name_prefix = thread_name_prefix
 
         self.wait = wait
         self.state = "RUNNING"
+        # shared by all project threads, see thread_pending_tasks()
+        self.pending_tasks_poller = None
+        # test run submissions of all projects, see start_test_runs()
+        self.submit_executor = ThreadPoolExecutor(
+            max_workers=submit_max_workers,
+            thread_name_prefix="{}submit".format(thread_name_prefix),
+            initializer=configuration.use,
+            initargs=(self.configuration,),
+        )
+        # active runs of all projects, see process_active_runs()
+        self.run_tracker = RunTracker(self.project_name_for_run)
+
+        # limits run starts per docker host, see get_bitbar_test_stats() and start_test_runs()
+        self.host_throttle = None
+        devicepool_config = self.config.get("devicepool_config", {})
+        if devicepool_config.get("host_start_limit"):
+            self.host_throttle = HostStartThrottle(
+                devicepool_config["host_start_limit"], window_seconds=devicepool_config.get("host_start_window", 60)
+            )
 
-        signal.signal(signal.SIGUSR2, self.handle_signal)
-        signal.signal(signal.SIGINT, self.handle_signal)
+        # aborts runs stuck in WAITING, see abort_stale_runs()
+        self.stale_run_janitor = None
+        if devicepool_config.get("stale_waiting_timeout"):
+            self.stale_run_janitor = StaleRunJanitor(
+                devicepool_config["stale_waiting_timeout"],
+                batch_size=devicepool_config.get("stale_waiting_abort_batch", 5),
+            )
+
+        # device name -> device group name, used to partition the device problems listing
+        self.device_group_index = {}
+        for device_group_name, device_group in self.config["device_groups"].items():
+            for device_name in device_group or {}:
+                self.device_group_index[device_name] = device_group_name
 
     def handle_signal(self, signalnum, frame):
         if self.state != "RUNNING":
@@ -75,35 +128,69 @@ class TestRunManager(object):
         if signalnum == signal.SIGINT or signalnum == signal.SIGUSR2:
             self.state = "STOP"
 
-    def get_bitbar_test_stats(self, project_name, project_config):
-        device_group_name = project_config["device_group_name"]
-        device_group = CONFIG["device_groups"][device_group_name]
-        bitbar_device_group = CACHE["device_groups"][device_group_name]
-        stats = CACHE["projects"][project_name]["stats"]
-        device_group_count = bitbar_device_group["deviceCount"]
-
-        offline_devices = []
-        temp_offline_devices = get_offline_devices(device_model=project_config.get("device_model", None))
-        for device_name in temp_offline_devices:
-            if device_name in device_group:
-                offline_devices.append(device_name)
-        enabled_devices = get_device_group_devices(bitbar_device_group["id"])
-
-        stats = CACHE["projects"][project_name]["stats"]
-        stats["OFFLINE_DEVICES"] = offline_devices
-        stats["OFFLINE"] = len(offline_devices)
-        stats["DISABLED"] = device_group_count - len(enabled_devices)
+    def get_bitbar_test_stats(self, projects_config):
+        """Update the OFFLINE and DISABLED stats of every project.
+
+        The device problems listing is fetched once and partitioned by device group and
+        device_model prefix. The enabled devices of each device group are fetched in parallel.
+        Each project's lock is only held while its stats are written.
+        """
+        projects = {}
+        for project_name in projects_config:
+            if project_name == "defaults":
+                continue
+            project_config = projects_config[project_name]
+            projects[project_name] = (project_config["device_group_name"], project_config.get("device_model", None))
+
+        offline_devices_by_project = partition_offline_devices(get_device_problems(), self.device_group_index, projects)
+
+        def count_enabled_devices(device_group_name):
+            # this is the first use of a device group id loaded from the bitbar cache
+            self.configuration.validate_cached_entry("device_groups", device_group_name)
+            return len(get_device_group_devices(self.cache["device_groups"][device_group_name]["id"]))
+
+        device_group_names = sorted(set(device_group_name for device_group_name, _ in projects.values()))
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(8, len(device_group_names))),
+            initializer=configuration.use,
+            initargs=(self.configuration,),
+        ) as executor:
+            enabled_device_counts = dict(
+                zip(device_group_names, executor.map(count_enabled_devices, device_group_names))
+            )
+
+        for project_name, (device_group_name, _device_model) in projects.items():
+            offline_devices = offline_devices_by_project[project_name]
+            device_group_count = self.cache["device_groups"][device_group_name]["deviceCount"]
+            with self.cache["projects"][project_name]["lock"]:
+                stats = self.cache["projects"][project_name]["stats"]
+                stats["OFFLINE_DEVICES"] = offline_devices
+                stats["OFFLINE"] = len(offline_devices)
+                stats["DISABLED"] = device_group_count - enabled_device_counts[device_group_name]
+
+        if self.host_throttle:
+            # refresh the device -> docker host index along with the device stats
+            self.host_throttle.update_device_hosts(get_device_statuses())
 
     def handle_queue(self, project_name, projects_config):
         logger.info("thread starting")
-        stats = CACHE["projects"][project_name]["stats"]
-        lock = CACHE["projects"][project_name]["lock"]
+        stats = self.cache["projects"][project_name]["stats"]
+        lock = self.cache["projects"][project_name]["lock"]
+        devicepool_config = self.config.get("devicepool_config", {})
+        # each project has its own instance, as strategies may keep state between cycles
+        strategy = get_strategy(
+            devicepool_config.get("jobs_to_start_algorithm"), **devicepool_config.get("jobs_to_start_options", {})
+        )
 
         while self.state == "RUNNING":
             project_config = projects_config[project_name]
             device_group_name = project_config["device_group_name"]
             additional_parameters = project_config["additional_parameters"]
             worker_type = additional_parameters.get("TC_WORKER_TYPE")
+            taskcluster_provisioner_id = project_config["taskcluster_provisioner_id"]
+
+            # read from the shared poller's snapshot, no network I/O while holding the lock
+            pending_tasks = self.pending_tasks_poller.get_pending_tasks(taskcluster_provisioner_id, worker_type)
 
             with lock:
                 if stats["OFFLINE"] or stats["DISABLED"]:
@@ -116,74 +203,10 @@ class TestRunManager(object):
                         )
                     )
 
-                taskcluster_provisioner_id = projects_config["defaults"]["taskcluster_provisioner_id"]
-
                 # create enough tests to service either the pending tasks or the number of idle
-                # devices which do not already have a waiting test + a small logarithmic fudge
-                # term based on the number of pending tasks (whichever is smaller).
-                try:
-                    pending_tasks = get_taskcluster_pending_tasks(taskcluster_provisioner_id, worker_type)
-                except requests.ConnectionError as e:
-                    logger.warning("exception raised when calling get_taskcluster_pending_tasks.")
-                    logger.warning(e)
-                    pending_tasks = 0
-
-                # 'jobs to start' scheduler selection
-
-                if CONFIG.get("devicepool_config", {}).get("jobs_to_start_algorithm") == "v1":
-                    # 'jobs to start' algorithm v1
-                    #   - basically start up to the number of devices in a group
-
-                    # warning: only take the log of positive non-zero numbers, or a
-                    # "ValueError: math domain error" will be raised
-
-                    jobs_to_start = min(
-                        pending_tasks,
-                        stats["IDLE"] - stats["WAITING"] + 1 + int(math.log10(1 + pending_tasks)),
-                    )
-
-                    # notes: aggresive in the number of jobs it starts
-                    #  - was too aggressive, caused server issues so created v2.
-                elif CONFIG.get("devicepool_config", {}).get("jobs_to_start_algorithm") == "v2":
-                    # 'jobs to start' algorithm v2
-                    #  - start up to max_jobs_to_have_waiting jobs
-                    #    - avoids overloading Bitbar with too many waiting jobs
-
-                    # TODO: vary this based on how many devices out of total this queue has
-                    #   - set a global limit and then give each queue a fraction of that
-
-                    max_jobs_to_have_waiting = 1
-                    if stats["WAITING"] >= max_jobs_to_have_waiting or pending_tasks == 0:
-                        jobs_to_start = 0
-                    else:
-                        jobs_to_start = max(1, max_jobs_to_have_waiting - stats["WAITING"])
-
-                    # v2 issues: waiting tasks... trying to avoid them
-                elif CONFIG.get("devicepool_config", {}).get("jobs_to_start_algorithm") == "v3":
-                    # v3: a modified v1
-                    # goals:
-                    #   - more like lambdatest's algo?
-                    #   - no extra waiting jobs (hmm, has more than one (v2))...
-                    #     - system should be able to handle it. represents a bug to squash.
-                    tasks_that_need_handling = pending_tasks - stats["WAITING"]
-                    # logger.info(f"jts calc: min({tasks_that_need_handling}, {stats['IDLE']} - {stats['WAITING']})")
-                    jobs_to_start = min(
-                        tasks_that_need_handling,
-                        stats["IDLE"] - stats["WAITING"],  # TODO: also subtract just started like in lt?
-                    )
-                    # any waiting jobs indicate a failure somewhere... why?
-                    # if stats["WAITING"] > 0:
-                    #     logger.warning(f"WARNING: {stats['WAITING']} WAITING JOBS")
-                    #
-                    # is it because of way we calculate idle devices (basically conf - running - offline - disabled)?
-                    #   - could be cleaning or some other state
-                else:
-                    logger.debug(CONFIG.get("devicepool_config", {}))
-                    raise RuntimeError("Invalid 'jobs to start' algorithm selected or unset.")
-
-                # make value sane if < 0
-                if jobs_to_start < 0:
-                    jobs_to_start = 0
+                # devices which do not already have a waiting test (see jobs_to_start.py for
+                # the available strategies).
+                jobs_to_start = strategy.jobs_to_start(stats, pending_tasks)
 
                 if stats["RUNNING"] or stats["WAITING"]:
                     logger.info(
@@ -199,51 +222,121 @@ class TestRunManager(object):
                         )
                     )
 
-            for _task in range(jobs_to_start):
-                if self.state != "RUNNING":
-                    break
-                try:
-                    if TESTING:
-                        logger.info("TESTING MODE: Would be starting test run.")
-                    else:
-                        # if there are no devices assigned, the API will throw an exception
-                        # when we try to start, so detect and warn here.
-                        if stats["COUNT"] == 0:
-                            logger.warning("Didn't try to start a job because there are no devices assigned.")
-                        else:
-                            test_run = run_test_for_project(project_name)
-                            # increment so we don't start too many jobs before main thread updates stats
-                            with lock:
-                                stats["WAITING"] += 1
-
-                            logger.info("test run {} started".format(test_run["id"]))
-                except RequestResponseError as e:
-                    if e.status_code == 404 and re.search(ARCHIVED_FILE_REGEX, str(e)):
-                        logger.warning("Test files have been archived. Exiting so configuration is rerun...")
-                        logger.warning("%s: %s" % (e.__class__.__name__, e))
-                        self.state = "STOP"
-                    elif e.status_code == 404 and re.search(PROJECT_DOES_NOT_EXIST_REGEX, str(e)):
-                        logger.warning("Project does not exist!. Exiting so configuration is rerun...")
-                        logger.warning("%s: %s" % (e.__class__.__name__, e))
-                        self.state = "STOP"
-                    else:
-                        logger.warning("%s: %s" % (e.__class__.__name__, e))
-                except Exception as e:
-                    logger.warning(
-                        "Failed to create test run for group %s (%s: %s)."
-                        % (device_group_name, e.__class__.__name__, e),
-                        exc_info=True,
-                    )
+            if jobs_to_start > 0 and self.state == "RUNNING":
+                if TESTING:
+                    logger.info("TESTING MODE: Would be starting {} test run(s).".format(jobs_to_start))
+                elif stats["COUNT"] == 0:
+                    # if there are no devices assigned, the API will throw an exception
+                    # when we try to start, so detect and warn here.
+                    logger.warning("Didn't try to start a job because there are no devices assigned.")
+                else:
+                    self.start_test_runs(project_name, device_group_name, jobs_to_start)
 
             if self.state == "RUNNING":
                 time.sleep(self.wait)
         logger.info("thread exiting")
 
+    def start_test_runs(self, project_name, device_group_name, count):
+        """Start count test runs for a project concurrently and wait for them to be submitted.
+
+        The runs are submitted through the pool shared by all projects, which bounds the
+        number of concurrent requests to bitbar. Each run's failure is handled on its own.
+        """
+        try:
+            # no-op unless the project's ids came from the bitbar cache and are unchecked
+            self.configuration.validate_cached_project(project_name)
+        except configuration.BitbarCacheException as e:
+            logger.warning("Bitbar cache is out of date. Exiting so configuration is rerun...")
+            logger.warning(e)
+            self.state = "STOP"
+            return
+        except Exception as e:
+            logger.warning(
+                "Failed to create test run for group %s (%s: %s)." % (device_group_name, e.__class__.__name__, e),
+                exc_info=True,
+            )
+            return
+
+        if self.host_throttle:
+            # OFFLINE_DEVICES is 0 until the stats have been gathered
+            offline_devices = self.cache["projects"][project_name]["stats"]["OFFLINE_DEVICES"] or []
+            online_devices = [
+                device_name
+                for device_name in self.config["device_groups"][device_group_name]
+                if device_name not in offline_devices
+            ]
+            granted = self.host_throttle.acquire(online_devices, count)
+            if granted < count:
+                logger.info("docker host start limit reached, starting {} of {} test runs".format(granted, count))
+            count = granted
+
+        futures = [
+            self.submit_executor.submit(self.start_test_run, project_name, device_group_name) for _ in range(count)
+        ]
+        for future in futures:
+            future.result()
+
+    def start_test_run(self, project_name, device_group_name, refresh_archived_files=True):
+        if self.state != "RUNNING":
+            return
+        stats = self.cache["projects"][project_name]["stats"]
+        lock = self.cache["projects"][project_name]["lock"]
+        try:
+            test_run = run_test_for_project(project_name)
+            # increment so we don't start too many jobs before the active_jobs thread updates stats
+            with lock:
+                stats["WAITING"] += 1
+            logger.info("test run {} started".format(test_run["id"]))
+        except RequestResponseError as e:
+            archived_file_match = re.search(ARCHIVED_FILE_REGEX, str(e))
+            if e.status_code == 404 and archived_file_match and refresh_archived_files:
+                # replace just the archived file and retry, other projects keep scheduling
+                logger.warning("Test file has been archived. Refreshing it...")
+                logger.warning("%s: %s" % (e.__class__.__name__, e))
+                try:
+                    self.configuration.refresh_file(int(archived_file_match.group(1)))
+                except (
+                    configuration.ConfigurationException,
+                    requests.exceptions.RequestException,
+                    RequestResponseError,
+                ) as refresh_error:
+                    logger.warning("Failed to refresh test file. Exiting so configuration is rerun...")
+                    logger.warning("%s: %s" % (refresh_error.__class__.__name__, refresh_error))
+                    self.configuration.invalidate_bitbar_cache()
+                    self.state = "STOP"
+                    return
+                self.start_test_run(project_name, device_group_name, refresh_archived_files=False)
+            elif e.status_code == 404 and archived_file_match:
+                logger.warning("Test files have been archived. Exiting so configuration is rerun...")
+                logger.warning("%s: %s" % (e.__class__.__name__, e))
+                self.configuration.invalidate_bitbar_cache()
+                self.state = "STOP"
+            elif e.status_code == 404 and re.search(PROJECT_DOES_NOT_EXIST_REGEX, str(e)):
+                logger.warning("Project does not exist!. Exiting so configuration is rerun...")
+                logger.warning("%s: %s" % (e.__class__.__name__, e))
+                self.configuration.invalidate_bitbar_cache()
+                self.state = "STOP"
+            else:
+                logger.warning("%s: %s" % (e.__class__.__name__, e))
+        except Exception as e:
+            logger.warning(
+                "Failed to create test run for group %s (%s: %s)." % (device_group_name, e.__class__.__name__, e),
+                exc_info=True,
+            )
+
+    def thread_pending_tasks(self):
+        # one poller fetches the pending counts for every worker type, project threads read the snapshot
+        while self.state == "RUNNING":
+            poll_pending_tasks(self.pending_tasks_poller)
+            time.sleep(self.wait)
+
     def thread_active_jobs(self):
         while self.state == "RUNNING":
             logger.info("getting active runs")
             try:
                 self.process_active_runs()
+                if self.stale_run_janitor:
+                    self.abort_stale_runs()
             except (requests.exceptions.ConnectionError, requests.Timeout) as e:
                 logger.warning("exception raised when calling process_active_runs.")
                 logger.warning(e)
@@ -251,57 +344,112 @@ class TestRunManager(object):
                 time.sleep(10)
             time.sleep(10)
 
-    def process_active_runs(self):
-        bitbar_projects = CACHE["projects"]
-        bitbar_test_runs = CACHE["test_runs"]
+    def project_name_for_run(self, test_run):
+        # remove user id from this (see configuration.py:configure_projects)
+        project_name = test_run["projectName"].replace("%s-" % (self.configuration.get_me_id()), "")
+        # only track runs for projects in our config
+        if project_name in self.cache["projects"]:
+            return project_name
+        return None
 
-        # init the temporary dict
-        accumulation_dict = {}
-        for project_name in bitbar_projects:
-            accumulation_dict[project_name] = []
+    def process_active_runs(self):
+        bitbar_projects = self.cache["projects"]
+        bitbar_test_runs = self.cache["test_runs"]
 
         try:
-            # gather all runs per project
-            result = get_active_test_runs()
+            # fetch all active runs, or only the runs updated since the last poll
+            self.run_tracker.poll()
         except RequestResponseError as e:
             logger.warning("process_active_runs: RequestResponseError received")
             logger.warning(e)
             return
 
-        for item in result:
-            # remove user id from this (see configuration.py:configure_projects)
-            project_name = item["projectName"].replace("%s-" % (configuration.get_me_id()), "")
-            # only accumulate for projects in our config
-            if project_name in bitbar_projects:
-                accumulation_dict[project_name].append(item)
-
-        # replace current values with what we got above
+        # replace current values with the tracked runs
         for project_name in bitbar_projects:
-            stats = CACHE["projects"][project_name]["stats"]
-            lock = CACHE["projects"][project_name]["lock"]
+            stats = self.cache["projects"][project_name]["stats"]
+            lock = self.cache["projects"][project_name]["lock"]
             with lock:
-                bitbar_test_runs[project_name] = accumulation_dict[project_name]
+                bitbar_test_runs[project_name] = self.run_tracker.get_runs(project_name)
 
-                stats["RUNNING"] = 0
-                stats["WAITING"] = 0
-                for test_run in bitbar_test_runs[project_name]:
-                    test_run_state = test_run["state"]
-                    stats[test_run_state] += 1
+                stats["RUNNING"] = self.run_tracker.get_state_count(project_name, "RUNNING")
+                stats["WAITING"] = self.run_tracker.get_state_count(project_name, "WAITING")
 
                 stats["IDLE"] = stats["COUNT"] - stats["DISABLED"] - stats["OFFLINE"] - stats["RUNNING"]
                 if stats["IDLE"] < 0:
                     stats["IDLE"] = 0
 
-    def run(self):
-        projects_config = CONFIG["projects"]
-        CONFIG["threads"] = []
+    def abort_stale_runs(self):
+        """Abort runs that have been WAITING too long while their queue has no pending tasks.
+
+        Only projects whose pending task count was fetched by the latest poll are
+        considered, so a Taskcluster outage doesn't look like an empty queue.
+        """
+        projects_config = self.config["projects"]
+        project_runs = {}
+        pending_tasks = {}
+        for project_name in self.cache["projects"]:
+            project_config = projects_config[project_name]
+            worker_type = project_config["additional_parameters"].get("TC_WORKER_TYPE")
+            taskcluster_provisioner_id = project_config.get("taskcluster_provisioner_id")
+            if not worker_type or not self.pending_tasks_poller.is_confirmed(taskcluster_provisioner_id, worker_type):
+                continue
+            project_runs[project_name] = self.run_tracker.get_runs(project_name)
+            pending_tasks[project_name] = self.pending_tasks_poller.get_pending_tasks(
+                taskcluster_provisioner_id, worker_type
+            )
+
+        for project_name, test_run, reason in self.stale_run_janitor.select(project_runs, pending_tasks):
+            logger.warning("{}: aborting test run {} ({})".format(project_name, test_run["id"], reason))
+            try:
+                abort_test_run(test_run["projectId"], test_run["id"])
+            except (RequestResponseError, requests.exceptions.RequestException) as e:
+                logger.warning("{}: failed to abort test run {}: {}".format(project_name, test_run["id"], e))
+
+    def get_taskcluster_queues(self):
+        """Return the (provisioner id, worker type) queues of the projects started via Taskcluster."""
+        projects_config = self.config["projects"]
+        taskcluster_queues = []
+        for project_name in projects_config:
+            if project_name == "defaults":
+                continue
+            project_config = projects_config[project_name]
+            worker_type = project_config["additional_parameters"].get("TC_WORKER_TYPE")
+            if worker_type:
+                taskcluster_queues.append((project_config["taskcluster_provisioner_id"], worker_type))
+        return taskcluster_queues
+
+    def start_thread(self, target, name, args=()):
+        """Start a thread running target(*args) against this manager's bitbar configuration."""
+
+        def run_with_configuration():
+            configuration.use(self.configuration)
+            target(*args)
+
+        thread = threading.Thread(target=run_with_configuration, name="{}{}".format(self.thread_name_prefix, name))
+        self.config["threads"].append(thread)
+        thread.start()
+        return thread
+
+    def start(self):
+        """Start the active_jobs and project threads.
+
+        pending_tasks_poller must be set and polled before this is called.
+        """
+        projects_config = self.config["projects"]
+        self.config.setdefault("threads", [])
 
-        active_job_thread = threading.Thread(target=self.thread_active_jobs, name="active_jobs", args=())
         logger.info("test-run-manager: loading existing runs")
-        active_job_thread.start()
-        CONFIG["threads"].append(active_job_thread)
+        self.start_thread(self.thread_active_jobs, "active_jobs")
         time.sleep(2)
 
+        # prepopulate stats
+        try:
+            self.get_bitbar_test_stats(projects_config)
+        except configuration.BitbarCacheException as e:
+            logger.warning("Bitbar cache is out of date. Exiting so configuration is rerun...")
+            logger.warning(e)
+            self.state = "STOP"
+
         for project_name in projects_config:
             if project_name == "defaults":
                 continue
@@ -315,49 +463,125 @@ class TestRunManager(object):
                 # Only manage projects initiated via Taskcluster.
                 continue
 
-            # prepopulate stats
-            self.get_bitbar_test_stats(project_name, projects_config[project_name])
-            time.sleep(1)
-
             # multithread handle_queue
             # TODO: should name be project_name or device group name?
-            t1 = threading.Thread(
-                target=self.handle_queue,
-                name=project_name,
-                args=(
-                    project_name,
-                    projects_config,
-                ),
-            )
-            CONFIG["threads"].append(t1)
-            t1.start()
+            self.start_thread(self.handle_queue, project_name, args=(project_name, projects_config))
+
+    def update_stats(self):
+        """Refresh the device stats of all projects and log the totals, called from the main loop."""
+        projects_config = self.config["projects"]
+        configuration.use(self.configuration)
+        waiting_total = 0
+        running_total = 0
+        logger.info("getting stats for all projects")
+        for project_name in projects_config:
+            if project_name == "defaults":
+                continue
+            stats = self.cache["projects"][project_name]["stats"]
+            waiting_total += stats["WAITING"]
+            running_total += stats["RUNNING"]
+        try:
+            self.get_bitbar_test_stats(projects_config)
+        except configuration.BitbarCacheException as e:
+            logger.warning("Bitbar cache is out of date. Exiting so configuration is rerun...")
+            logger.warning(e)
+            self.state = "STOP"
+        except (
+            requests.exceptions.ConnectionError,
+            requests.Timeout,
+            RequestResponseError,
+        ) as e:
+            logger.warning("exception raised when calling get_bitbar_test_stats.")
+            logger.warning(e)
+            # TODO: if we see this a lot, add exponential backoff?
+            time.sleep(15)
+        logger.info("{}WAITING_TOTAL {} RUNNING_TOTAL {}".format(self.thread_name_prefix, waiting_total, running_total))
+
+    def run(self):
+        signal.signal(signal.SIGUSR2, self.handle_signal)
+        signal.signal(signal.SIGINT, self.handle_signal)
+        self.config["threads"] = []
+
+        self.pending_tasks_poller = PendingTasksPoller(self.get_taskcluster_queues(), max_age=STALE_POLLS * self.wait)
+        logger.info("test-run-manager: fetching pending tasks")
+        # populate the snapshot before any project thread reads it
+        self.pending_tasks_poller.poll()
+        self.start_thread(self.thread_pending_tasks, "pending_tasks")
+
+        self.start()
 
         # we need the main thread to keep running so it can handle signals
         # - https://www.g-loaded.eu/2016/11/24/how-to-terminate-running-python-threads-using-signals/
         while self.state == "RUNNING":
-            waiting_total = 0
-            running_total = 0
             time.sleep(60)
-            logger.info("getting stats for all projects")
-            for project_name in projects_config:
-                if project_name == "defaults":
-                    continue
-                lock = CACHE["projects"][project_name]["lock"]
-                stats = CACHE["projects"][project_name]["stats"]
-                waiting_total += stats["WAITING"]
-                running_total += stats["RUNNING"]
-                with lock:
-                    try:
-                        self.get_bitbar_test_stats(project_name, projects_config[project_name])
-                    except (
-                        requests.exceptions.ConnectionError,
-                        requests.Timeout,
-                        RequestResponseError,
-                    ) as e:
-                        logger.warning("exception raised when calling get_bitbar_test_stats.")
-                        logger.warning(e)
-                        # TODO: if we see this a lot, add exponential backoff?
-                        time.sleep(15)
-                time.sleep(1)
-            logger.info("WAITING_TOTAL {} RUNNING_TOTAL {}".format(waiting_total, running_total))
+            self.update_stats()
+        logger.info("main thread exiting")
+
+
+class MultiServerTestRunManager(object):
+    """Drives several bitbar servers from one process.
+
+    Each server has its own TestRunManager, with its own configuration, bitbar cache,
+    Testdroid client and threads. The Taskcluster pending task counts of all servers'
+    queues are fetched by a single PendingTasksPoller shared by the managers, and one
+    main loop refreshes the device stats of every server.
+
+    When any manager stops (e.g. its bitbar cache is out of date) all of them are
+    stopped, so the process exits and the configuration of every server is rerun.
+    """
+
+    def __init__(self, managers, wait=60):
+        self.managers = managers
+        self.wait = wait
+        self.state = "RUNNING"
+        self.pending_tasks_poller = None
+
+    def handle_signal(self, signalnum, frame):
+        if self.state != "RUNNING":
+            return
+
+        if signalnum == signal.SIGINT or signalnum == signal.SIGUSR2:
+            self.stop()
+
+    def stop(self):
+        self.state = "STOP"
+        for manager in self.managers:
+            manager.state = "STOP"
+
+    def check_managers(self):
+        if any(manager.state != "RUNNING" for manager in self.managers):
+            self.stop()
+
+    def thread_pending_tasks(self):
+        while self.state == "RUNNING":
+            poll_pending_tasks(self.pending_tasks_poller)
+            time.sleep(self.wait)
+            self.check_managers()
+
+    def run(self):
+        signal.signal(signal.SIGUSR2, self.handle_signal)
+        signal.signal(signal.SIGINT, self.handle_signal)
+
+        taskcluster_queues = []
+        for manager in self.managers:
+            manager.config["threads"] = []
+            taskcluster_queues.extend(manager.get_taskcluster_queues())
+        self.pending_tasks_poller = PendingTasksPoller(taskcluster_queues, max_age=STALE_POLLS * self.wait)
+        logger.info("test-run-manager: fetching pending tasks")
+        self.pending_tasks_poller.poll()
+        for manager in self.managers:
+            manager.pending_tasks_poller = self.pending_tasks_poller
+        pending_tasks_thread = threading.Thread(target=self.thread_pending_tasks, name="pending_tasks")
+        pending_tasks_thread.start()
+
+        for manager in self.managers:
+            manager.start()
+        self.check_managers()
+
+        while self.state == "RUNNING":
+            time.sleep(60)
+            for manager in self.managers:
+                if self.state == "RUNNING":
+                    manager.update_stats()
+            self.check_managers()
         logger.info("main thread exiting")
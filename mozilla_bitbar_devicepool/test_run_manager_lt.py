@@ -8,7 +8,6 @@ import logging
 import multiprocessing  # Add import for multiprocessing.Manager
 import os
 import pprint
-import random
 import shutil
 import signal
 import subprocess
@@ -20,11 +19,19 @@ import sentry_sdk
 
 # run fist to set logging on everything
 # rest
-from mozilla_bitbar_devicepool import configuration_lt, logging_setup, taskcluster_client
+from mozilla_bitbar_devicepool import configuration_lt, logging_setup, sentry_setup, taskcluster_client
 from mozilla_bitbar_devicepool.lambdatest import job_config, status
+from mozilla_bitbar_devicepool.lambdatest.device_reliability import DeviceReliability
+from mozilla_bitbar_devicepool.lambdatest.device_selector import DeviceSelector
+from mozilla_bitbar_devicepool.lambdatest.flight_recorder import DEFAULT_FLIGHT_RECORDER_DUMP, FlightRecorder
 from mozilla_bitbar_devicepool.lambdatest.job_tracker import JobTracker
+from mozilla_bitbar_devicepool.lambdatest.utilization_history import (
+    DEFAULT_UTILIZATION_HISTORY,
+    GLOBAL_SERIES,
+    UtilizationHistory,
+)
 from mozilla_bitbar_devicepool.taskcluster_client import get_taskcluster_pending_tasks
-from mozilla_bitbar_devicepool.util import misc
+from mozilla_bitbar_devicepool.util import metrics, misc, timing
 
 # TODO: add a semaphore file that makes that turns on --debug mode
 #    - main should check for the file every cycle and set the debug flag
@@ -58,14 +65,22 @@ class TestRunManagerLT(object):
     JOB_STARTER_THREAD_NAME = "JS"
     REPORTER_THREAD_NAME = "Reporter"
     CLEANER_THREAD_NAME = "Cleaner"
+    CONFIG_WATCHER_THREAD_NAME = "Config"
 
     # Threading constants
     TC_MONITOR_INTERVAL = 30  # seconds
     LT_MONITOR_INTERVAL = 30  # seconds
     JOB_STARTER_INTERVAL = 10  # seconds
+    # how long sync_job_starters() waits for a stopping job starter before starting its replacement
+    JOB_STARTER_STOP_TIMEOUT = 15  # seconds
     SENTRY_INTERVAL = 30  # seconds
     CLEANER_INTERVAL = 10 * 60  # seconds
-    # Debug constants - set higher log levels for specific areas
+    CONFIG_WATCH_INTERVAL = 15  # seconds
+    TIMING_SUMMARY_INTERVAL = 10 * 60  # seconds
+    # pick the devices with the least busy time first, instead of the least recently launched
+    DEVICE_SELECTION_USE_BUSY_TIME = False
+    # Debug areas - detailed DEBUG logging for specific areas, see debug_areas of __init__()
+    DEBUG_AREAS = ("job_starter", "device_selection", "job_calculation")
     DEBUG_JOB_STARTER = True  # Enable detailed debugging for job starter
     DEBUG_DEVICE_SELECTION = True  # Enable detailed debugging for device selection
     DEBUG_JOB_CALCULATION = True  # Enable detailed debugging for job calculation
@@ -99,13 +114,33 @@ class TestRunManagerLT(object):
         no_job_sleep=60,
         debug_mode=False,
         unit_testing_mode=False,
+        utilization_history_path=DEFAULT_UTILIZATION_HISTORY,
+        metrics_port=None,
+        flight_recorder_path=DEFAULT_FLIGHT_RECORDER_DUMP,
+        debug_areas=None,
     ):
         self.interrupt_signal_count = 0
+        # the DEBUG_AREAS to log in detail at DEBUG, all of them by default
+        if debug_areas is not None:
+            unknown_areas = set(debug_areas) - set(self.DEBUG_AREAS)
+            if unknown_areas:
+                raise ValueError(f"Unknown debug areas: {', '.join(sorted(unknown_areas))}")
+            self.DEBUG_JOB_STARTER = "job_starter" in debug_areas
+            self.DEBUG_DEVICE_SELECTION = "device_selection" in debug_areas
+            self.DEBUG_JOB_CALCULATION = "job_calculation" in debug_areas
         self.exit_wait = exit_wait
         self.no_job_sleep = no_job_sleep
         self.max_jobs_to_start = max_jobs_to_start
         self.debug_mode = debug_mode
         self.unit_testing_mode = unit_testing_mode
+        # utilization history written by the reporter thread, see lt_utilization
+        self.utilization_history_path = utilization_history_path
+        # series the utilization history has no room for, warned about once
+        self.utilization_dropped_series = set()
+        # serve the metrics on this local port, see _create_metrics()
+        self.metrics_port = metrics_port
+        # the flight recorder is dumped here on SIGUSR1, see handle_signal()
+        self.flight_recorder_path = flight_recorder_path
         self.logging_padding = 12  # Store the padding value as instance variable
         # Skip hyperexecute binary check in unit testing mode or when running tests
         self.config_object = configuration_lt.ConfigurationLt(ci_mode_envvars=self.unit_testing_mode)
@@ -119,13 +154,17 @@ class TestRunManagerLT(object):
         # TODO: this in not thread-safe per-se, but only one thread will be using it (JS per project)
         # Replace single job_tracker with a dictionary of job trackers per project
         self.job_trackers = {}
-        # Initialize job trackers for each project in config
-        # TODO: configuration lt call to get projects?
-        for project_name in self.config_object.config.get("projects", {}):
-            self.job_trackers[project_name] = self.get_job_tracker(project_name)
+        # device scores from finished jobs, written by the LT monitor thread and read by the job starters
+        self.device_reliability = DeviceReliability()
+        # per project, least recently launched devices first, see get_device_selector()
+        self.device_selectors = {}
+        # the last job starter decisions of each project, see lambdatest/flight_recorder.py
+        self.flight_recorder = FlightRecorder()
 
         # Create a multiprocessing Manager for thread-safe shared data
         manager = multiprocessing.Manager()
+        # kept to add the shared data of projects added by a config reload, see _add_project_state()
+        self.shared_data_manager = manager
         self.shared_data = manager.dict()
 
         # Initialize shared data structure - Moved all initialization here
@@ -135,28 +174,40 @@ class TestRunManagerLT(object):
         self.shared_data[self.SHARED_LT_G_BUSY_DEVICES] = 0
         self.shared_data[self.SHARED_SESSION_STARTED_JOBS] = 0
         # Initialize projects dictionary as a nested Manager dict
-        projects_dict = manager.dict()
-
-        # Initialize project-specific data for all projects defined in config
-        for project_name, _project_config in self.config_object.config.get("projects", {}).items():
-            project_data = manager.dict()
-            project_data[self.PROJECT_TC_JOB_COUNT] = 0
-            project_data[self.PROJECT_LT_ACTIVE_DEVICE_COUNT] = 0
-            project_data[self.PROJECT_LT_BUSY_DEVICE_COUNT] = 0
-            project_data[self.PROJECT_LT_CLEANUP_DEVICE_COUNT] = 0
-            project_data[self.PROJECT_LT_ACTIVE_DEVICES] = manager.list()  # Use managed list
-            projects_dict[project_name] = project_data
+        self.shared_data[self.SHARED_PROJECTS] = manager.dict()
 
-        self.shared_data[self.SHARED_PROJECTS] = projects_dict
+        # Initialize job trackers and project-specific data for all projects defined in config
+        for project_name in self.config_object.config.get("projects", {}):
+            self._add_project_state(project_name)
 
         # No need for a lock with Manager objects
         self.shutdown_event = threading.Event()
-
+        # project name -> (job starter thread, stop event), see sync_job_starters()
+        self.job_starters = {}
+        # set when a job starter couldn't be restarted yet, the config watcher retries
+        self.job_starters_out_of_sync = False
+        # project name -> decision values of the last job starter cycle, for the metrics
+        #   - replaced as a whole by the project's job starter, no lock needed
+        self.job_starter_stats = {}
+        self.metrics = self._create_metrics()
+        # thread name -> LoopTimer, see get_loop_timer()
+        self.loop_timers = {}
+
+        signal.signal(signal.SIGUSR1, self.handle_signal)
         signal.signal(signal.SIGUSR2, self.handle_signal)
         signal.signal(signal.SIGINT, self.handle_signal)
 
     def handle_signal(self, signalnum, frame):
         MAX_SIGNAL_COUNT = 3
+        FORCED_EXIT_LOG_TIMEOUT = 2  # seconds
+
+        if signalnum == signal.SIGUSR1:
+            try:
+                path = self.flight_recorder.dump(self.flight_recorder_path)
+                logging.info(f" handle_signal: Dumped the flight recorder to {path}")
+            except OSError as e:
+                logging.warning(f" handle_signal: Unable to dump the flight recorder: {e}")
+            return
 
         if signalnum == signal.SIGINT or signalnum == signal.SIGUSR2:
             # track how many times we've received the signal. at 3, exit immediately.
@@ -169,9 +220,130 @@ class TestRunManagerLT(object):
                 self.shutdown_event.set()  # Signal threads to stop
             else:
                 logging.info(f" handle_signal: received signal {MAX_SIGNAL_COUNT} times, exiting immediately")
+                # os._exit() skips atexit, write the queued log records first. don't wait
+                # long, stderr may be what is stuck.
+                logging_setup.stop_logging(timeout=FORCED_EXIT_LOG_TIMEOUT)
                 # Force exit if threads don't stop quickly
                 os._exit(1)  # Use os._exit for immediate termination
 
+    def _add_project_state(self, project_name):
+        """Create the job tracker and shared data of a project if it doesn't have them yet."""
+        self.get_job_tracker(project_name)
+        self.get_device_selector(project_name)
+        projects_dict = self.shared_data[self.SHARED_PROJECTS]
+        if project_name in projects_dict:
+            return
+        project_data = self.shared_data_manager.dict()
+        project_data[self.PROJECT_TC_JOB_COUNT] = 0
+        project_data[self.PROJECT_LT_ACTIVE_DEVICE_COUNT] = 0
+        project_data[self.PROJECT_LT_BUSY_DEVICE_COUNT] = 0
+        project_data[self.PROJECT_LT_CLEANUP_DEVICE_COUNT] = 0
+        project_data[self.PROJECT_LT_ACTIVE_DEVICES] = self.shared_data_manager.list()  # Use managed list
+        projects_dict[project_name] = project_data
+
+    # Config reloading
+
+    def apply_config(self, new_config_object):
+        """
+        Swaps a new configuration into the running manager.
+
+        The new configuration must be fully configured (see ConfigurationLt.reload()).
+        State for added projects is created before the swap, so threads never see a
+        project without it. The swap is a single assignment: each thread reads
+        self.config_object once per cycle and sees either the old or the new
+        configuration. Job starter threads are then started and stopped to match.
+
+        Returns:
+            tuple: (started, stopped) lists of project names.
+        """
+        for project_name in new_config_object.config.get("projects", {}):
+            self._add_project_state(project_name)
+        self.config_object = new_config_object
+        return self.sync_job_starters()
+
+    def sync_job_starters(self):
+        """
+        Starts a job starter thread for each fully configured, enabled project without a
+        running one, and stops the threads of the other projects.
+
+        Returns:
+            tuple: (started, stopped) lists of project names.
+        """
+        logging_header = f"[ {'Main':<{self.logging_padding}} ]"
+        config_object = self.config_object
+        wanted_projects = set()
+        for project_name in config_object.get_fully_configured_projects():
+            if config_object.is_project_disabled(project_name):
+                logging.info(f"{logging_header} Project '{project_name}' is disabled. Skipping Job Starter thread.")
+                continue
+            wanted_projects.add(project_name)
+
+        started = []
+        stopped = []
+        for project_name in sorted(self.job_starters):
+            job_starter, stop_event = self.job_starters[project_name]
+            if project_name not in wanted_projects and not stop_event.is_set():
+                stop_event.set()
+                stopped.append(project_name)
+                logging.info(f"{logging_header} Stopping Job Starter thread '{job_starter.name}'.")
+        self.job_starters_out_of_sync = False
+        for project_name in sorted(wanted_projects):
+            if project_name in self.job_starters:
+                job_starter, stop_event = self.job_starters[project_name]
+                if job_starter.is_alive() and not stop_event.is_set():
+                    continue
+                # re-enabled while its stopped thread finishes a cycle, only one starter per
+                # project may run (the job tracker and device selector have a single writer)
+                job_starter.join(timeout=self.JOB_STARTER_STOP_TIMEOUT)
+                if job_starter.is_alive():
+                    logging.warning(
+                        f"{logging_header} Job Starter thread '{job_starter.name}' is still stopping, "
+                        "will start its replacement later."
+                    )
+                    self.job_starters_out_of_sync = True
+                    continue
+            thread_name = f"{self.JOB_STARTER_THREAD_NAME} {project_name}"
+            stop_event = threading.Event()
+            job_starter = threading.Thread(
+                target=self._job_starter_thread, args=(project_name, stop_event), name=thread_name
+            )
+            self.job_starters[project_name] = (job_starter, stop_event)
+            job_starter.start()
+            started.append(project_name)
+            logging.info(f"{logging_header} Started Job Starter thread '{thread_name}'.")
+        return started, stopped
+
+    def _config_watcher_thread(self):
+        """Reloads the config file when its mtime changes, see apply_config()."""
+        logging_header = self.format_logging_header(self.CONFIG_WATCHER_THREAD_NAME)
+        # mtime of a file that failed to load, so it is only reported once
+        failed_mtime = None
+
+        while not self.shutdown_event.wait(self.CONFIG_WATCH_INTERVAL):
+            if self.job_starters_out_of_sync:
+                started, _stopped = self.sync_job_starters()
+                if started:
+                    logging.info(f"{logging_header} Started: {', '.join(started)}.")
+            config_object = self.config_object
+            if not config_object.has_config_file_changed():
+                continue
+            mtime = config_object.get_config_file_mtime()
+            if mtime == failed_mtime:
+                continue
+            try:
+                new_config_object = config_object.reload()
+            except Exception as e:
+                failed_mtime = mtime
+                logging.warning(f"{logging_header} Not applying changed config, it is invalid: {e}")
+                continue
+            failed_mtime = None
+            started, stopped = self.apply_config(new_config_object)
+            logging.info(
+                f"{logging_header} Reloaded {new_config_object.config_path}. "
+                f"Started: {', '.join(started) or 'none'}, stopped: {', '.join(stopped) or 'none'}."
+            )
+        logging.info(f"{logging_header} Thread stopped.")
+
     # Helper methods for project-specific job trackers
 
     def get_job_tracker(self, project_name):
@@ -180,6 +352,26 @@ class TestRunManagerLT(object):
             self.job_trackers[project_name] = JobTracker(expiry_seconds=self.JOB_TRACKER_EXPIRY_SECONDS)
         return self.job_trackers[project_name]
 
+    def get_loop_timer(self, thread_name, phases):
+        """Get the loop timer of a thread (see util/timing.py), creating it if it doesn't exist."""
+        if thread_name not in self.loop_timers:
+            self.loop_timers[thread_name] = timing.LoopTimer(thread_name, phases)
+        return self.loop_timers[thread_name]
+
+    def get_loop_timings(self):
+        """Returns {thread name: {phase: timing statistics}} of all loop timers, for debug dumps."""
+        return {thread_name: timer.snapshot() for thread_name, timer in sorted(list(self.loop_timers.items()))}
+
+    def get_loop_timing_summaries(self):
+        """Returns a one line summary of each loop timer."""
+        return [timer.summary() for _thread_name, timer in sorted(list(self.loop_timers.items()))]
+
+    def get_device_selector(self, project_name):
+        """Get the device selector for a specific project, creating it if it doesn't exist."""
+        if project_name not in self.device_selectors:
+            self.device_selectors[project_name] = DeviceSelector(use_busy_time=self.DEVICE_SELECTION_USE_BUSY_TIME)
+        return self.device_selectors[project_name]
+
     def add_jobs_to_tracker(self, project_name, udids):
         """Add jobs to the specified project tracker."""
         if project_name in self.job_trackers:
@@ -202,31 +394,39 @@ class TestRunManagerLT(object):
         tcci = taskcluster_client.TaskclusterClient(verbose=False)
         # define at this level, but updated inside loop below
         total_quarantined_devices = 0
+        timer = self.get_loop_timer(self.TC_THREAD_NAME, ["fetch", "update"])
 
         while not self.shutdown_event.is_set():
+            timer.start()
+            # sampled by sentry_setup.ErrorBoostedSampler, a no-op when not sampled
+            transaction = sentry_sdk.start_transaction(op="poll", name="taskcluster monitor")
             worker_type_to_count_dict = {}
             total_quarantined_devices = 0
             # do TC things for each project
             for project_name, project_config in self.config_object.config["projects"].items():
-                start_time = time.time()
                 if not self.config_object.is_project_fully_configured(project_name):
                     # logging.warning(f"{logging_header} Project '{project_name}' is not fully configured. Skipping.")
                     continue
                 # update the pending job count for the project
                 try:
                     tc_worker_type = project_config.get("TC_WORKER_TYPE")
-                    tc_job_count = get_taskcluster_pending_tasks("proj-autophone", tc_worker_type, verbose=False)
+                    with transaction.start_child(op="http.client", name=f"pending tasks {tc_worker_type}"):
+                        tc_job_count = get_taskcluster_pending_tasks("proj-autophone", tc_worker_type, verbose=False)
+                    timer.mark("fetch")
                     worker_type_to_count_dict[tc_worker_type] = tc_job_count
 
                     # Update shared data without lock
                     if project_name in self.shared_data[self.SHARED_PROJECTS]:
                         self.shared_data[self.SHARED_PROJECTS][project_name][self.PROJECT_TC_JOB_COUNT] = tc_job_count
+                    timer.mark("update")
                 except Exception as e:
                     logging.warning(f"{logging_header} Error fetching TC tasks for {project_name}: {e}", exc_info=True)
 
                 # fetch the quarantined workers and update the shared data structure
                 try:
-                    quarantined_workers = tcci.get_quarantined_worker_names("proj-autophone", tc_worker_type)
+                    with transaction.start_child(op="http.client", name=f"quarantined workers {tc_worker_type}"):
+                        quarantined_workers = tcci.get_quarantined_worker_names("proj-autophone", tc_worker_type)
+                    timer.mark("fetch")
                     self.shared_data[self.SHARED_PROJECTS][project_name][self.PROJECT_TC_QUARANTINED_WORKERS] = (
                         quarantined_workers
                     )
@@ -234,13 +434,16 @@ class TestRunManagerLT(object):
                         len(quarantined_workers)
                     )
                     total_quarantined_devices += len(quarantined_workers)
+                    timer.mark("update")
                     # logging.debug(pprint.pformat(quarantined_workers))
                 except Exception as e:
                     logging.warning(
                         f"{logging_header} Error fetching quarantined workers for {project_name}: {e}", exc_info=True
                     )
-            end_time = time.time()
-            elapsed_time = end_time - start_time
+            # all projects (the start time used to be reset for each project)
+            elapsed_time = timer.stop() / 1e9
+            transaction.finish()
+            self.monitor_loop_seconds.labels(self.TC_THREAD_NAME).observe(elapsed_time)
 
             # format queue count message
             elapsed_time_str = f"{elapsed_time:.1f}s"
@@ -278,10 +481,16 @@ class TestRunManagerLT(object):
             "cleanup_devices": 0,
         }
 
+        timer = self.get_loop_timer(self.LT_THREAD_NAME, ["fetch", "parse", "partition"])
+
         while not self.shutdown_event.is_set():
+            timer.start()
+            transaction = sentry_sdk.start_transaction(op="poll", name="lambdatest monitor")
             active_device_count_by_project_dict = {}
             try:
-                device_list = self.status_object.get_device_list()
+                with transaction.start_child(op="http.client", name="device list"):
+                    device_list = self.status_object.get_device_list()
+                timer.mark("fetch")
 
                 # Reset global utilization counts for this cycle
                 local_device_stats["total_devices"] = 0
@@ -291,7 +500,14 @@ class TestRunManagerLT(object):
 
                 try:
                     # Use status_object to get jobs list
-                    jobs_summary = self.status_object.get_job_summary()
+                    with transaction.start_child(op="http.client", name="jobs"):
+                        jobs = self.status_object.get_jobs()["data"]
+                    timer.mark("fetch")
+                    jobs_summary = {}
+                    for job in jobs:
+                        jobs_summary[job["status"]] = jobs_summary.get(job["status"], 0) + 1
+                    # feed the finished jobs to the device scores used by the job starters
+                    self.device_reliability.record_jobs(jobs)
 
                     # Count initiated jobs
                     initiated_jobs_count = 0
@@ -301,8 +517,7 @@ class TestRunManagerLT(object):
 
                     # Add more detailed breakdown of job states
                     if self.DEBUG_JOB_CALCULATION:
-                        job_states_str = ", ".join([f"{state}: {count}" for state, count in jobs_summary.items()])
-                        logging.debug(f"{logging_header} Job state counts: {job_states_str}")
+                        logging.debug("%s Job state counts: %s", logging_header, jobs_summary)
 
                     local_device_stats["initiated_jobs"] = initiated_jobs_count
                 except Exception as e:
@@ -328,6 +543,7 @@ class TestRunManagerLT(object):
             except Exception as e:
                 logging.warning(f"{logging_header} Error fetching device list: {e}", exc_info=True)
                 device_list = {}
+            timer.mark("parse")
 
             # Update shared data with accurate job count and device stats
             self.shared_data[self.SHARED_LT_G_INITIATED_JOBS] = local_device_stats["initiated_jobs"]
@@ -346,6 +562,7 @@ class TestRunManagerLT(object):
                     project_busy_devices_api = 0
                     project_cleanup_devices_api = 0
                     project_active_devices_api_list = []
+                    project_busy_devices_api_list = []
 
                     # Now iterate through all devices
                     for device_type in device_list:
@@ -361,9 +578,14 @@ class TestRunManagerLT(object):
                                     project_active_devices_api_list.append(udid)
                                 elif state == self.LT_DEVICE_STATE_BUSY:
                                     project_busy_devices_api += 1
+                                    project_busy_devices_api_list.append(udid)
                                 elif state == self.LT_DEVICE_STATE_CLEANUP:
                                     project_cleanup_devices_api += 1
 
+                    # sampled once per cycle, see DEVICE_SELECTION_USE_BUSY_TIME
+                    self.get_device_selector(project_name).add_busy_time(
+                        project_busy_devices_api_list, self.LT_MONITOR_INTERVAL
+                    )
                     active_device_count_by_project_dict[project_name] = project_active_device_count_api
 
                     # Update shared data for the project
@@ -378,12 +600,17 @@ class TestRunManagerLT(object):
                     shared_active_devices_list.extend(project_active_devices_api_list)  # Update with new data from API
 
                     # Log the available device list after updating for debugging
+                    #   - lazy and from the local list, reading the shared list is a round trip to the manager
                     logging.debug(
-                        f"{logging_header} Updated API active devices for {project_name}: {list(shared_active_devices_list)}"
+                        "%s Updated API active devices for %s: %s",
+                        logging_header,
+                        project_name,
+                        project_active_devices_api_list,
                     )
 
                 except Exception as e:
                     logging.warning(f"{logging_header} Error processing devices for {project_name}: {e}", exc_info=True)
+            timer.mark("partition")
 
             # Log global device utilization statistics
             global_total_device_count = self.config_object.get_total_device_count()
@@ -395,26 +622,57 @@ class TestRunManagerLT(object):
             total_active_count = sum(active_device_count_by_project_dict.values())
             per_queue_string = f"Active device counts ({total_active_count}): {formatted_active_device_count}"
             logging.info(f"{logging_header} {per_queue_string}")
+            self.monitor_loop_seconds.labels(self.LT_THREAD_NAME).observe(timer.stop() / 1e9)
+            transaction.finish()
 
             # normal thread sleep
             self.shutdown_event.wait(self.LT_MONITOR_INTERVAL)
 
         logging.info(f"{logging_header} Thread stopped.")
 
-    def _job_starter_thread(self, project_name):
-        """Starts jobs based on monitored data for a specific project."""
+    def _wait_for_job_starter_stop(self, stop_event, seconds):
+        """
+        Sleeps up to seconds, waking up early on shutdown or when stop_event is set.
+
+        Returns:
+            bool: True if the job starter should stop.
+        """
+        deadline = time.monotonic() + seconds
+        while not self.shutdown_event.is_set() and not stop_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            # shutdown_event is checked at least every second
+            stop_event.wait(min(remaining, 1))
+        return True
+
+    def _job_starter_thread(self, project_name, stop_event=None):
+        """Starts jobs based on monitored data for a specific project.
+
+        Runs until shutdown or until stop_event is set (see sync_job_starters()).
+        """
         logging_header = self.format_logging_header(f"{self.JOB_STARTER_THREAD_NAME} {project_name}")
+        if stop_event is None:
+            stop_event = threading.Event()
 
         project_source_dir = os.path.dirname(os.path.realpath(__file__))
         project_root_dir = os.path.abspath(os.path.join(project_source_dir, ".."))
-        user_script_golden_dir = self.config_object.get_path_to_user_script_directory(project_name)
+        timer = self.get_loop_timer(
+            f"{self.JOB_STARTER_THREAD_NAME} {project_name}", ["partition", "decision", "staging", "spawn"]
+        )
 
-        current_project = self.config_object.config["projects"][project_name]
-        tc_worker_type = current_project["TC_WORKER_TYPE"]
-        tc_client_id = current_project["TASKCLUSTER_CLIENT_ID"]
-        tc_client_key = current_project["TASKCLUSTER_ACCESS_TOKEN"]
+        while not self.shutdown_event.is_set() and not stop_event.is_set():
+            timer.start()
+            # read the configuration once per cycle, it may be swapped by a reload
+            config_object = self.config_object
+            if project_name not in config_object.config["projects"]:
+                break
+            user_script_golden_dir = config_object.get_path_to_user_script_directory(project_name)
+            current_project = config_object.config["projects"][project_name]
+            tc_worker_type = current_project["TC_WORKER_TYPE"]
+            tc_client_id = current_project["TASKCLUSTER_CLIENT_ID"]
+            tc_client_key = current_project["TASKCLUSTER_ACCESS_TOKEN"]
 
-        while not self.shutdown_event.is_set():
             tc_job_count = 0
             project_active_device_count_api = 0
             project_active_devices_api_list = []
@@ -430,9 +688,6 @@ class TestRunManagerLT(object):
             project_quarantined_workers = project_data.get(self.PROJECT_TC_QUARANTINED_WORKERS, [])
             # Make a copy of the list from shared data
             project_active_devices_api_list = list(project_data.get(self.PROJECT_LT_ACTIVE_DEVICES, []))
-            # ensure no device hotspots via shuffle
-            #   - it seems the api does return in a consistent order unfortunately
-            random.shuffle(project_active_devices_api_list)
 
             # Get count of recently started jobs (and their UDIDs) from the project-specific job tracker
             job_tracker = self.get_job_tracker(project_name)
@@ -456,20 +711,37 @@ class TestRunManagerLT(object):
                     available_devices_for_job_start.remove(udid)
                     devices_removed_for_quarantine_count += 1
                     devices_removed_for_quarantine.append(udid)
-            available_devices_for_job_start_count = len(available_devices_for_job_start)
             if devices_removed_for_quarantine_count > 0:
                 logging.debug(
-                    f"{logging_header} Removed {devices_removed_for_quarantine_count} quarantined devices from available list ({', '.join(devices_removed_for_quarantine)})"
+                    "%s Removed %s quarantined devices from available list %s",
+                    logging_header,
+                    devices_removed_for_quarantine_count,
+                    devices_removed_for_quarantine,
+                )
+            # devices failing repeatedly are backed off
+            available_devices_for_job_start, devices_backed_off = self.device_reliability.partition_devices(
+                available_devices_for_job_start
+            )
+            if devices_backed_off:
+                logging.debug(
+                    "%s Removed %s backed off devices from available list %s",
+                    logging_header,
+                    len(devices_backed_off),
+                    devices_backed_off,
                 )
+            available_devices_for_job_start_count = len(available_devices_for_job_start)
+            timer.mark("partition")
 
             # Debug logging for job tracker and available devices calculation
             if self.DEBUG_JOB_STARTER or self.DEBUG_DEVICE_SELECTION:
                 logging.debug(
-                    f"{logging_header} Job tracker has {recently_started_jobs_count} active jobs "
-                    f"for devices: {job_tracker_active_udids if job_tracker_active_udids else 'none'}"
+                    "%s Job tracker has %s active jobs for devices: %s",
+                    logging_header,
+                    recently_started_jobs_count,
+                    job_tracker_active_udids or "none",
                 )
-                logging.debug(f"{logging_header} API Active Devices: {project_active_devices_api_list}")
-                logging.debug(f"{logging_header} Available for Job Start: {available_devices_for_job_start}")
+                logging.debug("%s API Active Devices: %s", logging_header, project_active_devices_api_list)
+                logging.debug("%s Available for Job Start: %s", logging_header, available_devices_for_job_start)
 
             # Warn if the API count and the list length from shared data don't match (indicates potential sync issue)
             if project_active_device_count_api != len(project_active_devices_api_list):
@@ -483,20 +755,52 @@ class TestRunManagerLT(object):
             # Debug log with all key variables for easier debugging
             if self.DEBUG_JOB_STARTER:
                 logging.debug(
-                    f"{logging_header} Decision variables: TC Jobs:{tc_job_count}, "
-                    f"API Active LT Devs:{project_active_device_count_api}, "
-                    f"Available for Start:{available_devices_for_job_start_count}, "
-                    f"Device UDIDs (Available):{available_devices_for_job_start}"
+                    "%s Decision variables: TC Jobs:%s, API Active LT Devs:%s, Available for Start:%s, "
+                    "Device UDIDs (Available):%s",
+                    logging_header,
+                    tc_job_count,
+                    project_active_device_count_api,
+                    available_devices_for_job_start_count,
+                    available_devices_for_job_start,
                 )
 
+            # read once (a round trip to the manager), the decision and its record use the same value
+            global_initiated_jobs = self.shared_data[self.SHARED_LT_G_INITIATED_JOBS]
             jobs_to_start = self.calculate_jobs_to_start(
                 tc_jobs_not_handled,
                 available_devices_for_job_start_count,
-                self.shared_data[self.SHARED_LT_G_INITIATED_JOBS],
+                global_initiated_jobs,
             )
             jobs_to_start = max(0, jobs_to_start)
+            timer.mark("decision")
+
+            # the launch fields are set below if jobs are started
+            flight_record = self.flight_recorder.record(
+                project_name,
+                tc_jobs=tc_job_count,
+                recently_started=recently_started_jobs_count,
+                need_handling=tc_jobs_not_handled,
+                global_initiated=global_initiated_jobs,
+                api_active_devices=project_active_devices_api_list,
+                tracked_devices=sorted(job_tracker_active_udids),
+                quarantine_removed=devices_removed_for_quarantine,
+                backed_off_removed=devices_backed_off,
+                available_devices=available_devices_for_job_start,
+                jobs_to_start=jobs_to_start,
+                selected_devices=[],
+                launched_devices=[],
+                failed_devices=[],
+            )
+
+            self.job_starter_stats[project_name] = {
+                "recently_started": recently_started_jobs_count,
+                "need_handling": tc_jobs_not_handled,
+                "available_devices": available_devices_for_job_start_count,
+                "backed_off_devices": len(devices_backed_off),
+                "jobs_to_start": jobs_to_start,
+            }
 
-            lt_blob_p1 = f"{len(self.config_object.config['device_groups'][project_name])}/{project_active_device_count_api}/{project_busy_devices_api}/{project_cleanup_devices_api}"
+            lt_blob_p1 = f"{len(config_object.config['device_groups'][project_name])}/{project_active_device_count_api}/{project_busy_devices_api}/{project_cleanup_devices_api}"
             lt_blob = f"LT Devs Config/Active/Busy/Cleanup: {lt_blob_p1:>11}"
 
             # Add global initiated jobs count to the log for better visibility
@@ -509,33 +813,45 @@ class TestRunManagerLT(object):
             )
 
             if jobs_to_start > 0:
+                # only the loops that launch jobs are traced, the others just read shared data
+                transaction = sentry_sdk.start_transaction(op="job_starter", name=f"launch jobs {project_name}")
+                transaction.set_data("jobs_to_start", jobs_to_start)
                 # TODO: not used any longer, remove eventually
                 lt_app_url = "lt://proverbial-android"  # Eternal APK
 
                 cmd_env = os.environ.copy()
-                cmd_env["LT_USERNAME"] = self.config_object.lt_username
-                cmd_env["LT_ACCESS_KEY"] = self.config_object.lt_access_key
+                cmd_env["LT_USERNAME"] = config_object.lt_username
+                cmd_env["LT_ACCESS_KEY"] = config_object.lt_access_key
 
                 processes_started = 0
                 assigned_device_udids = []
+                job_launch_seconds = self.job_launch_seconds.labels(project_name)
+                jobs_launched = self.jobs_launched.labels(project_name)
 
-                # Create a mutable copy to iterate and modify for selection
-                devices_to_assign_from = list(available_devices_for_job_start)
+                # most reliable devices first, then least recently launched
+                #   - spreads the work, the api returns devices in a consistent order
+                devices_to_assign_from = self.get_device_selector(project_name).pick(
+                    available_devices_for_job_start, jobs_to_start, rank=self.device_reliability.get_rank
+                )
+                flight_record["selected_devices"] = list(devices_to_assign_from)
+                launched_device_udids = []
+                failed_device_udids = []
+                timer.mark("decision")
 
                 for i in range(jobs_to_start):
-                    if self.shutdown_event.is_set():
+                    if self.shutdown_event.is_set() or stop_event.is_set():
                         logging.info(f"{logging_header} Shutdown signaled during job starting loop.")
                         break
 
                     # Get next available device that hasn't been assigned yet in this loop
                     device_udid = None
                     if devices_to_assign_from:
-                        # Simple selection: take the first one
+                        # take the next one (see DeviceSelector.pick())
                         device_udid = devices_to_assign_from.pop(0)
 
                         # Debug device selection process
                         if self.DEBUG_DEVICE_SELECTION:
-                            logging.debug(f"{logging_header} Selecting device {device_udid} for job {i + 1}")
+                            logging.debug("%s Selecting device %s for job %s", logging_header, device_udid, i + 1)
 
                         # add the udid to labels
                         labels_csv = f"{self.PROGRAM_LABEL},{project_name},{device_udid}"
@@ -551,10 +867,12 @@ class TestRunManagerLT(object):
                         )
                         break  # Exit the loop if no more devices are available
 
+                    launch_start = time.perf_counter()
                     test_run_dir = f"/tmp/mozilla-lt-devicepool-job-dir.{project_name}.{time.time_ns()}"  # Project-specific unique dir
                     test_run_file = os.path.join(test_run_dir, "hyperexecute.yaml")
 
                     try:
+                        staging_span = transaction.start_child(op="job.staging", name=device_udid)
                         # Setup job directory
                         shutil.rmtree(test_run_dir, ignore_errors=True)
                         os.makedirs(test_run_dir, exist_ok=True)
@@ -575,10 +893,13 @@ class TestRunManagerLT(object):
                             user_script_dir=user_script_golden_dir,
                             path=test_run_file,
                         )
+                        staging_span.finish()
+                        timer.mark("staging")
 
                         if self.debug_mode:
                             # Simulate tiny delay if in debug mode
-                            self.shutdown_event.wait(0.1)
+                            self._wait_for_job_starter_stop(stop_event, 0.1)
+                            timer.skip()
                         else:
                             # Check if hyperexecute exists before executing
                             hyperexecute_path = os.path.join(project_root_dir, "hyperexecute")
@@ -591,44 +912,56 @@ class TestRunManagerLT(object):
                                     #   - hyperexecute yaml errors can be hidden...
 
                                     # Start process in background
-                                    _process = subprocess.Popen(
-                                        base_command_string,
-                                        shell=True,
-                                        env=cmd_env,
-                                        cwd=test_run_dir,
-                                        start_new_session=True,
-                                        stdout=subprocess.DEVNULL,  # Discard output for background tasks
-                                        stderr=subprocess.DEVNULL,
-                                    )
+                                    with transaction.start_child(op="subprocess", name="hyperexecute"):
+                                        _process = subprocess.Popen(
+                                            base_command_string,
+                                            shell=True,
+                                            env=cmd_env,
+                                            cwd=test_run_dir,
+                                            start_new_session=True,
+                                            stdout=subprocess.DEVNULL,  # Discard output for background tasks
+                                            stderr=subprocess.DEVNULL,
+                                        )
+                                    timer.mark("spawn")
+                                    job_launch_seconds.observe(time.perf_counter() - launch_start)
                                     # Add a small delay between job launches to avoid race conditions
                                     #   - when multiple jobs run at once and decide to update.
                                     #   - lots of jobs being started at once can swamp USB.
                                     # TODO: if USB issues are resolved, remove this sleep and potentially run with
                                     #     `--disable-updates` option, and then have main thread run without the option occasionally
                                     #     to update (with locking)
-                                    self.shutdown_event.wait(2)
+                                    self._wait_for_job_starter_stop(stop_event, 2)
+                                    timer.skip()
                                     break
                                 else:
                                     logging.warning(
                                         f"{logging_header} hyperexecute binary not found or not executable, retry {retry_count + 1}/{max_retry}"
                                     )
                                     # Wait for 2 seconds before retrying
-                                    self.shutdown_event.wait(2)
+                                    self._wait_for_job_starter_stop(stop_event, 2)
+                                    timer.skip()
                                     retry_count += 1
 
                             if retry_count >= max_retry:
                                 raise FileNotFoundError(f"hyperexecute binary not found after {max_retry} retries")
 
                         processes_started += 1
+                        launched_device_udids.append(device_udid)
+                        jobs_launched.inc()
                         self.shared_data[self.SHARED_SESSION_STARTED_JOBS] += 1
 
                     except Exception as e:
                         logging.warning(f"{logging_header} Error starting job {i + 1}: {e}", exc_info=True)
                         shutil.rmtree(test_run_dir, ignore_errors=True)
+                        failed_device_udids.append(device_udid)
+
+                flight_record["launched_devices"] = launched_device_udids
+                flight_record["failed_devices"] = failed_device_udids
 
                 if processes_started > 0 and not self.debug_mode:
                     # Pass the collected UDIDs when adding jobs to the tracker
                     self.add_jobs_to_tracker(project_name, assigned_device_udids)
+                    self.get_device_selector(project_name).record_launches(launched_device_udids)
 
                 # print a summary of number of jobs started and the udids
                 if processes_started > 0:
@@ -651,17 +984,27 @@ class TestRunManagerLT(object):
                 #    we can get some more jobs launched before the next LT_UPDATE
                 #
                 # update: not needed, but we end up launching jobs too quickly without it
-                self.shutdown_event.wait(self.LT_MONITOR_INTERVAL)
+                timer.stop()
+                transaction.set_data("processes_started", processes_started)
+                transaction.finish()
+                self._wait_for_job_starter_stop(stop_event, self.LT_MONITOR_INTERVAL)
             else:
                 # If no jobs to start but there are TC jobs and available devices, log debug info
                 if tc_job_count > 0 and available_devices_for_job_start_count > 0:
                     logging.debug(
-                        f"{logging_header} Not starting jobs despite TC jobs ({tc_job_count}) and available devices ({available_devices_for_job_start_count}). "
-                        f"Check: Recently Started={recently_started_jobs_count}, Global Initiated={self.shared_data[self.SHARED_LT_G_INITIATED_JOBS]}/{self.GLOBAL_MAX_INITITATED_JOBS}"
+                        "%s Not starting jobs despite TC jobs (%s) and available devices (%s). "
+                        "Check: Recently Started=%s, Global Initiated=%s/%s",
+                        logging_header,
+                        tc_job_count,
+                        available_devices_for_job_start_count,
+                        recently_started_jobs_count,
+                        global_initiated_jobs,
+                        self.GLOBAL_MAX_INITITATED_JOBS,
                     )
+                timer.stop()
 
-            # Wait before next check or until shutdown
-            self.shutdown_event.wait(self.JOB_STARTER_INTERVAL)
+            # Wait before next check or until shutdown (or stopped by sync_job_starters())
+            self._wait_for_job_starter_stop(stop_event, self.JOB_STARTER_INTERVAL)
 
         logging.info(f"{logging_header} Thread stopped.")
 
@@ -671,12 +1014,21 @@ class TestRunManagerLT(object):
 
         logging.info(f"{logging_header} Thread starting...")
         build_good_notification_sent = False
+        utilization_history = None
+        if self.utilization_history_path:
+            try:
+                utilization_history = UtilizationHistory(self.utilization_history_path, writable=True)
+            except Exception as e:
+                logging.warning(f"{logging_header} Not recording utilization history: {e}")
 
         # wait for lt monitor thread to do initial population of data
         self.shutdown_event.wait(10)
+        timer = self.get_loop_timer(self.REPORTER_THREAD_NAME, ["collect", "record"])
+        last_timing_summary = time.monotonic()
 
         # main loop
         while not self.shutdown_event.is_set():
+            timer.start()
             # calculate global info
             global_total_device_count = self.config_object.get_total_device_count()
             global_contract_amount = self.config_object.global_contract_device_count
@@ -695,6 +1047,19 @@ class TestRunManagerLT(object):
                 f"{busy_device_count}/{self.shared_data[self.SHARED_LT_G_CLEANUP_DEVICES]}/"
                 f"{util_percent:.1f}%"
             )
+            timer.mark("collect")
+            if utilization_history:
+                try:
+                    self.record_utilization(utilization_history)
+                except Exception as e:
+                    logging.warning(f"{logging_header} Error recording utilization history: {e}", exc_info=True)
+                timer.mark("record")
+            timer.stop()
+
+            if time.monotonic() - last_timing_summary >= self.TIMING_SUMMARY_INTERVAL:
+                last_timing_summary = time.monotonic()
+                for summary in self.get_loop_timing_summaries():
+                    logging.info(f"{logging_header} Loop timings p50/p95/max ms: {summary}")
 
             # show good build notification
             # TODO: ideally this would be done once (but it will happen on each run of the binary (if it's working))
@@ -722,8 +1087,45 @@ class TestRunManagerLT(object):
                     build_good_notification_sent = True
             # normal thread sleep
             self.shutdown_event.wait(self.SENTRY_INTERVAL)
+        if utilization_history:
+            utilization_history.close()
         logging.info(f"{logging_header} Thread stopped.")
 
+    def record_utilization(self, utilization_history, now=None):
+        """Adds the current global and per-project device counters to the utilization history."""
+        config_object = self.config_object
+        projects_dict = self.shared_data[self.SHARED_PROJECTS]
+        samples = {}
+        total_tc_jobs = 0
+        for project_name in config_object.get_fully_configured_projects():
+            if project_name not in projects_dict:
+                continue
+            project_data = projects_dict[project_name]
+            tc_job_count = project_data.get(self.PROJECT_TC_JOB_COUNT, 0)
+            total_tc_jobs += tc_job_count
+            samples[project_name] = {
+                "devices": len(config_object.config["device_groups"].get(project_name) or []),
+                "active": project_data.get(self.PROJECT_LT_ACTIVE_DEVICE_COUNT, 0),
+                "busy": project_data.get(self.PROJECT_LT_BUSY_DEVICE_COUNT, 0),
+                "cleanup": project_data.get(self.PROJECT_LT_CLEANUP_DEVICE_COUNT, 0),
+                "tc_jobs": tc_job_count,
+            }
+        samples[GLOBAL_SERIES] = {
+            "devices": config_object.get_total_device_count(),
+            "contract": max(0, config_object.global_contract_device_count),
+            "active": self.shared_data[self.SHARED_LT_G_ACTIVE_DEVICES],
+            "busy": self.shared_data[self.SHARED_LT_G_BUSY_DEVICES],
+            "cleanup": self.shared_data[self.SHARED_LT_G_CLEANUP_DEVICES],
+            "tc_jobs": total_tc_jobs,
+        }
+        dropped = utilization_history.record(samples, now=now)
+        newly_dropped = [name for name in dropped if name not in self.utilization_dropped_series]
+        self.utilization_dropped_series = set(dropped)
+        if newly_dropped:
+            logging.warning(
+                f"Utilization history is full or the names are too long, not recording: {', '.join(newly_dropped)}"
+            )
+
     # cleanup thread
     def _cleanup_thread(self):
         # cleans up old hyperexecute directories
@@ -738,9 +1140,14 @@ class TestRunManagerLT(object):
 
         job_cleaner = JobCleaner()
 
+        timer = self.get_loop_timer(self.CLEANER_THREAD_NAME, ["clean"])
+
         # main loop
         while not self.shutdown_event.is_set():
+            timer.start()
             result_statistics = job_cleaner.clean_up()
+            timer.mark("clean")
+            timer.stop()
             logging.info(f"{logging_header} Removed {result_statistics['removed']} old job dirs.")
             self.shutdown_event.wait(self.CLEANER_INTERVAL)
         logging.info(f"{logging_header} Thread stopped.")
@@ -753,6 +1160,18 @@ class TestRunManagerLT(object):
 
         thread_started_count = 0
 
+        metrics_server = None
+        if self.metrics_port:
+            metrics_server = metrics.start_metrics_server(
+                self.metrics,
+                self.metrics_port,
+                debug_handlers={
+                    "/debug/timings": self.get_loop_timings,
+                    "/debug/flight-recorder": self.flight_recorder.snapshot,
+                },
+            )
+            logging.info(f"{logging_header} Serving metrics on http://127.0.0.1:{self.metrics_port}/metrics")
+
         # start TC API thread
         tc_monitor = threading.Thread(target=self._taskcluster_monitor_thread, name=self.TC_THREAD_NAME)
         tc_monitor.start()
@@ -773,22 +1192,18 @@ class TestRunManagerLT(object):
         cleanup_thread.start()
         thread_started_count += 1
         logging.info(f"{logging_header} Started {self.CLEANER_THREAD_NAME} thread.")
+        # start config watcher thread
+        config_watcher = threading.Thread(target=self._config_watcher_thread, name=self.CONFIG_WATCHER_THREAD_NAME)
+        config_watcher.start()
+        thread_started_count += 1
+        logging.info(f"{logging_header} Started {self.CONFIG_WATCHER_THREAD_NAME} thread.")
 
         # Give monitors/utility threads a moment to potentially fetch initial data
         time.sleep(2)
 
         # Create and start a job starter thread for each project
-        job_starters = []
-        for project_name in self.config_object.get_fully_configured_projects():
-            if self.config_object.is_project_disabled(project_name):
-                logging.info(f"{logging_header} Project '{project_name}' is disabled. Skipping Job Starter thread.")
-                continue
-            thread_name = f"{self.JOB_STARTER_THREAD_NAME} {project_name}"
-            job_starter = threading.Thread(target=self._job_starter_thread, args=(project_name,), name=thread_name)
-            job_starters.append(job_starter)
-            job_starter.start()
-            thread_started_count += 1
-            logging.info(f"{logging_header} Started Job Starter thread '{thread_name}'.")
+        started, _stopped = self.sync_job_starters()
+        thread_started_count += len(started)
 
         # Keep main thread alive until shutdown is signaled
         logging.info(f"{logging_header} {thread_started_count} threads started. Waiting for shutdown signal...")
@@ -798,13 +1213,18 @@ class TestRunManagerLT(object):
         # Wait for threads to finish
         tc_monitor.join(timeout=self.TC_MONITOR_INTERVAL + 5)
         lt_monitor.join(timeout=self.LT_MONITOR_INTERVAL + 5)
+        config_watcher.join(timeout=5)
 
+        # includes the threads stopped by config reloads
+        job_starters = [job_starter for job_starter, _stop_event in self.job_starters.values()]
         for i, job_starter in enumerate(job_starters):
             job_starter.join(timeout=self.JOB_STARTER_INTERVAL + 10)  # Give starter a bit more time
             if job_starter.is_alive():
                 logging.warning(f"{logging_header} Job starter thread {i} did not exit cleanly.")
 
         logging.info(f"{logging_header} All threads joined. Exiting.")
+        if metrics_server:
+            metrics_server.shutdown()
 
         # Warn if any of the JobTrackers still have active jobs
         time_required_for_all_job_trackers_expire = 0
@@ -841,6 +1261,100 @@ class TestRunManagerLT(object):
             if job_starter.is_alive():
                 logging.warning(f"{logging_header} '{job_starter.name}' did not exit cleanly.")
 
+    # Metrics
+
+    def _create_metrics(self):
+        """
+        Creates the metrics registry served on metrics_port (see util/metrics.py).
+
+        Values the threads already keep (the shared data and job_starter_stats) are read
+        when the metrics are scraped. The threads only update the launch counters and
+        the latency histograms, each child has a single writer thread.
+        """
+        registry = metrics.MetricsRegistry()
+
+        def project_values(key):
+            def callback():
+                projects_dict = self.shared_data[self.SHARED_PROJECTS]
+                return {
+                    (project_name,): projects_dict[project_name].get(key, 0) for project_name in projects_dict.keys()
+                }
+
+            return callback
+
+        def lt_device_counts():
+            values = {}
+            projects_dict = self.shared_data[self.SHARED_PROJECTS]
+            for project_name in projects_dict.keys():
+                project_data = projects_dict[project_name]
+                values[(project_name, self.LT_DEVICE_STATE_ACTIVE)] = project_data.get(
+                    self.PROJECT_LT_ACTIVE_DEVICE_COUNT, 0
+                )
+                values[(project_name, self.LT_DEVICE_STATE_BUSY)] = project_data.get(
+                    self.PROJECT_LT_BUSY_DEVICE_COUNT, 0
+                )
+                values[(project_name, self.LT_DEVICE_STATE_CLEANUP)] = project_data.get(
+                    self.PROJECT_LT_CLEANUP_DEVICE_COUNT, 0
+                )
+            return values
+
+        def job_starter_values(key):
+            def callback():
+                return {(project_name,): stats[key] for project_name, stats in list(self.job_starter_stats.items())}
+
+            return callback
+
+        registry.gauge_callback(
+            "ltdp_tc_pending_jobs", "Pending Taskcluster tasks.", ["project"], project_values(self.PROJECT_TC_JOB_COUNT)
+        )
+        registry.gauge_callback(
+            "ltdp_tc_quarantined_workers",
+            "Quarantined Taskcluster workers.",
+            ["project"],
+            project_values(self.PROJECT_TC_QUARANTINED_WORKER_COUNT),
+        )
+        registry.gauge_callback(
+            "ltdp_lt_devices", "LambdaTest devices by state.", ["project", "state"], lt_device_counts
+        )
+        registry.gauge_callback(
+            "ltdp_lt_global_devices",
+            "LambdaTest devices of all projects by state.",
+            ["state"],
+            lambda: {
+                (self.LT_DEVICE_STATE_ACTIVE,): self.shared_data[self.SHARED_LT_G_ACTIVE_DEVICES],
+                (self.LT_DEVICE_STATE_BUSY,): self.shared_data[self.SHARED_LT_G_BUSY_DEVICES],
+                (self.LT_DEVICE_STATE_CLEANUP,): self.shared_data[self.SHARED_LT_G_CLEANUP_DEVICES],
+            },
+        )
+        registry.gauge_callback(
+            "ltdp_lt_initiated_jobs",
+            "LambdaTest jobs in the initiated state.",
+            [],
+            lambda: {(): self.shared_data[self.SHARED_LT_G_INITIATED_JOBS]},
+        )
+        for key, documentation in (
+            ("recently_started", "Jobs started recently that haven't claimed a task yet (RStarted)."),
+            ("need_handling", "Pending tasks without a recently started job (NeedH)."),
+            ("available_devices", "Devices available to start jobs on (AvailW)."),
+            ("backed_off_devices", "Devices backed off after failing jobs."),
+            ("jobs_to_start", "Jobs the last job starter cycle decided to start (ToStart)."),
+        ):
+            registry.gauge_callback(f"ltdp_job_starter_{key}", documentation, ["project"], job_starter_values(key))
+        registry.counter_callback(
+            "ltdp_session_started_jobs",
+            "Jobs started since the manager started.",
+            [],
+            lambda: {(): self.shared_data[self.SHARED_SESSION_STARTED_JOBS]},
+        )
+        self.jobs_launched = registry.counter("ltdp_jobs_launched", "Jobs launched.", ["project"])
+        self.monitor_loop_seconds = registry.histogram(
+            "ltdp_monitor_loop_seconds", "Duration of a monitor thread cycle, without the sleep.", ["thread"]
+        )
+        self.job_launch_seconds = registry.histogram(
+            "ltdp_job_launch_seconds", "Time to prepare the job directory and spawn hyperexecute.", ["project"]
+        )
+        return registry
+
     # Helper methods
 
     def calculate_jobs_to_start(self, tc_jobs_not_handled, available_devices_count, global_initiated, max_jobs=None):
@@ -862,10 +1376,12 @@ class TestRunManagerLT(object):
         # Debug output for job calculation
         if self.DEBUG_JOB_CALCULATION:
             logging.debug(
-                f"Job calculation - TCJobsNotHandled: {tc_jobs_not_handled}, "
-                f"AvailableDevices: {available_devices_count}, "
-                f"GlobalInitiated: {global_initiated}, "
-                f"MaxJobsToStartAtOnce: {max_jobs}"
+                "Job calculation - TCJobsNotHandled: %s, AvailableDevices: %s, GlobalInitiated: %s, "
+                "MaxJobsToStartAtOnce: %s",
+                tc_jobs_not_handled,
+                available_devices_count,
+                global_initiated,
+                max_jobs,
             )
 
         # TODO: move global_initiated out of this function and consider it in 'job start' threads separately
@@ -873,8 +1389,9 @@ class TestRunManagerLT(object):
         if global_initiated > self.GLOBAL_MAX_INITITATED_JOBS:
             if self.DEBUG_JOB_CALCULATION:
                 logging.debug(
-                    f"Not starting new jobs: Global initiated jobs ({global_initiated}) > "
-                    f"GLOBAL_MAX_INITITATED_JOBS ({self.GLOBAL_MAX_INITITATED_JOBS})"
+                    "Not starting new jobs: Global initiated jobs (%s) > GLOBAL_MAX_INITITATED_JOBS (%s)",
+                    global_initiated,
+                    self.GLOBAL_MAX_INITITATED_JOBS,
                 )
             jobs_to_start = 0
             return jobs_to_start
@@ -885,7 +1402,12 @@ class TestRunManagerLT(object):
         # Debug output for the actual calculation
         if self.DEBUG_JOB_CALCULATION:
             logging.debug(
-                f"Job start calculation (min(tc_jobs_not_handled, max_jobs, available_devices_count)): min({tc_jobs_not_handled}, {max_jobs}, {available_devices_count}) = {jobs_to_start}"
+                "Job start calculation (min(tc_jobs_not_handled, max_jobs, available_devices_count)): "
+                "min(%s, %s, %s) = %s",
+                tc_jobs_not_handled,
+                max_jobs,
+                available_devices_count,
+                jobs_to_start,
             )
 
         # Ensure the result is not negative
@@ -945,12 +1467,29 @@ def parse_args(action_array):
         default="INFO",
         help="Logging level. Defaults to INFO.",
     )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve OpenMetrics (Prometheus) metrics on http://127.0.0.1:<port>/metrics.",
+    )
     parser.add_argument(
         "--disable-logging-timestamps",
         "-dlt",
         action="store_true",
         help="Disable logging timestamps.",
     )
+    parser.add_argument(
+        "--log-json",
+        action="store_true",
+        help="Log one JSON object per line (structured logging).",
+    )
+    parser.add_argument(
+        "--debug-areas",
+        help=(
+            "Comma separated areas to log in detail at DEBUG "
+            f"({', '.join(TestRunManagerLT.DEBUG_AREAS)}, or 'none'). Defaults to all."
+        ),
+    )
     return parser.parse_args()
 
 
@@ -958,8 +1497,9 @@ def main():
     sentry_dsn = os.getenv("SENTRY_DSN")
     if sentry_dsn:
         # Sentry DSN is set, initialize Sentry SDK
-        sentry_sdk.init(
-            dsn=sentry_dsn,
+        # traces are sampled, see sentry_setup for the environment variables setting the rates
+        sentry_setup.init_sentry(
+            sentry_dsn,
             # Add data like request headers and IP for users,
             # see https://docs.sentry.io/platforms/python/data-management/data-collected/ for more info
             send_default_pii=True,
@@ -976,7 +1516,7 @@ def main():
     #     logging.warning("Running in debug mode. JFake values are used in many places!")
 
     # Configure logging explicitly
-    logging_setup.setup_logging(args.log_level, args.disable_logging_timestamps)
+    logging_setup.setup_logging(args.log_level, args.disable_logging_timestamps, json_output=args.log_json)
 
     if args.action == "start-test-run-manager":
         git_version_info = misc.get_git_info()
@@ -999,7 +1539,15 @@ def main():
         print()
 
         try:
-            trmlt = TestRunManagerLT(unit_testing_mode=args.ci_mode, debug_mode=args.debug)
+            debug_areas = None
+            if args.debug_areas is not None:
+                debug_areas = [area.strip() for area in args.debug_areas.split(",") if area.strip() not in ("", "none")]
+            trmlt = TestRunManagerLT(
+                unit_testing_mode=args.ci_mode,
+                debug_mode=args.debug,
+                metrics_port=args.metrics_port,
+                debug_areas=debug_areas,
+            )
         except ValueError as e:
             logging.warning(f"Error initializing TestRunManagerLT. Missing environment variables? {e}")
             # misc.report_handled_exception_to_sentry(e)
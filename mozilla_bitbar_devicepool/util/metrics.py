@@ -0,0 +1,226 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import bisect
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# a small OpenMetrics (Prometheus) registry and endpoint, stdlib only
+#
+# updating a metric takes no locks: every counter and histogram child must have a
+# single writer thread (e.g. one child per project for the job starters), the GIL
+# keeps its updates whole. a scrape can see a histogram between two updates of the
+# same observation, which is fine for monitoring.
+#
+# values kept elsewhere (e.g. the manager's shared data) are read at scrape time by
+# callbacks, so they cost nothing on the threads producing them.
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# seconds, for loops polling apis and for job launches
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape_label_value(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, labelvalues, extra=()):
+    pairs = list(zip(labelnames, labelvalues)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class _Metric:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # label values -> child
+        self.children = {}
+
+    def labels(self, *labelvalues):
+        """Returns the child of the label values, creating it the first time."""
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {labelvalues}")
+        child = self.children.get(labelvalues)
+        if child is None:
+            # setdefault, two threads creating the same child get the same one
+            child = self.children.setdefault(labelvalues, self._new_child())
+        return child
+
+    def header(self):
+        return [f"# TYPE {self.name} {self.TYPE}", f"# HELP {self.name} {self.documentation}"]
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Counter(_Metric):
+    TYPE = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def render(self):
+        lines = self.header()
+        for labelvalues, child in sorted(list(self.children.items())):
+            lines.append(
+                f"{self.name}_total{_format_labels(self.labelnames, labelvalues)} {_format_value(child.value)}"
+            )
+        return lines
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # one count per bucket (not cumulative) and one for values above the last bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    TYPE = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def render(self):
+        lines = self.header()
+        for labelvalues, child in sorted(list(self.children.items())):
+            counts = list(child.counts)
+            cumulative = 0
+            for upper_bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, labelvalues, [("le", _format_value(float(upper_bound)))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """A gauge or counter whose values are read by a callback at scrape time."""
+
+    def __init__(self, name, documentation, labelnames, callback, metric_type="gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self.TYPE = metric_type
+
+    def render(self):
+        lines = self.header()
+        suffix = "_total" if self.TYPE == "counter" else ""
+        # callback returns {label values: value}
+        for labelvalues, value in sorted(self.callback().items()):
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def _register(self, metric):
+        if any(registered.name == metric.name for registered in self.metrics):
+            raise ValueError(f"metric {metric.name} is already registered")
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_callback(self, name, documentation, labelnames, callback):
+        """Registers a gauge whose values come from callback() ({label values tuple: value})."""
+        return self._register(CallbackMetric(name, documentation, labelnames, callback))
+
+    def counter_callback(self, name, documentation, labelnames, callback):
+        """Registers a counter whose values come from callback() ({label values tuple: value})."""
+        return self._register(CallbackMetric(name, documentation, labelnames, callback, metric_type="counter"))
+
+    def render(self):
+        """Returns the metrics in the OpenMetrics text format."""
+        lines = []
+        for metric in self.metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                # one failing callback shouldn't hide the other metrics
+                logging.warning(f"Unable to collect metric {metric.name}: {e}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(registry, port, host="127.0.0.1", debug_handlers=None):
+    """
+    Serves the registry on http://host:port/metrics from a daemon thread.
+
+    Args:
+        debug_handlers (dict): {path: callable}, also serves what callable() returns as
+            JSON on these paths (e.g. '/debug/timings').
+
+    Returns:
+        ThreadingHTTPServer: The server, call shutdown() to stop it.
+    """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            if path == "/metrics":
+                content_type = CONTENT_TYPE
+                body = registry.render().encode()
+            elif debug_handlers and path in debug_handlers:
+                content_type = "application/json"
+                body = json.dumps(debug_handlers[path](), indent=2).encode()
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # no log line per scrape
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="Metrics", daemon=True)
+    thread.start()
+    return server
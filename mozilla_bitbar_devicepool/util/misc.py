@@ -1,9 +1,11 @@
+import os
 import uuid as uuidlib
 from datetime import datetime, timezone
 
-import git
 import humanhash
-import sentry_sdk
+
+# git and sentry_sdk are imported where they are used, they are slow to import
+# and most tools importing this module don't need them
 
 
 # Get the current date in UTC in an ISO formatted string
@@ -14,6 +16,8 @@ def get_utc_date_string():
 
 
 def get_git_info():
+    import git
+
     repo = git.Repo(search_parent_directories=True)
     sha = repo.head.object.hexsha
     dirty = repo.is_dirty()
@@ -43,12 +47,23 @@ def humanhash_from_string(value, **params):
 #   - this is really controlled by sentry detecting the logging level
 #     we use in the exception handler.
 def report_handled_exception_to_sentry(exc, level="warning"):
+    import sentry_sdk
+
     with sentry_sdk.push_scope() as scope:
         scope.set_level(level)
         scope.set_tag("handled", True)  # optional: for filtering in Sentry UI
         sentry_sdk.capture_exception(exc)
 
 
+def get_cache_dir():
+    """
+    Returns the directory for this package's caches (not created).
+
+    $XDG_CACHE_HOME/mozilla-bitbar-devicepool, ~/.cache/mozilla-bitbar-devicepool by default.
+    """
+    return os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "mozilla-bitbar-devicepool")
+
+
 def pluralize(word, count):
     """
     Returns the pluralized form of a word based on the count.
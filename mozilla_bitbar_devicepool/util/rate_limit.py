@@ -0,0 +1,53 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket: up to burst tokens at once, refilled at rate per second.
+
+    acquire() reserves a token and sleeps until it is due, so concurrent callers are
+    spaced 1 / rate seconds apart in the order they called, without polling.
+    """
+
+    def __init__(self, rate, burst=1, clock=time.monotonic, sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        if burst < 1:
+            raise ValueError(f"burst must be at least 1, got {burst}")
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+        # negative when tokens are reserved ahead of the refill
+        self.tokens = float(burst)
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        """
+        Takes a token, possibly ahead of the refill.
+
+        Returns:
+            float: Seconds until the token is due, 0 if it is available now.
+        """
+        with self.lock:
+            self._refill(self.clock())
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def acquire(self):
+        """Waits for a token."""
+        wait = self.reserve()
+        if wait > 0:
+            self.sleep(wait)
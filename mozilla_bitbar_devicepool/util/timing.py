@@ -0,0 +1,154 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import array
+import time
+
+# per-phase timing of thread loops
+#
+#   timer = LoopTimer("LT API", ["fetch", "parse", "partition"])
+#   while ...:
+#       timer.start()
+#       ...                      # API calls
+#       timer.mark("fetch")      # time since start() (or the previous mark) goes to 'fetch'
+#       ...
+#       timer.mark("parse")
+#       elapsed_ns = timer.stop()
+#
+# a phase can be marked several times in one loop (e.g. once per project), its times
+# are added up and recorded once by stop(). phases not marked in a loop (e.g. 'spawn'
+# when no job was started) aren't recorded for it. histograms are preallocated and updated
+# in place, a timer must only be used by one thread. readers (summaries, dumps) may
+# see a loop half recorded, which is fine for diagnostics.
+
+# buckets per power of two, the recorded values are within 25% of the real ones
+SUB_BUCKETS = 4
+_SUB_BUCKET_BITS = 2
+# covers every 64 bit value
+BUCKET_COUNT = 64 * SUB_BUCKETS
+
+TOTAL_PHASE = "total"
+
+
+def _bucket_index(ns):
+    if ns < SUB_BUCKETS:
+        return ns
+    shift = ns.bit_length() - _SUB_BUCKET_BITS - 1
+    return (shift + 1) * SUB_BUCKETS + ((ns >> shift) & (SUB_BUCKETS - 1))
+
+
+def _bucket_bounds(index):
+    """Returns the (lowest, highest) value of a bucket."""
+    if index < SUB_BUCKETS:
+        return index, index
+    shift = index // SUB_BUCKETS - 1
+    lowest = (SUB_BUCKETS + index % SUB_BUCKETS) << shift
+    return lowest, lowest + (1 << shift) - 1
+
+
+class TimingHistogram:
+    """A log-linear histogram of durations in nanoseconds."""
+
+    def __init__(self):
+        self.counts = array.array("Q", bytes(8 * BUCKET_COUNT))
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, ns):
+        self.counts[_bucket_index(ns)] += 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def percentile(self, percent):
+        """Returns the approximate percentile in nanoseconds, 0 if nothing was recorded."""
+        if not self.count:
+            return 0
+        if percent >= 100:
+            return self.max_ns
+        rank = max(1, -(-self.count * percent // 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                lowest, highest = _bucket_bounds(index)
+                return min((lowest + highest) // 2, self.max_ns)
+        return self.max_ns
+
+    def snapshot(self):
+        """Returns count, mean, p50, p95, p99 and max in milliseconds."""
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ns / self.count / 1e6, 3) if self.count else 0,
+            "p50_ms": round(self.percentile(50) / 1e6, 3),
+            "p95_ms": round(self.percentile(95) / 1e6, 3),
+            "p99_ms": round(self.percentile(99) / 1e6, 3),
+            "max_ms": round(self.max_ns / 1e6, 3),
+        }
+
+
+class LoopTimer:
+    """Records the time spent in each phase of a thread's loop, see the top of this file."""
+
+    def __init__(self, name, phases):
+        self.name = name
+        self.phases = tuple(phases)
+        self.histograms = {phase: TimingHistogram() for phase in self.phases + (TOTAL_PHASE,)}
+        # phase -> ns of the current loop, None if not marked
+        self.current = dict.fromkeys(self.phases)
+        self.loop_start_ns = None
+        self.last_mark_ns = None
+        self.skipped_ns = 0
+
+    def start(self):
+        for phase in self.current:
+            self.current[phase] = None
+        self.skipped_ns = 0
+        self.loop_start_ns = self.last_mark_ns = time.perf_counter_ns()
+
+    def mark(self, phase):
+        """Adds the time since start() or the previous mark to phase."""
+        now = time.perf_counter_ns()
+        self.current[phase] = (self.current[phase] or 0) + now - self.last_mark_ns
+        self.last_mark_ns = now
+
+    def skip(self):
+        """Leaves the time since start() or the previous mark out of the loop (e.g. a wait)."""
+        now = time.perf_counter_ns()
+        self.skipped_ns += now - self.last_mark_ns
+        self.last_mark_ns = now
+
+    def stop(self):
+        """
+        Records the phases and the total time of the loop.
+
+        Returns:
+            int: The loop's total time in nanoseconds, without the skipped time.
+        """
+        elapsed_ns = time.perf_counter_ns() - self.loop_start_ns - self.skipped_ns
+        for phase, ns in self.current.items():
+            if ns is not None:
+                self.histograms[phase].record(ns)
+        self.histograms[TOTAL_PHASE].record(elapsed_ns)
+        return elapsed_ns
+
+    def snapshot(self):
+        """Returns {phase: TimingHistogram.snapshot()}, for debug dumps."""
+        return {phase: histogram.snapshot() for phase, histogram in self.histograms.items()}
+
+    def summary(self):
+        """Returns a one line summary: p50/p95/max in milliseconds of each recorded phase."""
+        if not self.histograms[TOTAL_PHASE].count:
+            return f"{self.name}: no loops"
+        parts = []
+        for phase, histogram in self.histograms.items():
+            if not histogram.count:
+                continue
+            parts.append(
+                f"{phase} {histogram.percentile(50) / 1e6:.1f}/{histogram.percentile(95) / 1e6:.1f}/"
+                f"{histogram.max_ns / 1e6:.1f}"
+            )
+        return f"{self.name} ({self.histograms[TOTAL_PHASE].count} loops): {', '.join(parts)}"